@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+import time
+
+from app.historico import HistoricoEventos
+
+# Log de auditoria dos jogos fora do caminho da requisição: cada evento do
+# histórico entra numa fila em memória e uma tarefa em segundo plano grava os
+# eventos em lote (JSON por linha) numa thread, com rotação por tamanho:
+# auditoria.jsonl é o arquivo atual e auditoria.jsonl.1, .2, ... os
+# anteriores (o maior número é o mais antigo).
+#
+# Contrapressão: a fila tem limite. Acima de metade dele, Sala.executar espera
+# a fila esvaziar antes de aceitar o próximo comando; se mesmo assim lotar,
+# os eventos excedentes são descartados e contados em "descartados".
+#
+# Cada linha é {"sala", "seq", "acao", "jogador", "turno", "estado", "t"};
+# o início de um jogo grava {"sala", "novo_jogo": true, "t"}, o que permite
+# reconstruir o histórico do jogo atual de cada sala na subida do servidor.
+
+ARQUIVO = "auditoria.jsonl"
+
+
+class EscritorAuditoria:
+    def __init__(self, pasta: str, tamanho_max: int = 64 * 1024 * 1024, arquivos: int = 10,
+                 limite_fila: int = 10_000, lote: int = 500):
+        self.pasta = pasta
+        self.caminho = os.path.join(pasta, ARQUIVO)
+        self.tamanho_max = tamanho_max  # Bytes antes de rodar o arquivo
+        self.arquivos = arquivos  # Arquivos antigos mantidos
+        self.limite_fila = limite_fila
+        self.lote = lote  # Máximo de eventos por gravação
+        self.fila: asyncio.Queue | None = None
+        self.com_espaco: asyncio.Event | None = None
+        self.tarefa: asyncio.Task | None = None
+        self.arquivo = None
+        self.gravados = 0
+        self.descartados = 0
+
+    def iniciar(self):
+        # Precisa de um laço de eventos rodando (ex.: no lifespan do app)
+        os.makedirs(self.pasta, exist_ok=True)
+        self.arquivo = open(self.caminho, "a", encoding="utf-8")
+        self.fila = asyncio.Queue(maxsize=self.limite_fila)
+        self.com_espaco = asyncio.Event()
+        self.com_espaco.set()
+        self.tarefa = asyncio.create_task(self._drenar())
+
+    async def fechar(self):
+        # Grava tudo o que ainda está na fila e fecha o arquivo
+        if self.tarefa is None:
+            return
+        await self.fila.join()
+        self.tarefa.cancel()
+        try:
+            await self.tarefa
+        except asyncio.CancelledError:
+            pass
+        self.tarefa = None
+        self.arquivo.close()
+
+    def _enfileirar(self, item):
+        try:
+            self.fila.put_nowait(item)
+        except asyncio.QueueFull:
+            self.descartados += 1
+            return
+        if self.fila.qsize() * 2 >= self.limite_fila:
+            self.com_espaco.clear()
+
+    def registrar(self, sala_id: str, evento: tuple):
+        # evento: tupla do HistoricoEventos (seq, acao, jogador, turno, estado)
+        self._enfileirar((sala_id, evento, time.time()))
+
+    def novo_jogo(self, sala_id: str):
+        self._enfileirar((sala_id, None, time.time()))
+
+    async def aguardar_espaco(self):
+        if self.com_espaco is not None and not self.com_espaco.is_set():
+            await self.com_espaco.wait()
+
+    async def _drenar(self):
+        while True:
+            lote = [await self.fila.get()]
+            while len(lote) < self.lote and not self.fila.empty():
+                lote.append(self.fila.get_nowait())
+            try:
+                await asyncio.to_thread(self._gravar, lote)
+            except Exception:
+                # Disco cheio ou arquivo sumiu: perde o lote, mas não a tarefa
+                self.descartados += len(lote)
+            finally:
+                for _ in lote:
+                    self.fila.task_done()
+            if self.fila.qsize() * 4 < self.limite_fila:
+                self.com_espaco.set()
+
+    def _gravar(self, lote):
+        # Roda numa thread: serializa e grava o lote de uma vez
+        linhas = []
+        for sala_id, evento, instante in lote:
+            if evento is None:
+                registro = {"sala": sala_id, "novo_jogo": True, "t": instante}
+            else:
+                registro = {"sala": sala_id, **dict(zip(HistoricoEventos.CAMPOS, evento)), "t": instante}
+            linhas.append(json.dumps(registro, ensure_ascii=False) + "\n")
+        self.arquivo.write("".join(linhas))
+        self.arquivo.flush()
+        self.gravados += len(lote)
+        if self.arquivo.tell() >= self.tamanho_max:
+            self._rodar()
+
+    def _rodar(self):
+        self.arquivo.close()
+        for numero in range(self.arquivos, 0, -1):
+            antigo = f"{self.caminho}.{numero}"
+            if not os.path.exists(antigo):
+                continue
+            if numero == self.arquivos:
+                os.remove(antigo)
+            else:
+                os.replace(antigo, f"{self.caminho}.{numero + 1}")
+        if self.arquivos:
+            os.replace(self.caminho, f"{self.caminho}.1")
+        else:
+            os.remove(self.caminho)
+        self.arquivo = open(self.caminho, "a", encoding="utf-8")
+
+
+def ler_eventos(pasta: str):
+    # Registros de todos os arquivos, do mais antigo ao mais novo
+    caminho = os.path.join(pasta, ARQUIVO)
+    rodados = []
+    for nome in os.listdir(pasta) if os.path.isdir(pasta) else []:
+        sufixo = nome[len(ARQUIVO) + 1:]
+        if nome.startswith(ARQUIVO + ".") and sufixo.isdigit():
+            rodados.append(int(sufixo))
+    for arquivo in [f"{caminho}.{n}" for n in sorted(rodados, reverse=True)] + [caminho]:
+        if not os.path.exists(arquivo):
+            continue
+        with open(arquivo, encoding="utf-8") as entrada:
+            for linha in entrada:
+                try:
+                    yield json.loads(linha)
+                except ValueError:
+                    continue  # Linha cortada por uma queda no meio da gravação
+
+
+def restaurar_historicos(pasta: str, salas) -> int:
+    # Preenche o histórico do jogo atual de cada sala com o que foi auditado;
+    # eventos reaplicados na recuperação que faltarem no arquivo são mantidos
+    por_sala = {}
+    for registro in ler_eventos(pasta):
+        sala_id = registro.get("sala")
+        if sala_id not in salas:
+            continue
+        if registro.get("novo_jogo"):
+            por_sala[sala_id] = []
+        elif sala_id in por_sala:
+            por_sala[sala_id].append(registro)
+
+    restauradas = 0
+    for sala_id, registros in por_sala.items():
+        sala = salas.salas[sala_id]
+        if not sala.jogo or not registros:
+            continue
+        historico = sala.jogo.historico
+        reaplicados = list(historico.eventos)
+        historico.eventos.clear()
+        for registro in registros:
+            if registro["seq"] < historico.proximo_seq:
+                historico.eventos.append(tuple(registro[campo] for campo in HistoricoEventos.CAMPOS))
+        ultimo = historico.eventos[-1][0] if historico.eventos else -1
+        historico.eventos.extend(evento for evento in reaplicados if evento[0] > ultimo)
+        restauradas += 1
+    return restauradas
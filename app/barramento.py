@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import itertools
+import json
+from collections import defaultdict
+
+# Barramento entre processos para rodar o servidor com vários trabalhadores
+# (app.cluster). Um corretor central aceita conexões dos trabalhadores por um
+# socket Unix (ou "host:porta" em TCP) e troca mensagens JSON, uma por linha:
+#
+#   {"tipo": "ola", "trabalhador": 0}                        apresentação
+#   {"tipo": "assinar", "sala": "mesa1", "protocolos": [...]} interesse numa sala
+#   {"tipo": "cancelar", "sala": "mesa1"}
+#   {"tipo": "interesse", "sala": "mesa1", "protocolos": [...]}
+#       do corretor para cada trabalhador: protocolos que os *outros*
+#       trabalhadores assinam na sala (vazio = ninguém), a cada mudança
+#   {"tipo": "interesses", "salas": {"mesa1": [...]}}         o mesmo, de todas
+#       as salas, logo depois do "ola"
+#   {"tipo": "publicar", "sala": "mesa1", "itens": [...]}    mensagens do /ws
+#   {"tipo": "pedido", "para": 1, "de": 0, "id": 7, ...}     chamada a outro trabalhador
+#   {"tipo": "resposta", "para": 0, "id": 7, ...}            resposta da chamada
+#
+# O corretor só lê o cabeçalho de cada mensagem e repassa a linha como veio:
+# publicações vão para os outros trabalhadores que assinam a sala, pedidos e
+# respostas para o trabalhador indicado em "para". Faz o papel de um Redis
+# pub/sub, sem dependência externa, inclusive nos testes. Com os avisos de
+# interesse, o dono de uma sala só codifica e publica o que alguém de fora
+# vai receber.
+
+LIMITE_LINHA = 16 * 1024 * 1024  # Maior mensagem aceita (estado completo de uma mesa cheia)
+LIMITE_BUFFER = 16 * 1024 * 1024  # Bytes pendentes antes de descartar publicações
+
+
+class TrabalhadorIndisponivel(Exception):
+    pass
+
+
+def _abrir(endereco: str):
+    host, _, porta = endereco.rpartition(":")
+    if host and porta.isdigit():
+        return asyncio.open_connection(host, int(porta), limit=LIMITE_LINHA)
+    return asyncio.open_unix_connection(endereco, limit=LIMITE_LINHA)
+
+
+def _linha(mensagem: dict) -> bytes:
+    return json.dumps(mensagem, ensure_ascii=False).encode() + b"\n"
+
+
+class Corretor:
+    def __init__(self, endereco: str):
+        self.endereco = endereco
+        self.trabalhadores: dict[int, asyncio.StreamWriter] = {}
+        self.assinantes: dict[str, dict] = defaultdict(dict)  # sala -> {escritor: protocolos}
+        self.avisados: dict[tuple, list] = {}  # (escritor, sala) -> interesse já avisado a ele
+        self.servidor = None
+
+    async def iniciar(self):
+        host, _, porta = self.endereco.rpartition(":")
+        if host and porta.isdigit():
+            self.servidor = await asyncio.start_server(self._atender, host, int(porta), limit=LIMITE_LINHA)
+        else:
+            self.servidor = await asyncio.start_unix_server(self._atender, self.endereco, limit=LIMITE_LINHA)
+
+    async def fechar(self):
+        self.servidor.close()
+        for escritor in list(self.trabalhadores.values()):
+            escritor.close()
+        await self.servidor.wait_closed()
+
+    async def _atender(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        indice = None
+        salas = set()
+        try:
+            while linha := await leitor.readline():
+                mensagem = json.loads(linha)
+                tipo = mensagem["tipo"]
+                if tipo == "publicar":
+                    for destino in self.assinantes.get(mensagem["sala"], ()):
+                        if destino is not escritor:
+                            destino.write(linha)
+                elif tipo in ("pedido", "resposta"):
+                    destino = self.trabalhadores.get(mensagem["para"])
+                    if destino:
+                        destino.write(linha)
+                    elif tipo == "pedido":
+                        escritor.write(_linha({"tipo": "resposta", "id": mensagem["id"],
+                                               "erro": f"Trabalhador {mensagem['para']} desconectado"}))
+                elif tipo == "assinar":
+                    self.assinantes[mensagem["sala"]][escritor] = list(mensagem.get("protocolos", ()))
+                    salas.add(mensagem["sala"])
+                    self._avisar(mensagem["sala"])
+                elif tipo == "cancelar":
+                    self._cancelar(mensagem["sala"], escritor)
+                    salas.discard(mensagem["sala"])
+                    self._avisar(mensagem["sala"])
+                elif tipo == "ola":
+                    indice = mensagem["trabalhador"]
+                    self.trabalhadores[indice] = escritor
+                    todas = {}
+                    for sala_id in self.assinantes:
+                        protocolos = self._interesse(sala_id, escritor)
+                        if protocolos:
+                            todas[sala_id] = self.avisados[escritor, sala_id] = protocolos
+                    escritor.write(_linha({"tipo": "interesses", "salas": todas}))
+        except (ConnectionError, ValueError, KeyError):
+            pass  # Trabalhador caiu ou mandou lixo: só ele é desligado
+        finally:
+            if indice is not None and self.trabalhadores.get(indice) is escritor:
+                del self.trabalhadores[indice]
+            for chave in [c for c in self.avisados if c[0] is escritor]:
+                del self.avisados[chave]
+            for sala_id in salas:
+                self._cancelar(sala_id, escritor)
+                self._avisar(sala_id)
+            escritor.close()
+
+    def _cancelar(self, sala_id: str, escritor):
+        assinantes = self.assinantes.get(sala_id)
+        if assinantes:
+            assinantes.pop(escritor, None)
+            if not assinantes:
+                del self.assinantes[sala_id]
+
+    def _interesse(self, sala_id: str, escritor) -> list:
+        # Protocolos que os outros trabalhadores assinam na sala
+        protocolos = set()
+        for outro, dele in self.assinantes.get(sala_id, {}).items():
+            if outro is not escritor:
+                protocolos.update(dele)
+        return sorted(protocolos)
+
+    def _avisar(self, sala_id: str):
+        # Avisa cada trabalhador cujo interesse de fora na sala mudou
+        for escritor in self.trabalhadores.values():
+            protocolos = self._interesse(sala_id, escritor)
+            if protocolos == self.avisados.get((escritor, sala_id), []):
+                continue
+            if protocolos:
+                self.avisados[escritor, sala_id] = protocolos
+            else:
+                self.avisados.pop((escritor, sala_id), None)
+            escritor.write(_linha({"tipo": "interesse", "sala": sala_id, "protocolos": protocolos}))
+
+
+# Lado do trabalhador. Publicar e assinar só escrevem no socket (não esperam);
+# pedir espera a resposta do outro trabalhador. Se a conexão com o corretor
+# cair, o cliente reconecta sozinho e refaz as assinaturas.
+class BarramentoSocket:
+    def __init__(self, endereco: str, trabalhador: int, tempo_pedido: float = 10.0):
+        self.endereco = endereco
+        self.trabalhador = trabalhador
+        self.tempo_pedido = tempo_pedido  # Segundos até um pedido sem resposta falhar
+        self.ao_receber = None  # ao_receber(sala_id, itens)
+        self.ao_pedir = None  # async ao_pedir(corpo) -> corpo da resposta
+        self.ao_interesse = None  # ao_interesse(sala_id, antes, depois), com conjuntos de protocolos
+        self.assinaturas: dict[str, list] = {}  # sala -> protocolos assinados
+        self.interesses: dict[str, frozenset] = {}  # sala -> protocolos que outros trabalhadores assinam
+        self.pendentes: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self.escritor: asyncio.StreamWriter | None = None
+        self.tarefa: asyncio.Task | None = None
+        self.descartadas = 0  # Publicações perdidas com o corretor lento ou fora do ar
+
+    async def conectar(self):
+        leitor, self.escritor = await _abrir(self.endereco)
+        self._apresentar()
+        self.tarefa = asyncio.create_task(self._ler(leitor))
+
+    def _apresentar(self):
+        self._enviar({"tipo": "ola", "trabalhador": self.trabalhador})
+        for sala_id, protocolos in self.assinaturas.items():
+            self._enviar({"tipo": "assinar", "sala": sala_id, "protocolos": protocolos})
+
+    async def fechar(self):
+        if self.tarefa:
+            self.tarefa.cancel()
+            self.tarefa = None
+        if self.escritor:
+            self.escritor.close()
+            self.escritor = None
+        self._falhar_pendentes()
+
+    def _enviar(self, mensagem: dict) -> bool:
+        escritor = self.escritor
+        if escritor is None or escritor.is_closing():
+            return False
+        if escritor.transport.get_write_buffer_size() > LIMITE_BUFFER:
+            return False
+        escritor.write(_linha(mensagem))
+        return True
+
+    def assinar(self, sala_id: str, protocolos=("texto",)):
+        # Também serve para trocar os protocolos de uma assinatura existente
+        self.assinaturas[sala_id] = list(protocolos)
+        self._enviar({"tipo": "assinar", "sala": sala_id, "protocolos": list(protocolos)})
+
+    def cancelar(self, sala_id: str):
+        self.assinaturas.pop(sala_id, None)
+        self._enviar({"tipo": "cancelar", "sala": sala_id})
+
+    def _interesse(self, sala_id: str, protocolos):
+        antes = self.interesses.get(sala_id, frozenset())
+        depois = frozenset(protocolos)
+        if depois:
+            self.interesses[sala_id] = depois
+        else:
+            self.interesses.pop(sala_id, None)
+        if antes != depois and self.ao_interesse:
+            self.ao_interesse(sala_id, antes, depois)
+
+    def publicar(self, sala_id: str, itens: list):
+        if not self._enviar({"tipo": "publicar", "sala": sala_id, "itens": itens}):
+            self.descartadas += 1
+
+    async def pedir(self, trabalhador: int, corpo: dict) -> dict:
+        pedido_id = next(self._ids)
+        futuro = asyncio.get_running_loop().create_future()
+        self.pendentes[pedido_id] = futuro
+        try:
+            if not self._enviar({"tipo": "pedido", "para": trabalhador, "de": self.trabalhador,
+                                 "id": pedido_id, "corpo": corpo}):
+                raise TrabalhadorIndisponivel("Sem conexão com o corretor")
+            try:
+                return await asyncio.wait_for(futuro, self.tempo_pedido)
+            except asyncio.TimeoutError:
+                raise TrabalhadorIndisponivel(f"Trabalhador {trabalhador} não respondeu") from None
+        finally:
+            self.pendentes.pop(pedido_id, None)
+
+    async def _atender(self, mensagem: dict):
+        try:
+            corpo = await self.ao_pedir(mensagem["corpo"])
+            resposta = {"tipo": "resposta", "para": mensagem["de"], "id": mensagem["id"], "corpo": corpo}
+        except Exception as erro:
+            resposta = {"tipo": "resposta", "para": mensagem["de"], "id": mensagem["id"], "erro": repr(erro)}
+        self._enviar(resposta)
+
+    async def _ler(self, leitor: asyncio.StreamReader):
+        while True:
+            try:
+                while linha := await leitor.readline():
+                    mensagem = json.loads(linha)
+                    tipo = mensagem["tipo"]
+                    if tipo == "publicar":
+                        self.ao_receber(mensagem["sala"], mensagem["itens"])
+                    elif tipo == "resposta":
+                        futuro = self.pendentes.get(mensagem["id"])
+                        if futuro and not futuro.done():
+                            if "erro" in mensagem:
+                                futuro.set_exception(TrabalhadorIndisponivel(mensagem["erro"]))
+                            else:
+                                futuro.set_result(mensagem["corpo"])
+                    elif tipo == "pedido":
+                        asyncio.create_task(self._atender(mensagem))
+                    elif tipo == "interesse":
+                        self._interesse(mensagem["sala"], mensagem["protocolos"])
+                    elif tipo == "interesses":
+                        # Retrato completo (na conexão ou reconexão): o que sumiu zera
+                        for sala_id in self.interesses.keys() - mensagem["salas"].keys():
+                            self._interesse(sala_id, ())
+                        for sala_id, protocolos in mensagem["salas"].items():
+                            self._interesse(sala_id, protocolos)
+            except (ConnectionError, ValueError):
+                pass
+            # Corretor fora do ar: falha o que estava esperando e tenta de novo
+            self._falhar_pendentes()
+            self.escritor = None
+            while True:
+                await asyncio.sleep(0.5)
+                try:
+                    leitor, self.escritor = await _abrir(self.endereco)
+                    break
+                except OSError:
+                    continue
+            self._apresentar()
+
+    def _falhar_pendentes(self):
+        for futuro in self.pendentes.values():
+            if not futuro.done():
+                futuro.set_exception(TrabalhadorIndisponivel("Conexão com o corretor perdida"))
+
+
+async def servir(endereco: str):
+    corretor = Corretor(endereco)
+    await corretor.iniciar()
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corretor do barramento entre trabalhadores")
+    parser.add_argument("endereco", help="Caminho do socket Unix ou host:porta")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(servir(args.endereco))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
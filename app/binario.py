@@ -0,0 +1,221 @@
+import struct
+from contextvars import ContextVar
+
+from fastapi.responses import JSONResponse
+
+# Protocolo binário opcional, para bots e espectadores que fazem muitas
+# requisições. Mesmas mensagens do JSON, só que em MessagePack e com cada
+# carta trocada pelo seu código (índice em app.game.CARTAS, 0 a 61).
+#
+#   /ws?protocolo=binario          frames binários com as mensagens do
+#                                  protocolo delta (app.sincronizacao)
+#   Accept: application/msgpack    respostas REST em MessagePack
+#
+# Sem o cabeçalho ou o parâmetro, tudo continua em JSON; o static/script.js
+# usa o protocolo delta em JSON.
+#
+# O codificador é daqui mesmo, em Python puro, e cobre só a parte do formato
+# que as mensagens usam (nil, booleanos, inteiros, float, texto, bytes, listas
+# e mapas); não há dependência de pacote externo.
+#
+# As mensagens que chegam vêm de clientes, então desempacotar recusa com
+# ValueError o que passar de MAX_TAMANHO bytes ou MAX_PROFUNDIDADE níveis de
+# listas e mapas, e tamanhos declarados maiores que o que sobrou da mensagem.
+
+TIPO = "application/msgpack"
+MAX_TAMANHO = 64 * 1024
+MAX_PROFUNDIDADE = 32
+
+_binario: ContextVar[bool] = ContextVar("binario", default=False)  # Requisição atual pediu MessagePack
+
+
+def aceita_binario(accept: str) -> bool:
+    return any(parte.split(";")[0].strip().lower() in (TIPO, "application/x-msgpack")
+               for parte in accept.split(","))
+
+
+def carta(c):
+    # Como uma carta aparece na resposta da requisição atual
+    return c.codigo if _binario.get() else str(c)
+
+
+def _empacotar(obj, partes: list):
+    if obj is None:
+        partes.append(b"\xc0")
+    elif obj is True:
+        partes.append(b"\xc3")
+    elif obj is False:
+        partes.append(b"\xc2")
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            partes.append(bytes((obj,)))
+        elif -0x20 <= obj < 0:
+            partes.append(struct.pack("b", obj))
+        elif 0 <= obj <= 0xff:
+            partes.append(struct.pack(">BB", 0xcc, obj))
+        elif 0 <= obj <= 0xffff:
+            partes.append(struct.pack(">BH", 0xcd, obj))
+        elif 0 <= obj <= 0xffffffff:
+            partes.append(struct.pack(">BI", 0xce, obj))
+        elif obj >= 0:
+            partes.append(struct.pack(">BQ", 0xcf, obj))
+        elif obj >= -0x80:
+            partes.append(struct.pack(">Bb", 0xd0, obj))
+        elif obj >= -0x8000:
+            partes.append(struct.pack(">Bh", 0xd1, obj))
+        elif obj >= -0x80000000:
+            partes.append(struct.pack(">Bi", 0xd2, obj))
+        else:
+            partes.append(struct.pack(">Bq", 0xd3, obj))
+    elif isinstance(obj, float):
+        partes.append(struct.pack(">Bd", 0xcb, obj))
+    elif isinstance(obj, str):
+        dados = obj.encode("utf-8")
+        n = len(dados)
+        if n < 32:
+            partes.append(bytes((0xa0 | n,)))
+        elif n <= 0xff:
+            partes.append(struct.pack(">BB", 0xd9, n))
+        elif n <= 0xffff:
+            partes.append(struct.pack(">BH", 0xda, n))
+        else:
+            partes.append(struct.pack(">BI", 0xdb, n))
+        partes.append(dados)
+    elif isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n <= 0xff:
+            partes.append(struct.pack(">BB", 0xc4, n))
+        elif n <= 0xffff:
+            partes.append(struct.pack(">BH", 0xc5, n))
+        else:
+            partes.append(struct.pack(">BI", 0xc6, n))
+        partes.append(bytes(obj))
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            partes.append(bytes((0x90 | n,)))
+        elif n <= 0xffff:
+            partes.append(struct.pack(">BH", 0xdc, n))
+        else:
+            partes.append(struct.pack(">BI", 0xdd, n))
+        for item in obj:
+            _empacotar(item, partes)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            partes.append(bytes((0x80 | n,)))
+        elif n <= 0xffff:
+            partes.append(struct.pack(">BH", 0xde, n))
+        else:
+            partes.append(struct.pack(">BI", 0xdf, n))
+        for chave, valor in obj.items():
+            _empacotar(chave, partes)
+            _empacotar(valor, partes)
+    else:
+        raise TypeError(f"Tipo sem representação em MessagePack: {type(obj).__name__}")
+
+
+# Cabeçalho -> (formato struct do tamanho/valor, tipo)
+_FIXOS = {
+    0xcc: (">B", int), 0xcd: (">H", int), 0xce: (">I", int), 0xcf: (">Q", int),
+    0xd0: (">b", int), 0xd1: (">h", int), 0xd2: (">i", int), 0xd3: (">q", int),
+    0xca: (">f", float), 0xcb: (">d", float),
+    0xd9: (">B", str), 0xda: (">H", str), 0xdb: (">I", str),
+    0xc4: (">B", bytes), 0xc5: (">H", bytes), 0xc6: (">I", bytes),
+    0xdc: (">H", list), 0xdd: (">I", list),
+    0xde: (">H", dict), 0xdf: (">I", dict),
+}
+
+
+def _desempacotar(dados: bytes, pos: int, profundidade: int = 0):
+    # (objeto, posição seguinte)
+    byte = dados[pos]
+    pos += 1
+    if byte < 0x80:
+        return byte, pos
+    if byte >= 0xe0:
+        return byte - 0x100, pos
+    if 0xa0 <= byte < 0xc0:
+        tipo, n = str, byte & 0x1f
+    elif 0x90 <= byte < 0xa0:
+        tipo, n = list, byte & 0x0f
+    elif 0x80 <= byte < 0x90:
+        tipo, n = dict, byte & 0x0f
+    elif byte == 0xc0:
+        return None, pos
+    elif byte in (0xc2, 0xc3):
+        return byte == 0xc3, pos
+    elif byte in _FIXOS:
+        formato, tipo = _FIXOS[byte]
+        (n,) = struct.unpack_from(formato, dados, pos)
+        pos += struct.calcsize(formato)
+        if tipo in (int, float):
+            return n, pos
+    else:
+        raise ValueError(f"Cabeçalho MessagePack não suportado: {byte:#x}")
+
+    # Cada item de lista ou mapa ocupa pelo menos um byte
+    if n > len(dados) - pos:
+        raise ValueError("Tamanho declarado maior que a mensagem")
+    if tipo in (list, dict):
+        profundidade += 1
+        if profundidade > MAX_PROFUNDIDADE:
+            raise ValueError(f"Mais de {MAX_PROFUNDIDADE} níveis de listas e mapas")
+    if tipo is str:
+        return dados[pos:pos + n].decode("utf-8"), pos + n
+    if tipo is bytes:
+        return bytes(dados[pos:pos + n]), pos + n
+    if tipo is list:
+        itens = []
+        for _ in range(n):
+            item, pos = _desempacotar(dados, pos, profundidade)
+            itens.append(item)
+        return itens, pos
+    mapa = {}
+    for _ in range(n):
+        chave, pos = _desempacotar(dados, pos, profundidade)
+        mapa[chave], pos = _desempacotar(dados, pos, profundidade)
+    return mapa, pos
+
+
+def empacotar(obj) -> bytes:
+    partes = []
+    _empacotar(obj, partes)
+    return b"".join(partes)
+
+
+def desempacotar(dados: bytes):
+    if len(dados) > MAX_TAMANHO:
+        raise ValueError(f"Mensagem MessagePack com mais de {MAX_TAMANHO} bytes")
+    try:
+        obj, pos = _desempacotar(dados, 0)
+    except (IndexError, struct.error, UnicodeDecodeError, TypeError) as erro:  # TypeError: chave de mapa não hasheável
+        raise ValueError(f"MessagePack inválido: {erro}") from erro
+    if pos != len(dados):
+        raise ValueError("Bytes sobrando depois da mensagem")
+    return obj
+
+
+class RespostaNegociada(JSONResponse):
+    # Resposta padrão do app: JSON, ou MessagePack se a requisição pediu
+    def render(self, content) -> bytes:
+        if _binario.get():
+            self.media_type = TIPO
+            return empacotar(content)
+        return super().render(content)
+
+
+class MiddlewareBinario:
+    # Marca as requisições com Accept: application/msgpack
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = next((v for k, v in scope["headers"] if k == b"accept"), b"")
+        token = _binario.set(aceita_binario(accept.decode("latin-1")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _binario.reset(token)
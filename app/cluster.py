@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import base64
+import inspect
+import json
+import multiprocessing
+import os
+import socket
+import time
+import zlib
+
+from starlette.routing import Match
+
+from app.barramento import TrabalhadorIndisponivel, servir
+from app.salas import SALA_PADRAO
+
+# Vários trabalhadores (processos) atrás da mesma porta. Cada sala pertence a
+# um único trabalhador, escolhido pelo crc32 do id, e vive só na memória
+# dele: a trava por sala, a idempotência e o motor do jogo continuam iguais.
+#
+# Uma requisição HTTP que chega ao trabalhador errado é repassada pelo
+# barramento (app.barramento) ao dono da sala, que a executa no próprio app e
+# devolve a resposta. Conexões /ws podem ficar em qualquer trabalhador: cada um
+# assina no corretor as salas em que tem conexões, e as mensagens publicadas
+# pelo dono chegam a todos eles.
+#
+#   python -m app.cluster --trabalhadores 4 --porta 8000
+#
+# sobe o corretor e os trabalhadores (cada um com UNO_TRABALHADOR,
+# UNO_TRABALHADORES e UNO_BARRAMENTO no ambiente, lidos no lifespan do app).
+
+# Marca, no scope, a requisição já repassada pelo barramento. Fica só no
+# scope montado por executar_http: nada que venha da rede consegue ligá-la.
+ENCAMINHADO = "uno.encaminhado"
+
+
+class Trabalhadores:
+    def __init__(self):
+        self.indice = 0  # Este trabalhador
+        self.total = 1
+        self.barramento = None  # BarramentoSocket quando total > 1
+
+    def dono(self, sala_id: str) -> int:
+        return zlib.crc32(sala_id.encode()) % self.total
+
+    def local(self, sala_id: str) -> bool:
+        return self.total == 1 or self.dono(sala_id) == self.indice
+
+
+trabalhadores = Trabalhadores()
+
+CHAVES = ("sala_id", "torneio_id")  # Parâmetros que decidem o trabalhador dono
+_chaves_das_rotas = {}  # id(rota) -> parâmetro de CHAVES que o endpoint recebe (ou None)
+
+
+def rota_com_dono(scope):
+    # (parâmetro de CHAVES, parâmetros do caminho) da rota que atende a
+    # requisição, ou (None, None) para rotas sem dono (/metrics, /static, /docs...)
+    for rota in scope["app"].router.routes:
+        if id(rota) not in _chaves_das_rotas:
+            endpoint = getattr(rota, "endpoint", None)
+            parametros = inspect.signature(endpoint).parameters if endpoint else ()
+            _chaves_das_rotas[id(rota)] = next((c for c in CHAVES if c in parametros), None)
+        chave = _chaves_das_rotas[id(rota)]
+        if chave is None:
+            continue
+        correspondencia, filho = rota.matches(scope)
+        if correspondencia is Match.FULL:
+            scope["route"] = rota  # Para o rótulo das métricas, já que o roteador não roda aqui
+            return chave, filho["path_params"]
+    return None, None
+
+
+def sala_da_requisicao(scope):
+    # Sala (ou torneio) alvo de uma requisição HTTP, SALA_PADRAO nas rotas sem
+    # prefixo, ou None para rotas sem dono
+    chave, parametros = rota_com_dono(scope)
+    return None if chave is None else parametros.get(chave, SALA_PADRAO)
+
+
+def id_local(base: str) -> str:
+    # Id novo (torneio, mesa) que pertence a este trabalhador
+    candidato, sufixo = base, 0
+    while not trabalhadores.local(candidato):
+        sufixo += 1
+        candidato = f"{base}-{sufixo}"
+    return candidato
+
+
+class MiddlewareEncaminhamento:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get(ENCAMINHADO):
+            return await self.app(scope, receive, send)
+        if trabalhadores.total == 1:
+            return await self.app(scope, receive, send)
+        sala_id = sala_da_requisicao(scope)
+        if sala_id is None or trabalhadores.local(sala_id):
+            return await self.app(scope, receive, send)
+
+        partes = []
+        while True:
+            mensagem = await receive()
+            partes.append(mensagem.get("body", b""))
+            if not mensagem.get("more_body"):
+                break
+        pedido = {
+            "tipo": "http",
+            "metodo": scope["method"],
+            "caminho": scope["path"],
+            "consulta": scope["query_string"].decode("latin-1"),
+            "cabecalhos": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in scope["headers"]],
+            "corpo": base64.b64encode(b"".join(partes)).decode(),
+            "cliente": list(scope["client"]) if scope.get("client") else None,  # Para os limites por cliente
+        }
+        try:
+            resposta = await trabalhadores.barramento.pedir(trabalhadores.dono(sala_id), pedido)
+            status = resposta["status"]
+            cabecalhos = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in resposta["cabecalhos"]]
+            corpo = base64.b64decode(resposta["corpo"])
+        except TrabalhadorIndisponivel as erro:
+            status = 503
+            corpo = json.dumps({"detail": f"Sala indisponível: {erro}"}, ensure_ascii=False).encode()
+            cabecalhos = [(b"content-type", b"application/json"), (b"content-length", str(len(corpo)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": cabecalhos})
+        await send({"type": "http.response.body", "body": corpo})
+
+
+async def executar_http(app, pedido: dict) -> dict:
+    # Roda no dono da sala uma requisição repassada e devolve a resposta inteira
+    caminho = pedido["caminho"]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": pedido["metodo"],
+        "scheme": "http",
+        "path": caminho,
+        "raw_path": caminho.encode(),
+        "query_string": pedido["consulta"].encode("latin-1"),
+        "root_path": "",
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in pedido["cabecalhos"]],
+        "client": tuple(pedido["cliente"]) if pedido.get("cliente") else None,
+        "server": None,
+        "state": {},
+        ENCAMINHADO: True,
+    }
+    corpo = base64.b64decode(pedido["corpo"])
+    enviado = False
+
+    async def receber():
+        nonlocal enviado
+        if enviado:
+            return {"type": "http.disconnect"}
+        enviado = True
+        return {"type": "http.request", "body": corpo, "more_body": False}
+
+    resposta = {"status": 500, "cabecalhos": [], "corpo": b""}
+    partes = []
+
+    async def enviar(mensagem):
+        if mensagem["type"] == "http.response.start":
+            resposta["status"] = mensagem["status"]
+            resposta["cabecalhos"] = [[k.decode("latin-1"), v.decode("latin-1")]
+                                      for k, v in mensagem.get("headers", [])]
+        elif mensagem["type"] == "http.response.body":
+            partes.append(mensagem.get("body", b""))
+
+    await app(scope, receber, enviar)
+    resposta["corpo"] = base64.b64encode(b"".join(partes)).decode()
+    return resposta
+
+
+def _rodar_corretor(endereco: str):
+    try:
+        asyncio.run(servir(endereco))
+    except KeyboardInterrupt:
+        pass
+
+
+def _rodar_trabalhador(indice: int, total: int, endereco: str, sock: socket.socket):
+    os.environ.update(UNO_TRABALHADOR=str(indice), UNO_TRABALHADORES=str(total), UNO_BARRAMENTO=endereco)
+    import uvicorn
+
+    uvicorn.Server(uvicorn.Config("app.main:app", lifespan="on")).run(sockets=[sock])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor UNO com vários trabalhadores")
+    parser.add_argument("--trabalhadores", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--barramento", default="/tmp/uno-barramento.sock",
+                        help="Socket Unix (ou host:porta) do corretor")
+    args = parser.parse_args(argv)
+
+    contexto = multiprocessing.get_context("spawn")
+    if ":" not in args.barramento and os.path.exists(args.barramento):
+        os.remove(args.barramento)  # Sobra de uma execução anterior
+    corretor = contexto.Process(target=_rodar_corretor, args=(args.barramento,), daemon=True)
+    corretor.start()
+    prazo = time.monotonic() + 5
+    while ":" not in args.barramento and not os.path.exists(args.barramento) and time.monotonic() < prazo:
+        time.sleep(0.05)
+
+    # Um só socket de escuta, herdado por todos os trabalhadores (como o
+    # uvicorn --workers faz)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.porta))
+    sock.set_inheritable(True)
+    processos = [contexto.Process(target=_rodar_trabalhador, args=(i, args.trabalhadores, args.barramento, sock))
+                 for i in range(args.trabalhadores)]
+    for processo in processos:
+        processo.start()
+    try:
+        for processo in processos:
+            processo.join()
+    except KeyboardInterrupt:
+        for processo in processos:
+            processo.terminate()
+    finally:
+        corretor.terminate()
+
+
+if __name__ == "__main__":
+    main()
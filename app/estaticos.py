@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, só gzip
+    brotli = None
+
+# Arquivos de static/ carregados uma vez na memória, já comprimidos (gzip e,
+# se o pacote brotli estiver instalado, br), com ETag forte por variante. Cada
+# requisição só escolhe a variante pelo Accept-Encoding e responde 304 se o
+# If-None-Match bater: nada de disco nem de compressão no caminho quente.
+#
+# O index.html é reescrito para apontar os /static/... com ?v=<hash do
+# arquivo>; pedidos com o hash atual recebem cache de um ano (immutable), o
+# resto (inclusive o próprio index.html) é revalidado pelo ETag a cada uso.
+#
+# Com recarregar=True (UNO_ESTATICOS_RECARREGAR=1, para desenvolvimento) cada
+# requisição confere a data de modificação da pasta e relê tudo se mudou.
+
+COMPRIMIVEIS = ("text/", "application/javascript", "application/json", "application/manifest+json",
+                "image/svg+xml", "image/x-icon", "image/vnd.microsoft.icon")
+CACHE_VERSIONADO = b"public, max-age=31536000, immutable"
+CACHE_REVALIDAR = b"no-cache"
+_REFERENCIA = re.compile(r'((?:src|href)=")/static/([^"?#]+)(?:\?[^"#]*)?(")')
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+mimetypes.add_type("application/javascript", ".js")
+
+
+class Variante:
+    def __init__(self, corpo: bytes, etag: bytes, codificacao: bytes | None):
+        self.corpo = corpo
+        self.etag = etag
+        self.codificacao = codificacao
+
+
+class Arquivo:
+    def __init__(self, conteudo: bytes, tipo: str):
+        self.tipo = tipo
+        self.hash = hashlib.sha256(conteudo).hexdigest()[:16]
+        self.variantes = {"identity": Variante(conteudo, f'"{self.hash}"'.encode(), None)}
+        if tipo.startswith(COMPRIMIVEIS):
+            comprimidas = {"gzip": gzip.compress(conteudo, 9, mtime=0)}
+            if brotli:
+                comprimidas["br"] = brotli.compress(conteudo, quality=11)
+            for codificacao, corpo in comprimidas.items():
+                if len(corpo) < len(conteudo) * 0.9:  # Só vale a pena se economizar
+                    etag = f'"{self.hash}-{codificacao}"'.encode()
+                    self.variantes[codificacao] = Variante(corpo, etag, codificacao.encode())
+
+
+def etag_confere(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match do cliente já cobre o etag (responder 304)
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (t.strip() for t in if_none_match.split(","))
+
+
+def _codificacoes_aceitas(cabecalho: str):
+    # Accept-Encoding -> codificações com q > 0
+    aceitas = set()
+    for parte in cabecalho.split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        q = parametros.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        aceitas.add(nome.strip().lower())
+    return aceitas
+
+
+class PacoteEstatico:
+    PREFERENCIA = ("br", "gzip")
+
+    def __init__(self, pasta: str, prefixo: str = "/static", recarregar: bool = False):
+        self.pasta = pasta
+        self.prefixo = prefixo
+        self.recarregar = recarregar
+        self.arquivos: dict[str, Arquivo] = {}
+        self._assinatura = None
+        self.carregar()
+
+    def _assinatura_pasta(self):
+        with os.scandir(self.pasta) as entradas:
+            return tuple(sorted((e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in entradas if e.is_file()))
+
+    def carregar(self):
+        self._assinatura = self._assinatura_pasta()
+        conteudos = {}
+        for nome, _, _ in self._assinatura:
+            with open(os.path.join(self.pasta, nome), "rb") as arquivo:
+                conteudos[nome] = arquivo.read()
+        arquivos = {}
+        for nome, conteudo in conteudos.items():
+            if not nome.endswith(".html"):
+                arquivos[nome] = Arquivo(conteudo, mimetypes.guess_type(nome)[0] or "application/octet-stream")
+        for nome, conteudo in conteudos.items():
+            if nome.endswith(".html"):
+                arquivos[nome] = Arquivo(self._versionar(conteudo.decode("utf-8"), arquivos).encode("utf-8"),
+                                         "text/html; charset=utf-8")
+        self.arquivos = arquivos
+
+    def _versionar(self, html: str, arquivos) -> str:
+        def trocar(m):
+            arquivo = arquivos.get(m.group(2))
+            if not arquivo:
+                return m.group(0)
+            return f"{m.group(1)}{self.prefixo}/{m.group(2)}?v={arquivo.hash}{m.group(3)}"
+        return _REFERENCIA.sub(trocar, html)
+
+    def responder(self, nome: str, cabecalhos, consulta: str = ""):
+        # (status, cabeçalhos, corpo) para o arquivo pedido; cabecalhos é um
+        # Mapping com os cabeçalhos da requisição (nomes em minúsculas)
+        if self.recarregar and self._assinatura_pasta() != self._assinatura:
+            self.carregar()
+        arquivo = self.arquivos.get(nome)
+        if arquivo is None:
+            return 404, [(b"content-type", b"text/plain; charset=utf-8")], b"Not Found"
+
+        aceitas = _codificacoes_aceitas(cabecalhos.get("accept-encoding", ""))
+        variante = arquivo.variantes["identity"]
+        for codificacao in self.PREFERENCIA:
+            if codificacao in aceitas and codificacao in arquivo.variantes:
+                variante = arquivo.variantes[codificacao]
+                break
+
+        versionado = f"v={arquivo.hash}" in consulta.split("&")
+        resposta = [
+            (b"etag", variante.etag),
+            (b"cache-control", CACHE_VERSIONADO if versionado else CACHE_REVALIDAR),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if etag_confere(cabecalhos.get("if-none-match"), variante.etag.decode()):
+            return 304, resposta, b""
+        resposta.append((b"content-type", arquivo.tipo.encode()))
+        if variante.codificacao:
+            resposta.append((b"content-encoding", variante.codificacao))
+        return 200, resposta, variante.corpo
+
+    async def __call__(self, scope, receive, send):
+        # App ASGI para montar em /static
+        if scope["type"] != "http":
+            return
+        if scope["method"] not in ("GET", "HEAD"):
+            status, cabecalhos, corpo = 405, [(b"allow", b"GET, HEAD")], b""
+        else:
+            cabecalhos_requisicao = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+            caminho, raiz = scope["path"], scope.get("root_path", "")
+            if raiz and caminho.startswith(raiz):
+                caminho = caminho[len(raiz):]  # Montado em /static: o caminho ainda vem com o prefixo
+            status, cabecalhos, corpo = self.responder(caminho.lstrip("/"), cabecalhos_requisicao,
+                                                       scope["query_string"].decode("latin-1"))
+        cabecalhos = cabecalhos + [(b"content-length", str(len(corpo)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": cabecalhos})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else corpo})
@@ -1,45 +1,260 @@
 import random
+from app.historico import HistoricoEventos
 
+
+# Erro de regra do jogo; status segue o código HTTP que a API devolve
+class JogadaInvalida(Exception):
+    def __init__(self, detalhe: str, status: int = 400):
+        super().__init__(detalhe)
+        self.detalhe = detalhe
+        self.status = status
+
+
+CORES = ["vermelho", "azul", "verde", "amarelo"]
+COR_CORINGA = "preto"
+VALORES = [str(i) for i in range(10)] + ["pular", "inverter", "+2", "coringa", "+4"]
+VALORES_CORINGA = ("coringa", "+4")
+
+
+# As cartas são internadas: existe uma única instância imutável para cada par
+# (cor, valor), identificada por um código inteiro pequeno. Cartas coloridas
+# usam os códigos 0-51 (cor * 13 + valor), os coringas pretos 52-53 e os
+# coringas já jogados com a cor escolhida 54-61.
 class Carta:
-    def __init__(self, cor: str, valor: str):
-        self.cor = cor  # "vermelho", "azul", "verde", "amarelo", "preto" (wild)
-        self.valor = valor  # "0-9", "pular", "inverter", "+2", "coringa", "+4"
+    __slots__ = ("cor", "valor", "codigo", "cor_id", "valor_id", "coringa", "_nome")
+    _internadas = {}
+
+    def __new__(cls, cor: str, valor: str):
+        try:
+            return cls._internadas[(cor, valor)]
+        except KeyError:
+            raise ValueError(f"Carta inválida: {cor} {valor}") from None
+
+    @classmethod
+    def _criar(cls, cor: str, valor: str, codigo: int):
+        carta = object.__new__(cls)
+        for atributo, valor_atributo in (
+            ("cor", cor),  # "vermelho", "azul", "verde", "amarelo", "preto" (wild)
+            ("valor", valor),  # "0-9", "pular", "inverter", "+2", "coringa", "+4"
+            ("codigo", codigo),
+            ("cor_id", CORES.index(cor) if cor in CORES else len(CORES)),
+            ("valor_id", VALORES.index(valor)),
+            ("coringa", valor in VALORES_CORINGA),
+            ("_nome", f"{cor.capitalize()} {valor}"),
+        ):
+            object.__setattr__(carta, atributo, valor_atributo)
+        cls._internadas[(cor, valor)] = carta
+        return carta
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("Carta é imutável")
+
+    def __reduce__(self):
+        # copy/deepcopy/pickle devolvem a mesma instância internada
+        return (Carta, (self.cor, self.valor))
+
+    def pode_jogar_sobre(self, topo: "Carta") -> bool:
+        return (JOGAVEIS_SOBRE[topo.codigo] >> self.codigo) & 1 == 1
 
     def __repr__(self):
-        return f"{self.cor.capitalize()} {self.valor}"
+        return self._nome
+
+
+def _internar_cartas():
+    cartas = []
+    for cor in CORES:
+        for valor in VALORES[:13]:
+            cartas.append(Carta._criar(cor, valor, len(cartas)))
+    for valor in VALORES_CORINGA:
+        cartas.append(Carta._criar(COR_CORINGA, valor, len(cartas)))
+    for cor in CORES:
+        for valor in VALORES_CORINGA:
+            cartas.append(Carta._criar(cor, valor, len(cartas)))
+    return tuple(cartas)
+
 
+CARTAS = _internar_cartas()  # CARTAS[codigo] -> Carta
 
+# JOGAVEIS_SOBRE[codigo_do_topo] é uma máscara de bits com os códigos das cartas
+# que podem ser jogadas sobre aquele topo
+JOGAVEIS_SOBRE = tuple(
+    sum(
+        1 << carta.codigo
+        for carta in CARTAS
+        if carta.coringa or carta.cor_id == topo.cor_id or carta.valor_id == topo.valor_id
+    )
+    for topo in CARTAS
+)
+
+
+# As cartas ficam numa tupla imutável e a compra só move o índice do topo
+# (_restantes), então cópias do jogo (JogoUNO.clonar) dividem a mesma tupla
+# sem copiar nada; embaralhar ou reciclar cria uma tupla nova.
 class Baralho:
-    CORES = ["vermelho", "azul", "verde", "amarelo"]
-    VALORES = [str(i) for i in range(10)] + ["pular", "inverter", "+2"]
+    CORES = CORES
+    VALORES = VALORES[:13]
 
-    def __init__(self):
+    def __init__(self, rng=None, copias: int = 1):
+        self.rng = rng or random  # random.Random semeado para partidas reproduzíveis
+        self.copias = copias  # Mesas grandes jogam com mais de um baralho
         self.cartas = self._gerar_baralho()
         self.embaralhar()
 
+    @property
+    def cartas(self) -> tuple:
+        # Cartas ainda no baralho (a última é a próxima a ser comprada). É uma
+        # tupla: para trocar as cartas, atribua uma sequência nova; para
+        # contar, use len(baralho), que não copia nada
+        return self._cartas[:self._restantes]
+
+    @cartas.setter
+    def cartas(self, cartas):
+        self._cartas = tuple(cartas)
+        self._restantes = len(self._cartas)
+
+    def __len__(self):
+        return self._restantes
+
+    def __bool__(self):
+        return True  # Um baralho vazio continua sendo um baralho
+
     def _gerar_baralho(self):
-        cartas = []
-        for cor in self.CORES:
-            cartas.append(Carta(cor, "0"))
-            for valor in self.VALORES[1:]:
-                cartas.append(Carta(cor, valor))
-                cartas.append(Carta(cor, valor))
-        for _ in range(4):
-            cartas.append(Carta("preto", "coringa"))
-            cartas.append(Carta("preto", "+4"))
-        return cartas
+        return list(BARALHO_COMPLETO) * self.copias
 
     def embaralhar(self):
-        random.shuffle(self.cartas)
+        cartas = list(self.cartas)
+        self.rng.shuffle(cartas)
+        self.cartas = cartas
 
     def comprar(self):
-        return self.cartas.pop() if self.cartas else None
+        if not self._restantes:
+            return None
+        self._restantes -= 1
+        return self._cartas[self._restantes]
+
+    def clonar(self, rng) -> "Baralho":
+        baralho = Baralho.__new__(Baralho)
+        baralho.rng = rng
+        baralho.copias = self.copias
+        baralho._cartas = self._cartas
+        baralho._restantes = self._restantes
+        return baralho
+
+
+def _montar_baralho_completo():
+    cartas = []
+    for cor in CORES:
+        cartas.append(Carta(cor, "0"))
+        for valor in Baralho.VALORES[1:]:
+            cartas.append(Carta(cor, valor))
+            cartas.append(Carta(cor, valor))
+    for _ in range(4):
+        cartas.append(Carta(COR_CORINGA, "coringa"))
+        cartas.append(Carta(COR_CORINGA, "+4"))
+    return tuple(cartas)
+
+
+BARALHO_COMPLETO = _montar_baralho_completo()  # As 108 cartas, na ordem antes de embaralhar
+
+
+# Mão de um jogador: uma lista de cartas que mantém, a cada compra e jogada, a
+# contagem por código de carta, uma máscara de bits dos códigos presentes e a
+# contagem por cor (sem coringas). Assim "tem alguma carta jogável sobre o
+# topo?" e "tinha carta da cor anterior?" custam O(1).
+class Mao(list):
+    def __init__(self, cartas=()):
+        super().__init__(cartas)
+        self._reindexar()
+
+    def _reindexar(self):
+        self.contagem = [0] * len(CARTAS)
+        self.por_cor = [0] * (len(CORES) + 1)
+        self.presentes = 0
+        for carta in self:
+            self._entrou(carta)
+
+    def _entrou(self, carta: Carta):
+        self.contagem[carta.codigo] += 1
+        self.presentes |= 1 << carta.codigo
+        if not carta.coringa:
+            self.por_cor[carta.cor_id] += 1
+
+    def _saiu(self, carta: Carta):
+        self.contagem[carta.codigo] -= 1
+        if not self.contagem[carta.codigo]:
+            self.presentes &= ~(1 << carta.codigo)
+        if not carta.coringa:
+            self.por_cor[carta.cor_id] -= 1
+
+    def append(self, carta):
+        super().append(carta)
+        self._entrou(carta)
+
+    def extend(self, cartas):
+        cartas = list(cartas)
+        super().extend(cartas)
+        for carta in cartas:
+            self._entrou(carta)
+
+    def insert(self, indice, carta):
+        super().insert(indice, carta)
+        self._entrou(carta)
+
+    def pop(self, indice=-1):
+        carta = super().pop(indice)
+        self._saiu(carta)
+        return carta
+
+    def remove(self, carta):
+        super().remove(carta)
+        self._saiu(carta)
+
+    def clear(self):
+        super().clear()
+        self._reindexar()
+
+    def __setitem__(self, indice, valor):
+        super().__setitem__(indice, valor)
+        self._reindexar()
+
+    def __delitem__(self, indice):
+        super().__delitem__(indice)
+        self._reindexar()
+
+    def __iadd__(self, cartas):
+        self.extend(cartas)
+        return self
+
+    def copiar(self) -> "Mao":
+        # Cópia com o índice pronto, sem recalcular carta por carta
+        mao = Mao.__new__(Mao)
+        list.extend(mao, self)
+        mao.contagem = self.contagem.copy()
+        mao.por_cor = self.por_cor.copy()
+        mao.presentes = self.presentes
+        return mao
+
+    def tem_jogavel(self, topo: Carta) -> bool:
+        return self.presentes & JOGAVEIS_SOBRE[topo.codigo] != 0
+
+    def tem_cor(self, cor_id: int) -> bool:
+        return self.por_cor[cor_id] > 0
+
+    def codigos_jogaveis(self, topo: Carta):
+        mascara = self.presentes & JOGAVEIS_SOBRE[topo.codigo]
+        return [carta.codigo for carta in CARTAS if mascara >> carta.codigo & 1]
+
+    def indices_jogaveis(self, topo: Carta):
+        if not self.tem_jogavel(topo):
+            return []
+        mascara = JOGAVEIS_SOBRE[topo.codigo]
+        return [i for i, carta in enumerate(self) if mascara >> carta.codigo & 1]
 
 
 class Jogador:
     def __init__(self, nome: str):
         self.nome = nome
-        self.mao = []
+        self.mao = Mao()  # Sempre uma Mao: altere com os métodos de lista, não reatribua
         self.disse_uno = False  # Novo atributo para rastrear se declarou "UNO!"
 
     def comprar_carta(self, baralho: Baralho, qtd=1):
@@ -61,16 +276,34 @@ class Jogador:
         return f"Jogador({self.nome}, Cartas: {len(self.mao)})"
 
 
+# Os jogadores ocupam assentos fixos (self.assentos). Os assentos ainda em jogo
+# formam um anel duplamente ligado (_seguinte/_anterior), então passar a vez,
+# inverter e eliminar um jogador custam O(1) mesmo em mesas grandes;
+# turno_atual é o número do assento da vez. self.jogadores lista só quem ainda
+# está jogando, na ordem dos assentos; depois de uma eliminação ela só é
+# remontada quando alguém a pedir de novo, então eliminar continua O(1).
 class JogoUNO:
-    def __init__(self, nomes_jogadores):
-        self.baralho = Baralho()
-        self.jogadores = [Jogador(nome) for nome in nomes_jogadores]
+    JOGADORES_POR_BARALHO = 10
+    # Chamado como método (recebe o jogo) a cada reciclagem do baralho; é
+    # definido na classe, para todos os jogos (ex.: métricas em app.main)
+    ouvinte_reciclagem = None
+
+    def __init__(self, nomes_jogadores, semente=None):
+        nomes_jogadores = list(nomes_jogadores)
+        if len(set(nomes_jogadores)) != len(nomes_jogadores):
+            raise JogadaInvalida("Nomes de jogadores repetidos")
+        self.semente = semente
+        self.rng = random.Random(semente)
+        copias = max(1, -(-len(nomes_jogadores) // self.JOGADORES_POR_BARALHO))
+        self.baralho = Baralho(self.rng, copias)
+        self._sentar([Jogador(nome) for nome in nomes_jogadores])
         self.pilha_descarte = []
         self.direcao = 1  # 1 = horário, -1 = anti-horário
         self.turno_atual = 0
-        self.historico = []  #  Histórico de ações
+        self.historico = HistoricoEventos()  #  Histórico de ações (limitado)
         self.ultimo_desafio = None  # Guarda info temporária de desafio ao +4
         self.vencedores = [] # Lista com a ordem dos vencedores
+        self.ouvinte_comandos = None  # Recebe cada comando aceito, ex.: ("jogar", nome, indice, cor)
 
         # Distribuir 7 cartas a cada jogador
         for jogador in self.jogadores:
@@ -78,25 +311,62 @@ class JogoUNO:
 
         # Iniciar a pilha de descarte
         primeira_carta = self.baralho.comprar()
-        while primeira_carta.cor == "preto":  # Evitar iniciar com coringa
+        while primeira_carta.cor == COR_CORINGA:  # Evitar iniciar com coringa
             self.baralho.embaralhar()
             primeira_carta = self.baralho.comprar()
         self.pilha_descarte.append(primeira_carta)
 
+    def _sentar(self, jogadores, ativos=None):
+        self.assentos = jogadores
+        self._por_nome = {j.nome: i for i, j in enumerate(jogadores)}
+        self._ativos = list(ativos) if ativos is not None else [True] * len(jogadores)
+        self._disseram_uno = {j for j, ativo in zip(jogadores, self._ativos) if ativo and j.disse_uno}
+        em_jogo = [i for i, ativo in enumerate(self._ativos) if ativo]
+        self._seguinte = [0] * len(jogadores)
+        self._anterior = [0] * len(jogadores)
+        for posicao, assento in enumerate(em_jogo):
+            self._seguinte[assento] = em_jogo[(posicao + 1) % len(em_jogo)]
+            self._anterior[assento] = em_jogo[posicao - 1]
+        self._jogadores = [jogadores[i] for i in em_jogo]
+        self._em_jogo = len(em_jogo)
+
+    @property
+    def jogadores(self):
+        if self._jogadores is None:
+            self._jogadores = [j for j, ativo in zip(self.assentos, self._ativos) if ativo]
+        return self._jogadores
+
+    def _vizinho(self, assento: int) -> int:
+        # Próximo assento em jogo no sentido atual
+        return self._seguinte[assento] if self.direcao == 1 else self._anterior[assento]
+
+    def obter_jogador(self, nome: str):
+        assento = self._por_nome.get(nome)
+        if assento is None or not self._ativos[assento]:
+            return None
+        return self.assentos[assento]
+
     def eliminar_jogador(self, jogador):
-        if jogador in self.jogadores:
-            self.vencedores.append(jogador.nome)
-            self.jogadores.remove(jogador)
-            if self.turno_atual >= len(self.jogadores):
-                self.turno_atual = 0
-            return True
-        return False
-    
+        assento = self._por_nome.get(jogador.nome)
+        if assento is None or not self._ativos[assento]:
+            return False
+        if self.turno_atual == assento:
+            self.turno_atual = self._vizinho(assento)
+        anterior, seguinte = self._anterior[assento], self._seguinte[assento]
+        self._seguinte[anterior] = seguinte
+        self._anterior[seguinte] = anterior
+        self._ativos[assento] = False
+        self._disseram_uno.discard(jogador)
+        self.vencedores.append(jogador.nome)
+        self._em_jogo -= 1
+        self._jogadores = None
+        return True
+
     def jogador_atual(self):
-        return self.jogadores[self.turno_atual]
+        return self.assentos[self.turno_atual]
 
     def proximo_turno(self):
-        self.turno_atual = (self.turno_atual + self.direcao) % len(self.jogadores)
+        self.turno_atual = self._vizinho(self.turno_atual)
 
     def __repr__(self):
         return f"JogoUNO(Turno de {self.jogador_atual().nome}, Topo: {self.pilha_descarte[-1]})"
@@ -106,38 +376,359 @@ class JogoUNO:
             return False  # Nada para reciclar
 
         topo = self.pilha_descarte[-1]
-        recicladas = self.pilha_descarte[:-1]
-        random.shuffle(recicladas)
+        # Coringas voltam a ser pretos ao retornar para o baralho
+        recicladas = [Carta(COR_CORINGA, c.valor) if c.coringa else c for c in self.pilha_descarte[:-1]]
+        self.rng.shuffle(recicladas)
 
         self.baralho.cartas = recicladas
         self.pilha_descarte = [topo]
+        if self.ouvinte_reciclagem:
+            self.ouvinte_reciclagem()
         return True
 
+    # Os eventos guardam só o que mudou (cartas que entraram ou saíram e o
+    # tamanho da mão), nunca uma cópia da mão inteira
     def registrar_log(self, acao: str, jogador: str, detalhes: dict):
-        self.historico.append({
-            "acao": acao,
-            "jogador": jogador,
-            "turno": self.jogador_atual().nome,
-            "estado": detalhes
-        })
+        self.historico.registrar(acao, jogador, self.jogador_atual().nome, detalhes)
 
     def registrar_desafio(self, desafiador: str, resultado: str, cartas_compradas: int):
-        self.historico.append({
-            "acao": "desafio +4",
-            "jogador": desafiador,
-            "turno": self.jogador_atual().nome,
-            "estado": {
+        self.registrar_log(
+            acao="desafio +4",
+            jogador=desafiador,
+            detalhes={
                 "resultado": resultado,
                 "cartas_compradas": cartas_compradas,
                 "proximo_jogador": self.jogador_atual().nome
             }
-        })
+        )
 
     def registrar_desafio_mais_quatro(self, jogador_que_jogou, vitima, cor_pilha_anterior):
         self.ultimo_desafio = {
             "jogador_que_jogou": jogador_que_jogou,
             "vitima": vitima,
-            "mao_antes": list(jogador_que_jogou.mao),
-            "cor_anterior": cor_pilha_anterior
+            "cor_anterior": cor_pilha_anterior,  # cor_id do topo antes do +4
+            # Basta saber se ele tinha carta dessa cor (o +4 já saiu da mão)
+            "tinha_cor": jogador_que_jogou.mao.tem_cor(cor_pilha_anterior)
         }
-        
\ No newline at end of file
+        
+    # ------------------------------------------------------------------
+    # Regras do jogo. Cada ação valida a jogada, altera o estado e registra
+    # o histórico; erros de regra levantam JogadaInvalida.
+    # ------------------------------------------------------------------
+
+    def _notificar(self, comando):
+        if self.ouvinte_comandos:
+            self.ouvinte_comandos(comando)
+
+    def executar_comando(self, comando):
+        # Reaplica um comando recebido pelo ouvinte_comandos (recuperação)
+        acao, nome, *argumentos = comando
+        if acao == "jogar":
+            return self.jogar(nome, *argumentos)
+        if acao == "comprar":
+            return self.comprar(nome)
+        if acao == "uno":
+            return self.declarar_uno(nome)
+        if acao == "desafiar":
+            return self.desafiar(nome)
+        if acao == "nao_desafiar":
+            return self.nao_desafiar(nome)
+        raise JogadaInvalida(f"Comando desconhecido: {acao}")
+
+    @property
+    def encerrado(self):
+        return self._em_jogo <= 1
+
+    def buscar_jogador(self, nome: str) -> Jogador:
+        jogador = self.obter_jogador(nome)
+        if not jogador:
+            raise JogadaInvalida("Jogador não encontrado", status=404)
+        return jogador
+
+    def _exigir_turno(self, jogador: Jogador):
+        if jogador != self.jogador_atual():
+            raise JogadaInvalida("Não é o turno deste jogador", status=403)
+
+    def _exigir_vitima(self, nome: str):
+        if not self.ultimo_desafio:
+            raise JogadaInvalida("Nenhum desafio pendente")
+        if self.ultimo_desafio["vitima"].nome != nome:
+            raise JogadaInvalida("Você não é a vítima do +4", status=403)
+        return self.ultimo_desafio
+
+    def dar_cartas(self, jogador: Jogador, qtd: int):
+        # Compra qtd cartas, reciclando a pilha de descarte se o baralho acabar
+        cartas = jogador.comprar_carta(self.baralho, qtd)
+        if len(cartas) < qtd and self.reciclar_pilha():
+            cartas += jogador.comprar_carta(self.baralho, qtd - len(cartas))
+        return cartas
+
+    def comprar(self, nome: str):
+        jogador = self.buscar_jogador(nome)
+        self._exigir_turno(jogador)
+
+        cartas = self.dar_cartas(jogador, 1)
+        if not cartas:
+            raise JogadaInvalida("Sem cartas no baralho nem na pilha de descarte")
+
+        carta = cartas[0]
+        pode_jogar = carta.pode_jogar_sobre(self.pilha_descarte[-1])
+        if not pode_jogar:
+            self.proximo_turno()
+
+        self.registrar_log(
+            acao="comprar",
+            jogador=nome,
+            detalhes={
+                "carta_comprada": str(carta),
+                "pode_jogar": pode_jogar,
+                "cartas_na_mao": len(jogador.mao),
+                "proximo_jogador": self.jogador_atual().nome
+            }
+        )
+        self._notificar(("comprar", nome))
+        return {"carta": carta, "pode_jogar": pode_jogar}
+
+    def jogar(self, nome: str, indice: int, nova_cor: str | None = None):
+        jogador = self.buscar_jogador(nome)
+        self._exigir_turno(jogador)
+
+        if indice < 0 or indice >= len(jogador.mao):
+            raise JogadaInvalida("Índice de carta inválido")
+
+        carta_jogada = jogador.mao[indice]
+        carta_topo = self.pilha_descarte[-1]
+
+        if not carta_jogada.pode_jogar_sobre(carta_topo):
+            raise JogadaInvalida(f"Carta '{carta_jogada}' não pode ser jogada sobre '{carta_topo}'")
+
+        if carta_jogada.coringa:
+            if not nova_cor or nova_cor.lower() not in CORES:
+                raise JogadaInvalida("Cor inválida.")
+            nova_cor = nova_cor.lower()
+
+        tamanho_mao_antes = len(jogador.mao)
+        carta_removida = jogador.jogar_carta(indice)
+        mensagem_uno = None
+        mensagem_extra = None
+
+        if carta_removida.valor == "+2":
+            self.pilha_descarte.append(carta_removida)
+            self.proximo_turno()
+            vitima = self.jogador_atual()
+            self.dar_cartas(vitima, 2)
+            mensagem_extra = f"{vitima.nome} comprou 2 cartas e perdeu a vez"
+            self.proximo_turno()
+        elif carta_removida.valor == "pular":
+            self.pilha_descarte.append(carta_removida)
+            vitima = self.assentos[self._vizinho(self.turno_atual)]
+            mensagem_extra = f"{vitima.nome} perdeu a vez"
+            self.proximo_turno()
+            self.proximo_turno()
+        elif carta_removida.valor == "inverter":
+            self.pilha_descarte.append(carta_removida)
+            self.direcao *= -1
+            mensagem_extra = "Direção do jogo invertida"
+            if self._em_jogo == 2:
+                self.proximo_turno()
+            self.proximo_turno()
+        elif carta_removida.valor == "coringa":
+            carta_coringa = Carta(nova_cor, carta_removida.valor)
+            self.pilha_descarte.append(carta_coringa)
+            mensagem_extra = f"Cor escolhida: {carta_coringa.cor.capitalize()}"
+            self.proximo_turno()
+        elif carta_removida.valor == "+4":
+            carta_especial = Carta(nova_cor, carta_removida.valor)
+            self.pilha_descarte.append(carta_especial)
+            vitima = self.assentos[self._vizinho(self.turno_atual)]
+            self.registrar_desafio_mais_quatro(jogador, vitima, cor_pilha_anterior=carta_topo.cor_id)
+            mensagem_extra = f"{vitima.nome} pode desafiar o +4. Cor escolhida: {carta_especial.cor.capitalize()}"
+        else:
+            self.pilha_descarte.append(carta_removida)
+            self.proximo_turno()
+
+        resultado = {
+            "carta": carta_removida,
+            "efeito": mensagem_extra,
+            "uno": None,
+            "colocacao": None,
+            "ultimo": None
+        }
+
+        if len(jogador.mao) == 0:
+            self.eliminar_jogador(jogador)
+            resultado["colocacao"] = len(self.vencedores)  # 1 para o primeiro, etc.
+            if self._em_jogo == 1:
+                ultimo = self.jogador_atual()
+                self.vencedores.append(ultimo.nome)
+                resultado["ultimo"] = ultimo.nome
+            self._notificar(("jogar", nome, indice, nova_cor))
+            return resultado
+
+        penalidade = []
+        if tamanho_mao_antes == 2 and len(jogador.mao) == 1 and not carta_removida.coringa:
+            if not jogador.disse_uno:
+                penalidade = self.dar_cartas(jogador, 2)
+                mensagem_uno = f"{jogador.nome} esqueceu de dizer UNO! Comprou 2 cartas como penalidade."
+            else:
+                mensagem_uno = f"{jogador.nome} declarou UNO corretamente!"
+
+        # Só quem declarou UNO precisa ser zerado, sem percorrer a mesa inteira
+        jogador.disse_uno = False
+        for j in self._disseram_uno:
+            j.disse_uno = False
+        self._disseram_uno.clear()
+
+        resultado["uno"] = mensagem_uno
+
+        self.registrar_log(
+            acao="jogar",
+            jogador=nome,
+            detalhes={
+                "carta_jogada": str(carta_removida),
+                "efeito": mensagem_extra,
+                "uno": mensagem_uno,
+                "penalidade": [str(c) for c in penalidade],
+                "cartas_na_mao": len(jogador.mao),
+                "proximo_jogador": self.jogador_atual().nome
+            }
+        )
+        self._notificar(("jogar", nome, indice, nova_cor))
+        return resultado
+
+    def declarar_uno(self, nome: str):
+        jogador = self.buscar_jogador(nome)
+        if len(jogador.mao) not in [1, 2]:
+            raise JogadaInvalida("Você só pode declarar UNO quando tiver 2 ou 1 cartas")
+        jogador.disse_uno = True
+        self._disseram_uno.add(jogador)
+        self._notificar(("uno", nome))
+
+    def desafiar(self, nome: str):
+        desafio = self._exigir_vitima(nome)
+        jogador = desafio["jogador_que_jogou"]
+        # Havia carta compatível com a cor anterior antes de jogar o +4?
+        tinha_opcao = desafio["tinha_cor"]
+
+        if tinha_opcao:
+            # Jogador foi malandro: punição!
+            cartas = self.dar_cartas(jogador, 4)
+            resultado = f"Desafio bem-sucedido! {jogador.nome} comprou 4 cartas."
+        else:
+            # Desafio falhou: penalidade maior
+            cartas = self.dar_cartas(desafio["vitima"], 6)
+            resultado = f"Desafio falhou. {nome} comprou 6 cartas."
+
+        self.ultimo_desafio = None
+        self.proximo_turno()
+        self.registrar_desafio(nome, resultado, 4 if tinha_opcao else 6)
+        self._notificar(("desafiar", nome))
+        return {"resultado": resultado, "sucesso": tinha_opcao, "cartas": cartas}
+
+    def nao_desafiar(self, nome: str):
+        desafio = self._exigir_vitima(nome)
+
+        # Aplicar a penalidade de 4 cartas
+        cartas = self.dar_cartas(desafio["vitima"], 4)
+        self.ultimo_desafio = None
+        self.proximo_turno()
+
+        self.registrar_log(
+            acao="nao-desafiar",
+            jogador=nome,
+            detalhes={
+                "comprou": [str(c) for c in cartas],
+                "proximo_jogador": self.jogador_atual().nome
+            }
+        )
+        self._notificar(("nao_desafiar", nome))
+        return cartas
+
+    # ------------------------------------------------------------------
+    # Interface de motor para simulações e bots
+    # ------------------------------------------------------------------
+
+    def jogador_da_vez(self) -> Jogador:
+        # Com um +4 pendente, quem decide é a vítima
+        if self.ultimo_desafio:
+            return self.ultimo_desafio["vitima"]
+        return self.jogador_atual()
+
+    def jogadas_validas(self):
+        # Jogadas como tuplas: ("jogar", indice, cor), ("comprar",), ("uno",),
+        # ("desafiar",) e ("nao_desafiar",)
+        if self.encerrado:
+            return []
+        if self.ultimo_desafio:
+            return [("desafiar",), ("nao_desafiar",)]
+
+        jogador = self.jogador_atual()
+        topo = self.pilha_descarte[-1]
+        jogadas = []
+        mao = jogador.mao
+        for indice in mao.indices_jogaveis(topo):
+            if mao[indice].coringa:
+                jogadas.extend(("jogar", indice, cor) for cor in CORES)
+            else:
+                jogadas.append(("jogar", indice, None))
+        if len(self.baralho) or len(self.pilha_descarte) > 1:
+            jogadas.append(("comprar",))
+        if len(jogador.mao) == 2 and not jogador.disse_uno:
+            jogadas.append(("uno",))
+        return jogadas
+
+    def aplicar(self, jogada):
+        # Jogada do jogador da vez; vira o comando com o nome dele
+        return self.executar_comando((jogada[0], self.jogador_da_vez().nome, *jogada[1:]))
+
+    def resultado(self):
+        # Ranking final (primeiro ao último) ou None se o jogo não acabou
+        return list(self.vencedores) if self.encerrado else None
+
+    def clonar(self, semente=None) -> "JogoUNO":
+        # Cópia independente para busca e análises "e se": o baralho divide a
+        # mesma tupla com o original, e só as partes pequenas que mudam a cada
+        # jogada (mãos, pilha, assentos) são copiadas. Sem semente, a cópia
+        # continua a mesma sequência aleatória; com semente, segue outra.
+        # O histórico da cópia começa vazio (só as jogadas feitas nela, com a
+        # numeração continuando a do original) e ela não avisa ouvinte nenhum.
+        jogo = JogoUNO.__new__(JogoUNO)
+        jogo.semente = self.semente if semente is None else semente
+        if semente is None:
+            jogo.rng = random.Random.__new__(random.Random)  # Sem semear à toa
+            jogo.rng.setstate(self.rng.getstate())
+        else:
+            jogo.rng = random.Random(semente)
+        jogo.baralho = self.baralho.clonar(jogo.rng)
+
+        copias = {}
+        for jogador in self.assentos:
+            copia = copias[jogador] = Jogador.__new__(Jogador)
+            copia.nome = jogador.nome
+            copia.mao = jogador.mao.copiar()
+            copia.disse_uno = jogador.disse_uno
+        jogo.assentos = [copias[j] for j in self.assentos]
+        jogo._jogadores = None  # Remontada das cópias, se alguém pedir
+        jogo._em_jogo = self._em_jogo
+        jogo._por_nome = self._por_nome  # Nunca muda depois de sentar
+        jogo._ativos = self._ativos.copy()
+        jogo._seguinte = self._seguinte.copy()
+        jogo._anterior = self._anterior.copy()
+        jogo._disseram_uno = {copias[j] for j in self._disseram_uno}
+
+        jogo.pilha_descarte = self.pilha_descarte.copy()
+        jogo.direcao = self.direcao
+        jogo.turno_atual = self.turno_atual
+        jogo.vencedores = self.vencedores.copy()
+        jogo.historico = HistoricoEventos(self.historico.capacidade)
+        jogo.historico.proximo_seq = self.historico.proximo_seq
+        jogo.ouvinte_comandos = None
+
+        desafio = self.ultimo_desafio
+        jogo.ultimo_desafio = None
+        if desafio:
+            jogo.ultimo_desafio = dict(desafio)
+            for chave in ("jogador_que_jogou", "vitima"):
+                # Quem jogou o +4 pode já ter saído da mesa, mas segue nos assentos
+                jogo.ultimo_desafio[chave] = copias.get(desafio[chave], desafio[chave])
+        return jogo
@@ -0,0 +1,47 @@
+from collections import deque
+from itertools import islice
+
+# Histórico de uma partida como log só de acréscimo, limitado a um número fixo
+# de eventos (buffer circular). Cada evento recebe um número de sequência
+# crescente, que serve de cursor para paginação: eventos antigos que saíram do
+# buffer simplesmente deixam de aparecer.
+#
+# Os eventos ficam guardados como tuplas e só viram dicionários na leitura.
+# O ouvinte (se houver) recebe cada tupla nova, ex.: o log de auditoria.
+
+
+class HistoricoEventos:
+    CAMPOS = ("seq", "acao", "jogador", "turno", "estado")
+
+    def __init__(self, capacidade: int = 1000):
+        self.capacidade = capacidade
+        self.eventos = deque(maxlen=capacidade)
+        self.proximo_seq = 0
+        self.ouvinte = None  # ouvinte(evento)
+
+    def __len__(self):
+        return len(self.eventos)
+
+    def __iter__(self):
+        return (dict(zip(self.CAMPOS, evento)) for evento in list(self.eventos))
+
+    @property
+    def primeiro_seq(self):
+        # Menor seq ainda disponível no buffer
+        return self.proximo_seq - len(self.eventos)
+
+    def registrar(self, acao: str, jogador: str, turno: str, estado: dict) -> int:
+        seq = self.proximo_seq
+        evento = (seq, acao, jogador, turno, estado)
+        self.eventos.append(evento)
+        self.proximo_seq += 1
+        if self.ouvinte:
+            self.ouvinte(evento)
+        return seq
+
+    def pagina(self, cursor: int = 0, limite: int = 100):
+        # Eventos com seq >= cursor (no máximo limite) e o cursor da próxima página
+        inicio = max(cursor, self.primeiro_seq) - self.primeiro_seq
+        eventos = [dict(zip(self.CAMPOS, evento)) for evento in islice(self.eventos, inicio, inicio + limite)]
+        proximo = eventos[-1]["seq"] + 1 if eventos else max(cursor, self.primeiro_seq)
+        return eventos, proximo
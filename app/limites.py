@@ -0,0 +1,162 @@
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from app.cluster import rota_com_dono
+from app.metricas import metricas, rejeitadas
+from app.salas import SALA_PADRAO
+
+# Proteção do servidor contra clientes e bots que martelam as rotas:
+#
+# - taxa por jogador e por sala (balde de fichas): cada requisição a uma rota
+#   de sala gasta uma ficha do balde (sala, jogador) e uma do balde da sala.
+#   O jogador é o {nome_jogador} da rota, o ?jogador= ou, sem nenhum dos dois,
+#   o endereço do cliente. Sem ficha, 429 com Retry-After.
+# - admissão: no máximo max_em_andamento requisições rodando ao mesmo tempo;
+#   as seguintes esperam numa fila de até max_fila, por no máximo espera_fila
+#   segundos. Fila cheia ou espera longa demais: 503 na hora.
+#
+# Os limites de taxa ficam desligados com taxa 0. /metrics não passa pela
+# admissão, para o servidor continuar observável sob carga.
+#
+# Torneios seguem rodando depois que o POST /torneios responde, então têm a
+# própria admissão, sem fila: no máximo max_torneios em andamento (ver
+# app.main.criar_torneio).
+
+
+class LimitadorTaxa:
+    def __init__(self, taxa: float, rajada: float, max_chaves: int = 100_000):
+        self.taxa = taxa  # Fichas por segundo
+        self.rajada = max(rajada, 1)  # Tamanho do balde
+        self.max_chaves = max_chaves
+        self.baldes: OrderedDict[object, tuple[float, float]] = OrderedDict()  # chave -> (fichas, quando)
+
+    def retirar(self, chave, agora: float | None = None) -> float:
+        # 0 se a requisição pode passar; senão, segundos até a próxima ficha
+        agora = time.monotonic() if agora is None else agora
+        balde = self.baldes.get(chave)
+        if balde is None:
+            fichas = self.rajada
+            if len(self.baldes) >= self.max_chaves:
+                self.baldes.popitem(last=False)  # O balde mais antigo já estaria cheio de novo
+        else:
+            fichas = min(self.rajada, balde[0] + (agora - balde[1]) * self.taxa)
+            self.baldes.move_to_end(chave)
+        if fichas >= 1:
+            self.baldes[chave] = (fichas - 1, agora)
+            return 0.0
+        self.baldes[chave] = (fichas, agora)
+        return (1 - fichas) / self.taxa
+
+
+class ControleAdmissao:
+    def __init__(self, max_em_andamento: int, max_fila: int, espera_fila: float):
+        self.max_em_andamento = max_em_andamento
+        self.max_fila = max_fila
+        self.espera_fila = espera_fila
+        self.semaforo = asyncio.Semaphore(max_em_andamento)
+        self.em_andamento = 0
+        self.na_fila = 0
+
+    async def entrar(self) -> str | None:
+        # None se a requisição pode rodar; senão, o motivo da recusa
+        if self.semaforo.locked():
+            if self.na_fila >= self.max_fila:
+                return "fila"
+            self.na_fila += 1
+            try:
+                await asyncio.wait_for(self.semaforo.acquire(), self.espera_fila)
+            except asyncio.TimeoutError:
+                return "espera"
+            finally:
+                self.na_fila -= 1
+        else:
+            await self.semaforo.acquire()
+        self.em_andamento += 1
+        return None
+
+    def sair(self):
+        self.em_andamento -= 1
+        self.semaforo.release()
+
+
+class Limites:
+    def __init__(self):
+        self.configurar()
+
+    def configurar(self, taxa_jogador: float = 0, rajada_jogador: float = 0, taxa_sala: float = 0,
+                   rajada_sala: float = 0, max_em_andamento: int = 512, max_fila: int = 2048,
+                   espera_fila: float = 2.0, max_torneios: int = 16):
+        # Rajada 0 = duas vezes a taxa
+        self.jogador = LimitadorTaxa(taxa_jogador, rajada_jogador or 2 * taxa_jogador) if taxa_jogador else None
+        self.sala = LimitadorTaxa(taxa_sala, rajada_sala or 2 * taxa_sala) if taxa_sala else None
+        self.admissao = ControleAdmissao(max_em_andamento, max_fila, espera_fila)
+        self.torneios = ControleAdmissao(max_torneios, 0, 0)
+
+    def verificar_taxa(self, scope):
+        # (limite estourado, segundos de espera), ou None se pode passar
+        if not self.jogador and not self.sala:
+            return None
+        chave, parametros = rota_com_dono(scope)
+        if chave != "sala_id":
+            return None
+        sala_id = parametros.get("sala_id", SALA_PADRAO)
+        agora = time.monotonic()
+        # O jogador primeiro: as requisições recusadas a ele não gastam as
+        # fichas da sala
+        if self.jogador:
+            jogador = parametros.get("nome_jogador")
+            if jogador is None:
+                jogador = parse_qs(scope["query_string"].decode("latin-1")).get("jogador", [None])[0]
+            if jogador is None:
+                jogador = ("cliente", (scope.get("client") or ("?",))[0])
+            espera = self.jogador.retirar((sala_id, jogador), agora)
+            if espera:
+                return "jogador", espera
+        if self.sala:
+            espera = self.sala.retirar(sala_id, agora)
+            if espera:
+                return "sala", espera
+        return None
+
+
+limites = Limites()
+
+
+async def _recusar(send, status: int, detalhe: str, espera: float):
+    corpo = json.dumps({"detail": detalhe}, ensure_ascii=False).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(corpo)).encode()),
+        (b"retry-after", str(max(1, math.ceil(espera))).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": corpo})
+
+
+class MiddlewareLimites:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/metrics"):
+            return await self.app(scope, receive, send)
+        estourado = limites.verificar_taxa(scope)
+        if estourado:
+            limite, espera = estourado
+            if metricas.ativo:
+                rejeitadas.inc(limite)
+            return await _recusar(send, 429, "Muitas requisições: tente de novo mais tarde", espera)
+
+        admissao = limites.admissao
+        motivo = await admissao.entrar()
+        if motivo:
+            if metricas.ativo:
+                rejeitadas.inc(motivo)
+            return await _recusar(send, 503, "Servidor ocupado: tente de novo mais tarde", admissao.espera_fila)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admissao.sair()
@@ -1,328 +1,686 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from app.game import JogoUNO, Carta
-from app.websocket import manager
-from pydantic import BaseModel
-from pathlib import Path
-
-app = FastAPI(title="UNO Game API", version="0.1.0")
-
-app.mount("/static", StaticFiles(directory="static"), name="static")
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from app.game import JogadaInvalida, JogoUNO
+from app.websocket import manager, codificar, PROTOCOLO_BINARIO, PROTOCOLO_TEXTO
+from app.binario import TIPO, aceita_binario, carta, desempacotar, MiddlewareBinario, RespostaNegociada
+from app.salas import salas, SALA_PADRAO, LimiteSalasAtingido
+from app.persistencia import ArmazemEventos
+from app.auditoria import EscritorAuditoria, restaurar_historicos
+from app.barramento import BarramentoSocket, TrabalhadorIndisponivel
+from app.cluster import trabalhadores, executar_http, id_local, MiddlewareEncaminhamento
+from app.estaticos import PacoteEstatico, etag_confere
+from app.limites import limites, MiddlewareLimites
+from app.metricas import metricas, amostrador, reciclagens, rejeitadas, MiddlewareMetricas
+from app.simulacao import POLITICAS
+from app.torneio import SUICO, Torneio
+from app import probabilidades
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field
+import asyncio
+import base64
+import hmac
+import itertools
+import json
+import os
+import random
+import time
+
+# Com a variável de ambiente UNO_BANCO apontando para um arquivo SQLite, as
+# salas são gravadas como eventos + snapshots e reconstruídas na subida.
+#
+# Com UNO_AUDITORIA apontando para uma pasta, os eventos dos jogos vão para um
+# log JSONL rotativo gravado em segundo plano; na subida ele completa o
+# histórico das salas recuperadas e no desligamento a fila é esvaziada.
+#
+# Com UNO_TRABALHADORES > 1 (ver app.cluster) este processo é o trabalhador
+# UNO_TRABALHADOR, cuida só das suas salas e fala com os outros pelo corretor
+# em UNO_BARRAMENTO.
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    trabalhadores.total = int(os.environ.get("UNO_TRABALHADORES", "1"))
+    if trabalhadores.total > 1:
+        trabalhadores.indice = int(os.environ["UNO_TRABALHADOR"])
+        barramento = BarramentoSocket(os.environ["UNO_BARRAMENTO"], trabalhadores.indice)
+        barramento.ao_receber = manager.receber_do_barramento
+        barramento.ao_pedir = atender_pedido
+        barramento.ao_interesse = manager.interesse_remoto
+        await barramento.conectar()
+        trabalhadores.barramento = manager.barramento = barramento
+    pasta_auditoria = os.environ.get("UNO_AUDITORIA")
+    if pasta_auditoria and trabalhadores.total > 1:
+        pasta_auditoria = os.path.join(pasta_auditoria, f"trabalhador{trabalhadores.indice}")
+    if pasta_auditoria:
+        salas.auditoria = EscritorAuditoria(pasta_auditoria)
+        salas.auditoria.iniciar()
+    caminho = os.environ.get("UNO_BANCO")
+    if caminho:
+        salas.armazem = ArmazemEventos(caminho)
+        salas.recuperar(trabalhadores.local)
+        if pasta_auditoria:
+            restaurar_historicos(pasta_auditoria, salas)
+    yield
+    if salas.armazem:
+        salas.salvar_snapshots()
+        salas.armazem.fechar()
+        salas.armazem = None
+    if salas.auditoria:
+        await salas.auditoria.fechar()
+        salas.auditoria = None
+    if executor_torneios:
+        executor_torneios.shutdown(cancel_futures=True)
+    if trabalhadores.barramento:
+        await trabalhadores.barramento.fechar()
+        trabalhadores.barramento = manager.barramento = None
+        trabalhadores.total = 1
+
+# Respostas em JSON, ou em MessagePack com códigos de carta para quem manda
+# Accept: application/msgpack (ver app.binario)
+app = FastAPI(title="UNO Game API", version="0.1.0", lifespan=ciclo_de_vida,
+              default_response_class=RespostaNegociada)
+
+# static/ fica na memória, comprimido e com ETag (ver app.estaticos)
+estaticos = PacoteEstatico("static", recarregar=os.environ.get("UNO_ESTATICOS_RECARREGAR") == "1")
+app.mount("/static", estaticos, name="static")
+# Limites de taxa por jogador e por sala (desligados com 0) e de requisições
+# simultâneas (ver app.limites). Ficam depois do repasse entre trabalhadores:
+# quem limita é o dono da sala, que vê todas as requisições dela.
+limites.configurar(
+    taxa_jogador=float(os.environ.get("UNO_TAXA_JOGADOR", "0")),
+    taxa_sala=float(os.environ.get("UNO_TAXA_SALA", "0")),
+    max_em_andamento=int(os.environ.get("UNO_MAX_EM_ANDAMENTO", "512")),
+    max_fila=int(os.environ.get("UNO_MAX_FILA", "2048")),
+    max_torneios=int(os.environ.get("UNO_MAX_TORNEIOS", "16")),
+)
+app.add_middleware(MiddlewareBinario)
+app.add_middleware(MiddlewareLimites)
+app.add_middleware(MiddlewareEncaminhamento)
+app.add_middleware(MiddlewareMetricas)
+
+@app.exception_handler(JogadaInvalida)
+async def jogada_invalida(request, erro: JogadaInvalida):
+    return JSONResponse(status_code=erro.status, content={"detail": erro.detalhe})
 
 @app.get("/", response_class=HTMLResponse)
-def homepage():
-    html = Path("static/index.html").read_text(encoding="utf-8")
-    return HTMLResponse(content=html)
-
-jogo_atual = None
+def homepage(request: Request):
+    status, cabecalhos, corpo = estaticos.responder("index.html", request.headers)
+    return Response(corpo, status_code=status, headers={k.decode(): v.decode() for k, v in cabecalhos})
+
+# As rotas sem prefixo continuam valendo para a sala padrão; as mesmas rotas
+# sob /salas/{sala_id} atuam sobre uma sala específica.
+#
+# Toda ação que altera o jogo passa por Sala.executar: os comandos de uma sala
+# rodam em série e o cabeçalho Idempotency-Key evita que um clique duplo ou uma
+# requisição repetida jogue duas vezes. Salas diferentes não se bloqueiam.
+# A chave vale junto com a ação (a função da rota, a mesma com ou sem o
+# prefixo /salas/{sala_id}) e o jogador; as respostas já ficam guardadas por
+# sala. A mesma chave numa ação ou num jogador diferente é outro comando.
+
+def chave_idempotencia(request: Request, chave: str | None = Header(None, alias="Idempotency-Key")):
+    if chave is None:
+        return None
+    return (request.method, request.scope["route"].name, request.path_params.get("nome_jogador"), chave)
+
+ChaveIdempotencia = Depends(chave_idempotencia)
+
+async def publicar_mudancas(sala):
+    await publicar_versao(sala)
+    if sala.id in mesas_de_torneio:
+        await avancar_mesa_de_torneio(sala)
+
+async def publicar_versao(sala):
+    # Nova versão da sala: diferenças para quem usa o protocolo delta ou o
+    # binário no /ws (com vários trabalhadores, pode haver assinantes nos
+    # outros processos)
+    if not manager.estruturados(sala.id):
+        sala.sincronizador.descartar_base()
+        return
+    publica, privadas = sala.sincronizador.atualizar(sala.jogo, sala.versao)
+    await manager.enviar_delta(sala.id, publica, privadas)
+
+salas.ao_mudar = publicar_mudancas
+
+def contar_reciclagem(jogo):
+    if metricas.ativo:
+        reciclagens.inc()
+
+JogoUNO.ouvinte_reciclagem = contar_reciclagem
+
+# Medidores calculados só quando o /metrics é lido
+def _jogos():
+    return [sala.jogo for sala in salas.salas.values() if sala.jogo]
+
+metricas.medidor("uno_salas", "Salas abertas", lambda: len(salas))
+metricas.medidor("uno_jogos_em_andamento", "Jogos ainda não encerrados",
+                 lambda: sum(not jogo.encerrado for jogo in _jogos()))
+metricas.medidor("uno_jogadores", "Jogadores ainda na mesa", lambda: sum(len(jogo.jogadores) for jogo in _jogos()))
+metricas.medidor("uno_ws_conexoes", "Conexões WebSocket abertas", lambda: manager.total_conexoes())
+metricas.medidor("uno_historico_eventos", "Eventos guardados no histórico de todos os jogos",
+                 lambda: sum(len(jogo.historico) for jogo in _jogos()))
+metricas.medidor("uno_historico_eventos_max", "Maior histórico entre os jogos abertos",
+                 lambda: max((len(jogo.historico) for jogo in _jogos()), default=0))
+metricas.medidor("uno_requisicoes_em_andamento", "Requisições HTTP rodando agora",
+                 lambda: limites.admissao.em_andamento)
+metricas.medidor("uno_requisicoes_na_fila", "Requisições HTTP esperando vaga para rodar",
+                 lambda: limites.admissao.na_fila)
+metricas.medidor("uno_auditoria_fila", "Eventos esperando gravação no log de auditoria",
+                 lambda: salas.auditoria.fila.qsize() if salas.auditoria else 0)
+metricas.medidor("uno_auditoria_descartados", "Eventos perdidos pelo log de auditoria (fila cheia ou erro)",
+                 lambda: salas.auditoria.descartados if salas.auditoria else 0)
+
+async def executar_comando(sala_id: str, chave: tuple | None, acao, erro: str = "Nenhum jogo em andamento"):
+    sala = salas.obter(sala_id)
+    if not sala or not sala.jogo:
+        raise HTTPException(status_code=400, detail=erro)
+    return await sala.executar(chave, acao)
 
 @app.post("/novo-jogo")
-def novo_jogo(jogadores: list[str]):
-    global jogo_atual
-    jogo_atual = JogoUNO(jogadores)
-    return {"mensagem": "Jogo iniciado!", "topo": str(jogo_atual.pilha_descarte[-1])}
-
-@app.post("/comprar/{nome_jogador}")
-async def comprar_carta(nome_jogador: str):
-    if not jogo_atual:
-        raise HTTPException(status_code=400, detail="Nenhum jogo em andamento")
-
-    jogador = next((j for j in jogo_atual.jogadores if j.nome == nome_jogador), None)
-    if not jogador:
-        raise HTTPException(status_code=404, detail="Jogador não encontrado")
-
-    if jogador != jogo_atual.jogador_atual():
-        raise HTTPException(status_code=403, detail="Não é o turno deste jogador")
-
-    cartas = jogador.comprar_carta(jogo_atual.baralho, qtd=1)
+@app.post("/salas/{sala_id}/novo-jogo")
+async def novo_jogo(jogadores: list[str], sala_id: str = SALA_PADRAO, chave: tuple | None = ChaveIdempotencia):
+    try:
+        sala = salas.obter_ou_criar(sala_id)
+    except LimiteSalasAtingido as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-    if not cartas:
-        reciclou = jogo_atual.reciclar_pilha()
-        if reciclou:
-            cartas = jogador.comprar_carta(jogo_atual.baralho, qtd=1)
-        if not cartas:
-            raise HTTPException(status_code=400, detail="Sem cartas no baralho nem na pilha de descarte")
+    async def acao(_):
+        jogo = sala.novo_jogo(jogadores)
+        return {"mensagem": "Jogo iniciado!", "sala": sala_id, "topo": carta(jogo.pilha_descarte[-1])}
 
-    carta = cartas[0] if cartas else None
-    topo = jogo_atual.pilha_descarte[-1]
+    return await sala.executar(chave, acao)
 
-    pode_jogar = (
-        carta and (
-            carta.cor == topo.cor or
-            carta.valor == topo.valor or
-            carta.cor == "preto"
+@app.post("/comprar/{nome_jogador}")
+@app.post("/salas/{sala_id}/comprar/{nome_jogador}")
+async def comprar_carta(nome_jogador: str, sala_id: str = SALA_PADRAO, chave: tuple | None = ChaveIdempotencia):
+    async def acao(jogo_atual):
+        compra = jogo_atual.comprar(nome_jogador)
+        pode_jogar = compra["pode_jogar"]
+        jogador = jogo_atual.buscar_jogador(nome_jogador)
+
+        mensagem = f"{nome_jogador} comprou uma carta"
+        if not pode_jogar:
+            mensagem += " e passou a vez"
+
+        await manager.enviar_mensagem(
+            f"📥 {nome_jogador} comprou uma carta" +
+            (" e passou a vez" if not pode_jogar else " e pode jogar"),
+            sala_id
         )
-    )
-
-    mensagem = f"{nome_jogador} comprou uma carta"
-    if not pode_jogar:
-        jogo_atual.proximo_turno()
-        mensagem += " e passou a vez"
-
-    jogo_atual.registrar_log(
-        acao="comprar",
-        jogador=nome_jogador,
-        detalhes={
-            "carta_comprada": str(carta) if carta else "Nenhuma",
+
+        return {
+            "mensagem": mensagem,
+            "carta_comprada": carta(compra["carta"]),
             "pode_jogar": pode_jogar,
-            "mao_apos": [str(c) for c in jogador.mao],
-            "proximo_jogador": jogo_atual.jogador_atual().nome
+            "mao": [carta(c) for c in jogador.mao],
+            "proximo_jogador": jogo_atual.jogador_atual().nome if not pode_jogar else nome_jogador
         }
-    )
 
-    await manager.enviar_mensagem(
-        f"📥 {nome_jogador} comprou uma carta" +
-        (" e passou a vez" if not pode_jogar else " e pode jogar")
-    )
-
-    return {
-        "mensagem": mensagem,
-        "carta_comprada": str(carta) if carta else "Nenhuma",
-        "pode_jogar": pode_jogar,
-        "mao": [str(c) for c in jogador.mao],
-        "proximo_jogador": jogo_atual.jogador_atual().nome if not pode_jogar else nome_jogador
-    }
+    return await executar_comando(sala_id, chave, acao)
 
 class JogarCartaRequest(BaseModel):
     indice: int
     nova_cor: str | None = None
 
 @app.get("/estado")
-def estado():
-    if not jogo_atual:
+@app.get("/salas/{sala_id}/estado")
+async def estado(request: Request, sala_id: str = SALA_PADRAO, jogador: str | None = None):
+    # Leitura sem await: roda inteira entre dois comandos da sala. Sem
+    # ?jogador= só a quantidade de cartas de cada um; com, a mão dele também.
+    # A resposta sai pronta do cache da versão (ver app.visoes), e quem manda
+    # o ETag que já tem recebe 304.
+    sala = salas.obter(sala_id)
+    if not sala or not sala.jogo:
         return {"erro": "Nenhum jogo em andamento"}
+    dono = sala.jogo.buscar_jogador(jogador) if jogador is not None else None
+    binario = aceita_binario(request.headers.get("accept", ""))
+    etag, corpo = sala.visoes.obter(sala, dono, binario)
+    cabecalhos = {"etag": etag, "cache-control": "no-cache", "vary": "Accept"}
+    if etag_confere(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(corpo, media_type=TIPO if binario else "application/json", headers=cabecalhos)
+
+@app.get("/estado/probabilidades")
+@app.get("/salas/{sala_id}/estado/probabilidades")
+async def chances_de_vitoria(sala_id: str = SALA_PADRAO, jogador: str | None = None,
+                             partidas: int = Query(1000, ge=100, le=20_000)):
+    # Monte Carlo com NumPy. Com ?jogador= a estimativa usa a mão dele; sem,
+    # só o que um espectador vê.
+    sala = salas.obter(sala_id)
+    if not sala or not sala.jogo:
+        raise HTTPException(status_code=400, detail="Nenhum jogo em andamento")
+    # A cópia do estado é feita aqui, entre dois comandos; as partidas rodam
+    # numa thread para não segurar as outras salas
+    versao = sala.versao
+    estado_observado = probabilidades.EstadoObservado(sala.jogo, jogador)
+    resultado = await asyncio.to_thread(probabilidades.simular, estado_observado, partidas)
     return {
-        "turno": jogo_atual.jogador_atual().nome,
-        "topo": str(jogo_atual.pilha_descarte[-1]),
-        "jogadores": {
-            j.nome: [str(c) for c in j.mao] for j in jogo_atual.jogadores
-        }
+        "versao": versao,
+        "perspectiva": jogador,
+        "probabilidades": dict(zip(estado_observado.nomes, resultado["vitorias"])),
+        "partidas": resultado["partidas"],
+        "inconclusivas": resultado["inconclusivas"]
     }
 
-@app.post("/jogar/{nome_jogador}")
-async def jogar_carta(nome_jogador: str, jogada: JogarCartaRequest):
-    if not jogo_atual:
+@app.get("/jogadas/{nome_jogador}")
+@app.get("/salas/{sala_id}/jogadas/{nome_jogador}")
+async def jogadas_possiveis(nome_jogador: str, sala_id: str = SALA_PADRAO):
+    sala = salas.obter(sala_id)
+    if not sala or not sala.jogo:
         raise HTTPException(status_code=400, detail="Nenhum jogo em andamento")
+    jogo = sala.jogo
+    jogador = jogo.buscar_jogador(nome_jogador)
+    desafio = jogo.ultimo_desafio
+    sua_vez = not jogo.encerrado and jogo.jogador_da_vez() is jogador
+    jogaveis = jogador.mao.indices_jogaveis(jogo.pilha_descarte[-1]) if sua_vez and not desafio else []
+    return {
+        "sua_vez": sua_vez,
+        "jogaveis": [{"indice": i, "carta": carta(jogador.mao[i]), "coringa": jogador.mao[i].coringa} for i in jogaveis],
+        "pode_comprar": sua_vez and not desafio,
+        "pode_declarar_uno": len(jogador.mao) in [1, 2],
+        "desafio_pendente": bool(desafio and desafio["vitima"] is jogador)
+    }
 
-    jogador = next((j for j in jogo_atual.jogadores if j.nome == nome_jogador), None)
-    if not jogador:
-        raise HTTPException(status_code=404, detail="Jogador não encontrado")
-
-    if jogador != jogo_atual.jogador_atual():
-        raise HTTPException(status_code=403, detail="Não é o turno deste jogador")
-
-    if jogada.indice < 0 or jogada.indice >= len(jogador.mao):
-        raise HTTPException(status_code=400, detail="Índice de carta inválido")
-
-    carta_jogada = jogador.mao[jogada.indice]
-    carta_topo = jogo_atual.pilha_descarte[-1]
-
-    if carta_jogada.valor not in ["coringa", "+4"] and carta_jogada.cor != carta_topo.cor and carta_jogada.valor != carta_topo.valor:
-        raise HTTPException(status_code=400, detail=f"Carta '{carta_jogada}' não pode ser jogada sobre '{carta_topo}'")
-
-    tamanho_mao_antes = len(jogador.mao)
-    carta_removida = jogador.jogar_carta(jogada.indice)
-    mensagem_uno = None
-    mensagem_extra = None
-
-    if carta_removida.valor == "+2":
-        jogo_atual.pilha_descarte.append(carta_removida)
-        jogo_atual.proximo_turno()
-        vitima = jogo_atual.jogador_atual()
-        vitima.comprar_carta(jogo_atual.baralho, qtd=2)
-        mensagem_extra = f"{vitima.nome} comprou 2 cartas e perdeu a vez"
-        jogo_atual.proximo_turno()
-    elif carta_removida.valor == "pular":
-        jogo_atual.pilha_descarte.append(carta_removida)
-        vitima_index = (jogo_atual.turno_atual + jogo_atual.direcao) % len(jogo_atual.jogadores)
-        vitima = jogo_atual.jogadores[vitima_index]
-        mensagem_extra = f"{vitima.nome} perdeu a vez"
-        jogo_atual.proximo_turno()
-        jogo_atual.proximo_turno()
-    elif carta_removida.valor == "inverter":
-        jogo_atual.pilha_descarte.append(carta_removida)
-        jogo_atual.direcao *= -1
-        mensagem_extra = "Direção do jogo invertida"
-        if len(jogo_atual.jogadores) == 2:
-            jogo_atual.proximo_turno()
-        jogo_atual.proximo_turno()
-    elif carta_removida.valor == "coringa":
-        if not jogada.nova_cor or jogada.nova_cor.lower() not in ["vermelho", "azul", "verde", "amarelo"]:
-            raise HTTPException(status_code=400, detail="Cor inválida.")
-        carta_coringa = Carta(jogada.nova_cor.lower(), carta_removida.valor)
-        jogo_atual.pilha_descarte.append(carta_coringa)
-        mensagem_extra = f"Cor escolhida: {carta_coringa.cor.capitalize()}"
-        jogo_atual.proximo_turno()
-    elif carta_removida.valor == "+4":
-        if not jogada.nova_cor or jogada.nova_cor.lower() not in ["vermelho", "azul", "verde", "amarelo"]:
-            raise HTTPException(status_code=400, detail="Cor inválida.")
-        carta_especial = Carta(jogada.nova_cor.lower(), carta_removida.valor)
-        jogo_atual.pilha_descarte.append(carta_especial)
-        proxima_vitima = (jogo_atual.turno_atual + jogo_atual.direcao) % len(jogo_atual.jogadores)
-        vitima = jogo_atual.jogadores[proxima_vitima]
-        jogo_atual.registrar_desafio_mais_quatro(jogador, vitima, cor_pilha_anterior=carta_topo.cor)
-        mensagem_extra = f"{vitima.nome} pode desafiar o +4. Cor escolhida: {carta_especial.cor.capitalize()}"
-    else:
-        jogo_atual.pilha_descarte.append(carta_removida)
-        jogo_atual.proximo_turno()
-
-    if len(jogador.mao) == 0:
-        jogo_atual.eliminar_jogador(jogador)
-        colocacao = len(jogo_atual.vencedores)  # 1 para o primeiro, etc.
-        mensagem_vitoria = f"{jogador.nome} terminou em {colocacao}º lugar!"
+async def linhas_ndjson(historico, cursor: int):
+    # Envia o histórico em blocos, até o último evento que existia no começo
+    fim = historico.proximo_seq
+    while cursor < fim:
+        eventos, cursor = historico.pagina(cursor, min(100, fim - cursor))
+        if not eventos:
+            break
+        yield "".join(json.dumps(evento, ensure_ascii=False) + "\n" for evento in eventos)
+
+@app.get("/historico")
+@app.get("/salas/{sala_id}/historico")
+async def historico(sala_id: str = SALA_PADRAO, cursor: int = 0, limite: int = Query(100, ge=1, le=1000),
+                    formato: str = "json"):
+    sala = salas.obter(sala_id)
+    if not sala or not sala.jogo:
+        return {"erro": "Nenhum jogo em andamento"}
+    historico = sala.jogo.historico
+    if formato == "ndjson":
+        return StreamingResponse(linhas_ndjson(historico, cursor), media_type="application/x-ndjson")
+    eventos, proximo_cursor = historico.pagina(cursor, limite)
+    return {
+        "eventos": eventos,
+        "proximo_cursor": proximo_cursor,
+        "primeiro_seq": historico.primeiro_seq  # Eventos anteriores já saíram do buffer
+    }
 
-        await manager.enviar_mensagem(f"🏆 {mensagem_vitoria}")
+@app.post("/jogar/{nome_jogador}")
+@app.post("/salas/{sala_id}/jogar/{nome_jogador}")
+async def jogar_carta(nome_jogador: str, jogada: JogarCartaRequest, sala_id: str = SALA_PADRAO,
+                      chave: tuple | None = ChaveIdempotencia):
+    async def acao(jogo_atual):
+        resultado = jogo_atual.jogar(nome_jogador, jogada.indice, jogada.nova_cor)
+        carta_removida = resultado["carta"]
+        mensagem_extra = resultado["efeito"]
+        mensagem_uno = resultado["uno"]
+
+        if resultado["colocacao"]:
+            mensagem_vitoria = f"{nome_jogador} terminou em {resultado['colocacao']}º lugar!"
+
+            await manager.enviar_mensagem(f"🏆 {mensagem_vitoria}", sala_id)
+
+            if resultado["ultimo"]:
+                await manager.enviar_mensagem(f"🏁 {resultado['ultimo']} ficou em último lugar.", sala_id)
+                return {
+                    "mensagem": mensagem_vitoria,
+                    "fim": True,
+                    "ranking": list(jogo_atual.vencedores)
+                }
 
-        if len(jogo_atual.jogadores) == 1:
-            ultimo = jogo_atual.jogadores[0]
-            jogo_atual.vencedores.append(ultimo.nome)
-            await manager.enviar_mensagem(f"🏁 {ultimo.nome} ficou em último lugar.")
             return {
                 "mensagem": mensagem_vitoria,
-                "fim": True,
-                "ranking": jogo_atual.vencedores
+                "colocacao": resultado["colocacao"],
+                "ranking_parcial": list(jogo_atual.vencedores)
             }
 
-        return {
-            "mensagem": mensagem_vitoria,
-            "colocacao": colocacao,
-            "ranking_parcial": jogo_atual.vencedores
+        resposta = {
+            "mensagem": f"{nome_jogador} jogou {carta_removida}",
+            "novo_topo": carta(jogo_atual.pilha_descarte[-1]),
+            "proximo_jogador": jogo_atual.jogador_atual().nome,
+            "efeito": mensagem_extra
         }
 
+        if mensagem_uno:
+            resposta["uno"] = mensagem_uno
 
+        await manager.enviar_mensagem(
+            f"🎮 {nome_jogador} jogou {carta_removida}" +
+            (f"\n⚠️ {mensagem_uno}" if mensagem_uno else "") +
+            (f"\n🎯 {mensagem_extra}" if mensagem_extra else ""),
+            sala_id
+        )
 
-    if tamanho_mao_antes == 2 and len(jogador.mao) == 1 and carta_removida.valor not in ["+4", "coringa"]:
-        if not jogador.disse_uno:
-            jogador.comprar_carta(jogo_atual.baralho, qtd=2)
-            mensagem_uno = f"{jogador.nome} esqueceu de dizer UNO! Comprou 2 cartas como penalidade."
-        else:
-            mensagem_uno = f"{jogador.nome} declarou UNO corretamente!"
-
-    for j in jogo_atual.jogadores:
-        j.disse_uno = False
-
-    resposta = {
-        "mensagem": f"{nome_jogador} jogou {carta_removida}",
-        "novo_topo": str(jogo_atual.pilha_descarte[-1]),
-        "proximo_jogador": jogo_atual.jogador_atual().nome,
-        "efeito": mensagem_extra
-    }
-
-    if mensagem_uno:
-        resposta["uno"] = mensagem_uno
-
-    jogo_atual.registrar_log(
-        acao="jogar",
-        jogador=nome_jogador,
-        detalhes={
-            "carta_jogada": str(carta_removida),
-            "efeito": mensagem_extra,
-            "mao_apos": [str(c) for c in jogador.mao],
-            "uno": mensagem_uno,
-            "proximo_jogador": jogo_atual.jogador_atual().nome
-        }
-    )
-
-    await manager.enviar_mensagem(
-        f"🎮 {nome_jogador} jogou {carta_removida}" +
-        (f"\n⚠️ {mensagem_uno}" if mensagem_uno else "") +
-        (f"\n🎯 {mensagem_extra}" if mensagem_extra else "")
-    )
+        return resposta
 
-    return resposta
+    return await executar_comando(sala_id, chave, acao)
 
 @app.post("/uno/{nome_jogador}")
-async def declarar_uno(nome_jogador: str):
-    if not jogo_atual:
-        raise HTTPException(status_code=400, detail="Nenhum jogo em andamento")
-    jogador = next((j for j in jogo_atual.jogadores if j.nome == nome_jogador), None)
-    if not jogador:
-        raise HTTPException(status_code=404, detail="Jogador não encontrado")
-    if len(jogador.mao) not in [1, 2]:
-        raise HTTPException(status_code=400, detail="Você só pode declarar UNO quando tiver 2 ou 1 cartas")
-    jogador.disse_uno = True
-    await manager.enviar_mensagem(f"📢 {jogador.nome} declarou UNO!")
-    return {"message": f"{jogador.nome} declarou UNO!"}
+@app.post("/salas/{sala_id}/uno/{nome_jogador}")
+async def declarar_uno(nome_jogador: str, sala_id: str = SALA_PADRAO, chave: tuple | None = ChaveIdempotencia):
+    async def acao(jogo_atual):
+        jogo_atual.declarar_uno(nome_jogador)
+        await manager.enviar_mensagem(f"📢 {nome_jogador} declarou UNO!", sala_id)
+        return {"message": f"{nome_jogador} declarou UNO!"}
+
+    return await executar_comando(sala_id, chave, acao)
 
 
 @app.post("/desafiar/{nome_jogador}")
-async def desafiar_mais_quatro(nome_jogador: str):
-    if not jogo_atual or not jogo_atual.ultimo_desafio:
-        raise HTTPException(status_code=400, detail="Nenhum desafio pendente")
-
-    desafio = jogo_atual.ultimo_desafio
-    if desafio["vitima"].nome != nome_jogador:
-        raise HTTPException(status_code=403, detail="Você não é a vítima do +4")
-
-    jogador = desafio["jogador_que_jogou"]
-    mao_original = desafio["mao_antes"]
-    cor_anterior = desafio["cor_anterior"]
-
-    # Verifica se havia carta compatível com a cor anterior antes de jogar o +4
-    tinha_opcao = any(c.cor == cor_anterior and c.cor != "preto" for c in mao_original)
-
-    if tinha_opcao:
-        # Jogador foi malandro: punição!
-        cartas = jogador.comprar_carta(jogo_atual.baralho, qtd=4)
-        resultado = f"Desafio bem-sucedido! {jogador.nome} comprou 4 cartas."
-        jogo_atual.ultimo_desafio = None
-        jogo_atual.proximo_turno()
-        jogo_atual.registrar_desafio(nome_jogador, resultado, 4)
-        await manager.enviar_mensagem(f"⚖️ {resultado}")
-        return {"resultado": resultado, "cartas_compradas": [str(c) for c in cartas]}
-    else:
-        # Desafio falhou: penalidade maior
-        cartas = desafio["vitima"].comprar_carta(jogo_atual.baralho, qtd=6)
-        resultado = f"Desafio falhou. {nome_jogador} comprou 6 cartas."
-        jogo_atual.ultimo_desafio = None
-        jogo_atual.proximo_turno()
-        jogo_atual.registrar_desafio(nome_jogador, resultado, 6)
-        await manager.enviar_mensagem(f"⚖️ {resultado}")
-        return {"resultado": resultado, "cartas_compradas": [str(c) for c in cartas]}
+@app.post("/salas/{sala_id}/desafiar/{nome_jogador}")
+async def desafiar_mais_quatro(nome_jogador: str, sala_id: str = SALA_PADRAO, chave: tuple | None = ChaveIdempotencia):
+    async def acao(jogo_atual):
+        desafio = jogo_atual.desafiar(nome_jogador)
+        resultado = desafio["resultado"]
+        await manager.enviar_mensagem(f"⚖️ {resultado}", sala_id)
+        return {"resultado": resultado, "cartas_compradas": [carta(c) for c in desafio["cartas"]]}
 
+    return await executar_comando(sala_id, chave, acao, erro="Nenhum desafio pendente")
 
 
 @app.post("/nao-desafiar/{nome_jogador}")
-async def nao_desafiar(nome_jogador: str):
-    if not jogo_atual or not jogo_atual.ultimo_desafio:
-        raise HTTPException(status_code=400, detail="Nenhum desafio pendente")
-
-    desafio = jogo_atual.ultimo_desafio
-    if desafio["vitima"].nome != nome_jogador:
-        raise HTTPException(status_code=403, detail="Você não é a vítima do +4")
-
-    # Aplicar a penalidade de 4 cartas
-    cartas = desafio["vitima"].comprar_carta(jogo_atual.baralho, qtd=4)
-    jogo_atual.ultimo_desafio = None
-    jogo_atual.proximo_turno()
-
-    jogo_atual.registrar_log(
-        acao="nao-desafiar",
-        jogador=nome_jogador,
-        detalhes={
-            "comprou": [str(c) for c in cartas],
+@app.post("/salas/{sala_id}/nao-desafiar/{nome_jogador}")
+async def nao_desafiar(nome_jogador: str, sala_id: str = SALA_PADRAO, chave: tuple | None = ChaveIdempotencia):
+    async def acao(jogo_atual):
+        cartas = jogo_atual.nao_desafiar(nome_jogador)
+
+        await manager.enviar_mensagem(
+            f"🟡 {nome_jogador} decidiu não desafiar o +4 e comprou 4 cartas.",
+            sala_id
+        )
+
+        return {
+            "mensagem": f"{nome_jogador} comprou 4 cartas por não desafiar o +4.",
+            "cartas_compradas": [carta(c) for c in cartas],
             "proximo_jogador": jogo_atual.jogador_atual().nome
         }
-    )
 
-    await manager.enviar_mensagem(
-        f"🟡 {nome_jogador} decidiu não desafiar o +4 e comprou 4 cartas."
-    )
+    return await executar_comando(sala_id, chave, acao, erro="Nenhum desafio pendente")
+
+
+# Torneios: as mesas só de bots rodam num pool de processos (UNO_TORNEIO_PROCESSOS,
+# padrão um por núcleo; 0 usa threads deste processo). Cada mesa com humanos
+# vira uma sala; os bots dela jogam sozinhos logo depois de cada comando, e o
+# resultado entra no torneio quando a partida acaba. Torneios encerrados ficam
+# consultáveis por TEMPO_TORNEIO_ENCERRADO segundos e depois são esquecidos.
+
+MAX_PARTICIPANTES_TORNEIO = 10_000
+MAX_RODADAS_TORNEIO = 64
+TEMPO_TORNEIO_ENCERRADO = 60 * 60
+torneios: dict[str, Torneio] = {}
+encerrados: OrderedDict[str, float] = OrderedDict()  # torneio_id -> quando acabou, o mais antigo primeiro
+mesas_de_torneio = {}  # sala_id -> (torneio, mesa, random.Random dos bots)
+executor_torneios = None
+_numeros_torneio = itertools.count(1)
+
+MENSAGENS_BOT = {
+    "comprar": "comprou uma carta",
+    "uno": "declarou UNO!",
+    "desafiar": "desafiou o +4",
+    "nao_desafiar": "não desafiou o +4 e comprou 4 cartas",
+}
+
+class TorneioRequest(BaseModel):
+    participantes: dict[str, str | None] = Field(max_length=MAX_PARTICIPANTES_TORNEIO)  # nome -> política (None = humano)
+    tamanho_mesa: int = 4
+    formato: str = SUICO
+    rodadas: int | None = Field(None, ge=1, le=MAX_RODADAS_TORNEIO)
+    semente: int = 0
+
+def obter_executor_torneios():
+    global executor_torneios
+    processos = int(os.environ.get("UNO_TORNEIO_PROCESSOS", os.cpu_count() or 1))
+    if processos and executor_torneios is None:
+        executor_torneios = ProcessPoolExecutor(max_workers=processos)
+    return executor_torneios if processos else None
+
+async def abrir_mesa_de_torneio(torneio: Torneio, mesa):
+    sala = salas.obter_ou_criar(id_local(f"{torneio.id}-r{mesa.rodada}-m{mesa.numero}"))
+    mesa.sala_id = sala.id
+    mesas_de_torneio[sala.id] = (torneio, mesa, random.Random(mesa.semente))
+
+    async def acao(_):
+        sala.novo_jogo(mesa.nomes)
+
+    await sala.executar(None, acao)
+
+async def avancar_mesa_de_torneio(sala):
+    # Joga a vez dos bots até chegar a um humano; com a partida encerrada,
+    # manda o ranking da mesa para o torneio. Roda dentro da trava da sala, e
+    # cada jogada de bot é uma versão nova, publicada como as dos humanos.
+    torneio, mesa, rng = mesas_de_torneio[sala.id]
+    jogo = sala.jogo
+    while not jogo.encerrado:
+        nome = jogo.jogador_da_vez().nome
+        politica = torneio.participantes[nome]
+        opcoes = jogo.jogadas_validas()
+        if politica is None or not opcoes:
+            break
+        jogada = POLITICAS[politica](jogo, opcoes, rng)
+        resultado = jogo.aplicar(jogada)
+        sala.versao += 1
+        texto = f"jogou {resultado['carta']}" if jogada[0] == "jogar" else MENSAGENS_BOT[jogada[0]]
+        await manager.enviar_mensagem(f"🤖 {nome} {texto}", sala.id)
+        await publicar_versao(sala)
+    if jogo.encerrado:
+        del mesas_de_torneio[sala.id]
+        torneio.registrar(mesa, jogo.resultado())
+        await manager.enviar_mensagem(f"🏁 Mesa encerrada: {', '.join(jogo.resultado())}", sala.id)
+
+async def rodar_torneio(torneio: Torneio, vaga):
+    try:
+        await torneio.executar(obter_executor_torneios(), abrir_mesa_de_torneio)
+    finally:
+        vaga.sair()
+        encerrados[torneio.id] = time.monotonic()
+
+def expurgar_torneios(agora: float):
+    limite = agora - TEMPO_TORNEIO_ENCERRADO
+    while encerrados:
+        torneio_id, quando = next(iter(encerrados.items()))
+        if quando > limite:
+            break
+        del encerrados[torneio_id]
+        torneio = torneios.pop(torneio_id)
+        for mesa in torneio.mesas:
+            mesas_de_torneio.pop(mesa.sala_id, None)
+
+def desistir_mesa_de_torneio(sala):
+    # Sala de mesa de torneio expulsa por ociosidade: a mesa é encerrada com
+    # quem já saiu na frente, depois os bots e por último os humanos que
+    # sumiram (cada grupo por cartas na mão), para a rodada não esperar para sempre
+    item = mesas_de_torneio.pop(sala.id, None)
+    if item is None:
+        return
+    torneio, mesa, _ = item
+    jogo = sala.jogo
+    if jogo is None:
+        ranking = sorted(mesa.nomes, key=torneio.humano)
+    else:
+        restantes = sorted((j for j in jogo.jogadores if j.nome not in jogo.vencedores),
+                           key=lambda j: (torneio.humano(j.nome), len(j.mao)))
+        ranking = jogo.vencedores + [j.nome for j in restantes]
+    torneio.registrar(mesa, ranking)
+
+salas.ao_expulsar = desistir_mesa_de_torneio
+
+@app.post("/torneios")
+async def criar_torneio(pedido: TorneioRequest):
+    expurgar_torneios(time.monotonic())
+    try:
+        torneio = Torneio(pedido.participantes, pedido.tamanho_mesa, pedido.formato, pedido.rodadas, pedido.semente)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    vaga = limites.torneios
+    if await vaga.entrar():
+        if metricas.ativo:
+            rejeitadas.inc("torneios")
+        raise HTTPException(status_code=503, detail="Torneios demais em andamento: tente de novo mais tarde",
+                            headers={"Retry-After": "30"})
+    torneio.id = id_local(f"t{next(_numeros_torneio)}")
+    torneios[torneio.id] = torneio
+    torneio.tarefa = asyncio.create_task(rodar_torneio(torneio, vaga))
+    return {"torneio": torneio.id, **torneio.resumo()}
+
+def buscar_torneio(torneio_id: str) -> Torneio:
+    expurgar_torneios(time.monotonic())
+    torneio = torneios.get(torneio_id)
+    if not torneio:
+        raise HTTPException(status_code=404, detail="Torneio não encontrado")
+    return torneio
+
+@app.get("/torneios/{torneio_id}")
+async def ver_torneio(torneio_id: str, inicio: int = Query(0, ge=0), limite: int = Query(50, ge=1, le=1000)):
+    torneio = buscar_torneio(torneio_id)
+    return {
+        "torneio": torneio_id,
+        **torneio.resumo(),
+        "classificacao": torneio.classificacao.pagina(inicio, limite)
+    }
 
+@app.get("/torneios/{torneio_id}/jogadores/{nome}")
+async def jogador_no_torneio(torneio_id: str, nome: str):
+    torneio = buscar_torneio(torneio_id)
+    classificacao = torneio.classificacao
+    if nome not in classificacao.pontos:
+        raise HTTPException(status_code=404, detail="Jogador não está no torneio")
+    mesa = next((m for m in torneio.mesas if nome in m.nomes and m.ranking is None), None)
     return {
-        "mensagem": f"{nome_jogador} comprou 4 cartas por não desafiar o +4.",
-        "cartas_compradas": [str(c) for c in cartas],
-        "proximo_jogador": jogo_atual.jogador_atual().nome
+        "posicao": classificacao.posicao(nome),
+        "pontos": classificacao.pontos[nome],
+        "vitorias": classificacao.vitorias[nome],
+        "partidas": classificacao.partidas[nome],
+        "sala": mesa.sala_id if mesa else None  # Onde jogar a rodada atual (mesas com humanos)
     }
 
+def mensagem_estado(sala_id: str, jogador: str | None) -> dict:
+    # "seq" é o da última mensagem transmitida: o cliente retoma a partir dele
+    sala = salas.obter(sala_id)
+    if sala and sala.jogo:
+        mensagem = sala.sincronizador.estado_completo(sala.jogo, sala.versao, jogador)
+    else:
+        mensagem = {"tipo": "estado", "versao": sala.versao if sala else 0, "publico": None}
+    return {**mensagem, "seq": manager.seq_atual(sala_id)}
+
+async def enviar_estado(websocket: WebSocket, sala_id: str, jogador: str | None, protocolo: str):
+    if trabalhadores.local(sala_id):
+        mensagem = mensagem_estado(sala_id, jogador)
+    else:
+        # A sala vive em outro trabalhador: o estado vem dele pelo barramento
+        try:
+            mensagem = await trabalhadores.barramento.pedir(
+                trabalhadores.dono(sala_id), {"tipo": "estado", "sala": sala_id, "jogador": jogador}
+            )
+        except TrabalhadorIndisponivel:
+            return
+    manager.enviar_para(websocket, codificar(protocolo, mensagem), sala_id)
+
+async def retomar(websocket: WebSocket, sala_id: str, jogador: str | None, protocolo: str, desde: int):
+    # Reconexão: só as mensagens perdidas desde o seq, ou o estado completo se
+    # elas já saíram do Replay
+    if trabalhadores.local(sala_id):
+        mensagens = manager.perdidas(sala_id, protocolo, jogador, desde)
+    else:
+        try:
+            resposta = await trabalhadores.barramento.pedir(trabalhadores.dono(sala_id), {
+                "tipo": "retomada", "sala": sala_id, "jogador": jogador, "protocolo": protocolo, "desde": desde
+            })
+        except TrabalhadorIndisponivel:
+            return
+        mensagens = resposta["mensagens"]
+        if mensagens is not None and protocolo == PROTOCOLO_BINARIO:
+            mensagens = [base64.b64decode(m) for m in mensagens]
+    if mensagens is None:
+        await enviar_estado(websocket, sala_id, jogador, protocolo)
+        return
+    for mensagem in mensagens:
+        manager.enviar_para(websocket, mensagem, sala_id)
+
+async def atender_pedido(pedido: dict) -> dict:
+    # Pedidos de outros trabalhadores para as salas deste
+    if pedido["tipo"] == "estado":
+        return mensagem_estado(pedido["sala"], pedido["jogador"])
+    if pedido["tipo"] == "retomada":
+        mensagens = manager.perdidas(pedido["sala"], pedido["protocolo"], pedido["jogador"], pedido["desde"])
+        if mensagens is not None and pedido["protocolo"] == PROTOCOLO_BINARIO:
+            mensagens = [base64.b64encode(m).decode() for m in mensagens]
+        return {"mensagens": mensagens}
+    return await executar_http(app, pedido)
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.conectar(websocket)
+@app.websocket("/salas/{sala_id}/ws")
+async def websocket_endpoint(websocket: WebSocket, sala_id: str = SALA_PADRAO,
+                             protocolo: str = Query(PROTOCOLO_TEXTO, pattern="^(texto|delta|binario)$"),
+                             jogador: str | None = None, desde: int | None = None):
+    # desde: último seq recebido antes de a conexão cair (protocolos delta e
+    # binário); sem ele, a conexão começa pelo estado completo
+    await manager.conectar(websocket, sala_id, protocolo, jogador)
+    if protocolo != PROTOCOLO_TEXTO and desde is not None:
+        await retomar(websocket, sala_id, jogador, protocolo, desde)
+    elif protocolo != PROTOCOLO_TEXTO:
+        await enviar_estado(websocket, sala_id, jogador, protocolo)
     try:
         while True:
-            # Manter a conexão ativa (poderia ler mensagens se quisesse)
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.desconectar(websocket)
+            # No protocolo texto as mensagens do cliente são ignoradas; no delta
+            # e no binário o cliente pode pedir o estado completo com
+            # {"tipo": "resync"} (em JSON ou MessagePack)
+            recebida = await websocket.receive()
+            if recebida["type"] == "websocket.disconnect":
+                break
+            if protocolo != PROTOCOLO_TEXTO and pedido_resync(recebida.get("text"), recebida.get("bytes")):
+                await enviar_estado(websocket, sala_id, jogador, protocolo)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: o servidor já fechou o socket (cliente lento ou morto)
+        pass
+    finally:
+        manager.desconectar(websocket, sala_id)
+
+def pedido_resync(texto: str | None, dados: bytes | None = None) -> bool:
+    try:
+        pedido = desempacotar(dados) if dados is not None else json.loads(texto)
+        return pedido.get("tipo") == "resync"
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+# Métricas no formato do Prometheus e perfilador por amostragem. Os dois podem
+# ser ligados e desligados com o servidor rodando. Os interruptores e as
+# pilhas do perfilador são administrativos: com UNO_ADMIN_TOKEN, exigem "Authorization: Bearer <token>";
+# sem ele, só aceitam chamadas da própria máquina.
+TOKEN_ADMIN = os.environ.get("UNO_ADMIN_TOKEN")
+LOCAIS = {"127.0.0.1", "::1"}
+
+def exigir_admin(request: Request, authorization: str | None = Header(None)):
+    if TOKEN_ADMIN:
+        if not hmac.compare_digest(authorization or "", f"Bearer {TOKEN_ADMIN}"):
+            raise HTTPException(status_code=401, detail="Token de administração inválido",
+                                headers={"WWW-Authenticate": "Bearer"})
+    elif not request.client or request.client.host not in LOCAIS:
+        raise HTTPException(status_code=403, detail="Só disponível localmente (ou configure UNO_ADMIN_TOKEN)")
+
+@app.get("/metrics")
+def exportar_metricas():
+    if not metricas.ativo:
+        raise HTTPException(status_code=404, detail="Métricas desligadas")
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+@app.post("/metrics/ativo", dependencies=[Depends(exigir_admin)])
+def alternar_metricas(ligado: bool):
+    metricas.ativo = ligado
+    return {"ativo": metricas.ativo}
+
+@app.post("/metrics/perfil", dependencies=[Depends(exigir_admin)])
+async def alternar_perfil(ligado: bool, intervalo: float = Query(0.005, gt=0, le=1), limpar: bool = False):
+    # async: roda na thread do laço de eventos, que é a que será amostrada
+    if limpar:
+        amostrador.limpar()
+    if ligado:
+        amostrador.iniciar(intervalo)
+    else:
+        amostrador.parar()
+    return {"ativo": amostrador.ativo, "amostras": amostrador.amostras}
+
+@app.get("/metrics/perfil", dependencies=[Depends(exigir_admin)])
+def perfil():
+    # Pilhas no formato "collapsed" (flamegraph.pl, speedscope)
+    return PlainTextResponse(amostrador.exportar())
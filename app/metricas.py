@@ -0,0 +1,225 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# Métricas no formato texto do Prometheus, sem dependências externas.
+#
+# Os pontos instrumentados (middleware HTTP, distribuição do /ws, reciclagem
+# do baralho) só fazem algo quando metricas.ativo é verdadeiro; desligado, o
+# custo é uma checagem de atributo. Medidores (gauges) são funções chamadas
+# apenas na hora da coleta, então não custam nada fora do /metrics.
+#
+# UNO_METRICAS=0 sobe o servidor com as métricas desligadas.
+
+LIMITES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes, valores, extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.valores = Counter()  # tupla de rótulos -> total
+
+    def inc(self, *rotulos, valor=1):
+        self.valores[rotulos] += valor
+
+    def linhas(self):
+        for rotulos, valor in sorted(self.valores.items()):
+            yield f"{self.nome}{_rotulos(self.rotulos, rotulos)} {_numero(valor)}"
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos=(), limites=LIMITES_SEGUNDOS):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(limites)
+        self.series = {}  # tupla de rótulos -> [contagens por faixa..., soma]
+
+    def observar(self, valor: float, *rotulos):
+        serie = self.series.get(rotulos)
+        if serie is None:
+            serie = self.series[rotulos] = [0] * (len(self.limites) + 2)
+        serie[bisect_left(self.limites, valor)] += 1
+        serie[-1] += valor
+
+    def linhas(self):
+        for rotulos, serie in sorted(self.series.items()):
+            acumulado = 0
+            for limite, quantidade in zip(self.limites + (float("inf"),), serie):
+                acumulado += quantidade
+                faixa = _rotulos(self.rotulos, rotulos, f'le="{_numero(limite)}"')
+                yield f"{self.nome}_bucket{faixa} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {_numero(serie[-1])}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, rotulos)} {acumulado}"
+
+
+class Medidor:
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, funcao):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao  # Chamada na coleta; devolve um número
+
+    def linhas(self):
+        yield f"{self.nome} {_numero(self.funcao())}"
+
+
+class RegistroMetricas:
+    def __init__(self, ativo: bool = True):
+        self.ativo = ativo
+        self.metricas = {}
+
+    def _registrar(self, metrica):
+        if metrica.nome in self.metricas:
+            raise ValueError(f"Métrica já registrada: {metrica.nome}")
+        self.metricas[metrica.nome] = metrica
+        return metrica
+
+    def contador(self, nome: str, ajuda: str, rotulos=()) -> Contador:
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def histograma(self, nome: str, ajuda: str, rotulos=(), limites=LIMITES_SEGUNDOS) -> Histograma:
+        return self._registrar(Histograma(nome, ajuda, rotulos, limites))
+
+    def medidor(self, nome: str, ajuda: str, funcao) -> Medidor:
+        return self._registrar(Medidor(nome, ajuda, funcao))
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in self.metricas.values():
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.linhas())
+        return "\n".join(linhas) + "\n"
+
+
+metricas = RegistroMetricas(ativo=os.environ.get("UNO_METRICAS", "1") != "0")
+
+requisicoes = metricas.contador(
+    "uno_http_requisicoes_total", "Requisições HTTP atendidas", ("metodo", "rota", "status"))
+latencia = metricas.histograma(
+    "uno_http_latencia_segundos", "Tempo de resposta das rotas HTTP", ("metodo", "rota"))
+distribuicao = metricas.histograma(
+    "uno_ws_distribuicao_segundos", "Tempo para repassar uma mensagem às conexões da sala")
+destinatarios = metricas.contador(
+    "uno_ws_mensagens_enfileiradas_total", "Mensagens colocadas na fila de envio das conexões")
+derrubadas = metricas.contador(
+    "uno_ws_conexoes_derrubadas_total", "Conexões derrubadas por fila cheia ou falha no envio", ("motivo",))
+retomadas = metricas.contador(
+    "uno_ws_retomadas_total", "Reconexões com ?desde=, pelo que o cliente recebeu", ("resultado",))
+rejeitadas = metricas.contador(
+    "uno_limites_rejeitadas_total", "Requisições recusadas por limite (jogador, sala, fila, espera)", ("limite",))
+reciclagens = metricas.contador(
+    "uno_baralho_reciclagens_total", "Vezes que a pilha de descarte voltou a ser baralho")
+
+
+# Middleware ASGI (mais barato que BaseHTTPMiddleware): latência e contagem
+# por rota, usando o caminho declarado da rota para não explodir a
+# cardinalidade com nomes de sala ou de jogador.
+class MiddlewareMetricas:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metricas.ativo:
+            return await self.app(scope, receive, send)
+
+        status = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            rota = getattr(scope.get("route"), "path", "desconhecida")
+            latencia.observar(time.perf_counter() - inicio, scope["method"], rota)
+            requisicoes.inc(scope["method"], rota, str(status))
+
+
+# Perfilador por amostragem: uma thread olha de tempos em tempos a pilha da
+# thread principal (a do laço de eventos) e conta as pilhas vistas, no
+# formato "collapsed" usado por flamegraph.pl e speedscope. Liga e desliga em
+# tempo de execução.
+class Amostrador:
+    def __init__(self, intervalo: float = 0.005, profundidade: int = 64):
+        self.intervalo = intervalo
+        self.profundidade = profundidade
+        self.pilhas = Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._alvo = threading.main_thread().ident
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self, intervalo: float | None = None, alvo: int | None = None):
+        if self.ativo:
+            return
+        if intervalo:
+            self.intervalo = intervalo
+        self._alvo = alvo or threading.get_ident()
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._amostrar, name="amostrador", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join()
+        self._thread = None
+
+    def limpar(self):
+        self.pilhas.clear()
+        self.amostras = 0
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self._alvo)
+            pilha = []
+            while quadro is not None and len(pilha) < self.profundidade:
+                codigo = quadro.f_code
+                pilha.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                quadro = quadro.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+                self.amostras += 1
+
+    def exportar(self) -> str:
+        return "".join(f"{pilha} {quantidade}\n" for pilha, quantidade in self.pilhas.most_common())
+
+
+amostrador = Amostrador()
@@ -0,0 +1,63 @@
+import json
+import sqlite3
+
+# Persistência das salas em SQLite (modo WAL), no estilo event sourcing: cada
+# comando aceito vira um evento, e de tempos em tempos a sala grava um snapshot
+# binário (app.snapshot) e apaga os eventos que ele já cobre. Para recuperar
+# uma sala basta restaurar o último snapshot e reaplicar os eventos seguintes.
+
+
+class ArmazemEventos:
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho, isolation_level=None, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                sala TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                dados BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS eventos (
+                sala TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                comando TEXT NOT NULL,
+                PRIMARY KEY (sala, seq)
+            ) WITHOUT ROWID;
+        """)
+
+    def fechar(self):
+        self.conexao.close()
+
+    def registrar(self, sala_id: str, seq: int, comando):
+        self.conexao.execute(
+            "INSERT OR REPLACE INTO eventos (sala, seq, comando) VALUES (?, ?, ?)",
+            (sala_id, seq, json.dumps(comando, ensure_ascii=False))
+        )
+
+    def salvar_snapshot(self, sala_id: str, seq: int, dados: bytes):
+        with self.conexao:
+            self.conexao.execute("BEGIN")
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO snapshots (sala, seq, dados) VALUES (?, ?, ?)",
+                (sala_id, seq, dados)
+            )
+            self.conexao.execute("DELETE FROM eventos WHERE sala = ? AND seq < ?", (sala_id, seq))
+
+    def remover_sala(self, sala_id: str):
+        with self.conexao:
+            self.conexao.execute("BEGIN")
+            self.conexao.execute("DELETE FROM snapshots WHERE sala = ?", (sala_id,))
+            self.conexao.execute("DELETE FROM eventos WHERE sala = ?", (sala_id,))
+
+    def carregar(self):
+        # Gera (sala_id, seq_do_snapshot, dados, [comandos depois do snapshot])
+        eventos = {}
+        for sala_id, seq, comando in self.conexao.execute(
+            "SELECT e.sala, e.seq, e.comando FROM eventos e JOIN snapshots s "
+            "ON s.sala = e.sala AND e.seq >= s.seq ORDER BY e.sala, e.seq"
+        ):
+            eventos.setdefault(sala_id, []).append(tuple(json.loads(comando)))
+        for sala_id, seq, dados in self.conexao.execute("SELECT sala, seq, dados FROM snapshots"):
+            yield sala_id, seq, dados, eventos.get(sala_id, [])
@@ -0,0 +1,226 @@
+import time
+
+from app.game import BARALHO_COMPLETO, CARTAS, CORES, COR_CORINGA, JOGAVEIS_SOBRE, Carta
+
+import numpy as np
+
+# Chance de vitória de cada jogador por Monte Carlo: milhares de partidas
+# jogadas até o fim, todas ao mesmo tempo, com mãos e baralhos em arrays do
+# NumPy (uma linha por partida, contagem por código de carta).
+#
+# Só se usa o que o observador sabe: topo, pilha de descarte, tamanho das mãos
+# e, se houver um jogador, a mão dele. As outras mãos e o baralho são sorteados
+# a cada partida entre as cartas que o observador não vê.
+#
+# As partidas simuladas seguem as regras do JogoUNO com um bot simples: joga
+# uma carta válida quase ao acaso (coringas com a cor que mais tem na mão), compra
+# quando não tem e joga a comprada se puder; ninguém desafia +4 nem esquece o
+# UNO. Quando o baralho sorteado acaba, as compras seguem de um baralho
+# completo embaralhado, aproximando a reciclagem da pilha de descarte.
+
+NORMAL, MAIS_DOIS, PULAR, INVERTER, CORINGA, MAIS_QUATRO = range(6)
+_EFEITOS = {"+2": MAIS_DOIS, "pular": PULAR, "inverter": INVERTER, "coringa": CORINGA, "+4": MAIS_QUATRO}
+
+_tabelas = None
+_BITS = _JOGAVEIS_BITS = _CHEIO = None  # Máscaras de bits por código (preenchidas com as tabelas)
+
+
+def _preparar_tabelas():
+    global _tabelas, _BITS, _JOGAVEIS_BITS, _CHEIO
+    if _tabelas is None:
+        n = len(CARTAS)
+        jogavel = np.array([[(JOGAVEIS_SOBRE[t] >> c) & 1 for c in range(n)] for t in range(n)], dtype=bool)
+        efeito = np.array([_EFEITOS.get(c.valor, NORMAL) for c in CARTAS], dtype=np.int8)
+        # Coringa jogado volta a ser preto na contagem de cartas
+        preto = np.array([Carta(COR_CORINGA, c.valor).codigo if c.coringa else c.codigo for c in CARTAS])
+        cor = np.zeros((n, len(CORES)), dtype=np.int16)  # Uma coluna por cor, só cartas coloridas
+        for c in CARTAS:
+            if not c.coringa:
+                cor[c.codigo, c.cor_id] = 1
+        colorido = np.array([[Carta(cor_nome, c.valor).codigo if c.coringa else c.codigo for c in CARTAS]
+                             for cor_nome in CORES])  # colorido[cor, código] -> coringa com a cor
+        completo = np.bincount([c.codigo for c in BARALHO_COMPLETO], minlength=n)
+        _tabelas = jogavel, efeito, preto, cor, colorido, completo
+        _BITS = np.left_shift(np.uint64(1), np.arange(n, dtype=np.uint64))
+        _JOGAVEIS_BITS = np.array(JOGAVEIS_SOBRE, dtype=np.uint64)
+        _CHEIO = np.uint64((1 << n) - 1)
+    return _tabelas
+
+
+class EstadoObservado:
+    # Cópia do que o observador sabe, tirada de forma síncrona do JogoUNO para
+    # que a simulação possa rodar fora do laço de eventos
+    def __init__(self, jogo, jogador: str | None = None):
+        jogavel, efeito, preto, cor, colorido, completo = _preparar_tabelas()
+        self.nomes = [j.nome for j in jogo.jogadores]
+        self.tamanhos = np.array([len(j.mao) for j in jogo.jogadores], dtype=np.int32)
+        self.turno = jogo.jogadores.index(jogo.jogador_atual())
+        self.direcao = jogo.direcao
+        self.topo = jogo.pilha_descarte[-1].codigo
+        desafio = jogo.ultimo_desafio
+        self.vitima = self.nomes.index(desafio["vitima"].nome) if desafio else None
+
+        self.conhecido = None  # Índice do observador entre os jogadores
+        conhecida = np.zeros(len(CARTAS), dtype=np.int32)
+        if jogador is not None:
+            observador = jogo.buscar_jogador(jogador)
+            self.conhecido = self.nomes.index(observador.nome)
+            conhecida = np.array(observador.mao.contagem, dtype=np.int32)
+        self.mao_conhecida = conhecida
+
+        # Cartas que o observador não vê: tudo menos a pilha e a própria mão
+        total = completo * jogo.baralho.copias
+        pilha = np.bincount(preto[[c.codigo for c in jogo.pilha_descarte]], minlength=len(CARTAS))
+        invisiveis = np.maximum(total - pilha - conhecida, 0)
+        self.invisiveis = np.repeat(np.arange(len(CARTAS)), invisiveis)
+        self.completo = np.repeat(np.arange(len(CARTAS)), total)
+
+
+def _embaralhadas(cartas, partidas: int, rng):
+    # Uma permutação independente de cartas por linha
+    return rng.permuted(np.broadcast_to(cartas, (partidas, len(cartas))), axis=1)
+
+
+def simular(estado: EstadoObservado, partidas: int = 1000, max_turnos: int = 500, semente=None) -> dict:
+    jogavel, efeito, preto, cor, colorido, _ = _preparar_tabelas()
+    rng = np.random.default_rng(semente)
+    jogadores = len(estado.nomes)
+    if jogadores < 2:
+        return {"partidas": 0, "inconclusivas": 0, "vitorias": [1.0] * jogadores}
+    n_cartas = len(CARTAS)
+
+    # Sorteia as mãos escondidas e o baralho de cada partida
+    sorteadas = _embaralhadas(estado.invisiveis, partidas, rng)
+    donos = np.concatenate([
+        np.full(estado.tamanhos[p], p) for p in range(jogadores) if p != estado.conhecido
+    ] or [np.zeros(0, dtype=np.int64)]).astype(np.int64)
+    distribuidas = min(len(donos), sorteadas.shape[1])
+    donos = donos[:distribuidas]
+    linhas = np.arange(partidas)[:, None]
+    indice = ((linhas * jogadores + donos[None, :]) * n_cartas + sorteadas[:, :distribuidas]).ravel()
+    maos = np.bincount(indice, minlength=partidas * jogadores * n_cartas)
+    maos = maos.reshape(partidas, jogadores, n_cartas).astype(np.int16)
+    if estado.conhecido is not None:
+        maos[:, estado.conhecido] = estado.mao_conhecida
+    baralho = np.concatenate([sorteadas[:, distribuidas:], _embaralhadas(estado.completo, partidas, rng)], axis=1)
+    tamanho_baralho = baralho.shape[1]
+
+    # Como na Mao do jogo, cada mão também vira uma máscara de bits dos códigos
+    # presentes: achar as cartas jogáveis custa um AND por partida
+    bits = np.packbits(maos > 0, axis=2, bitorder="little")  # 62 bits -> 8 bytes por mão
+    presentes = np.ascontiguousarray(bits).view("<u8")[:, :, 0].astype(np.uint64)
+    tamanhos = np.repeat(estado.tamanhos[None, :], partidas, axis=0)
+    topo = np.full(partidas, estado.topo)
+    turno = np.full(partidas, estado.turno)
+    direcao = np.full(partidas, estado.direcao)
+    proxima_compra = np.zeros(partidas, dtype=np.int64)
+    partida = np.arange(partidas)  # Índice original de cada linha ainda em jogo
+    vencedor = np.full(partidas, -1)
+
+    def comprar(linhas, quem, quantidade):
+        for _ in range(quantidade):
+            cartas = baralho[linhas, proxima_compra[linhas] % tamanho_baralho]
+            proxima_compra[linhas] += 1
+            maos[linhas, quem, cartas] += 1
+            presentes[linhas, quem] |= _BITS[cartas]
+            tamanhos[linhas, quem] += 1
+
+    if estado.vitima is not None:
+        # +4 pendente: a vítima não desafia, compra 4 e joga em seguida
+        comprar(np.arange(partidas), np.full(partidas, estado.vitima), 4)
+        turno[:] = estado.vitima
+
+    ativas = np.ones(partidas, dtype=bool)
+    for rodada in range(max_turnos):
+        if not ativas.any():
+            break
+        if ativas.sum() * 2 < len(ativas):
+            # Tira do array as partidas já decididas
+            partida, maos, presentes, tamanhos, topo, turno, direcao, proxima_compra, baralho = (
+                v[ativas] for v in (partida, maos, presentes, tamanhos, topo, turno, direcao,
+                                    proxima_compra, baralho)
+            )
+            ativas = np.ones(len(partida), dtype=bool)
+
+        total = len(partida)
+        linhas = np.arange(total)
+        atual = turno
+        jogaveis = presentes[linhas, atual] & _JOGAVEIS_BITS[topo]
+
+        # Carta escolhida: a primeira jogável a partir de uma posição sorteada
+        # (rotação da máscara + bit menos significativo)
+        inicio = rng.integers(0, n_cartas, total, dtype=np.uint64)
+        girada = ((jogaveis >> inicio) | (jogaveis << (np.uint64(n_cartas) - inicio))) & _CHEIO
+        menor = (girada & (~girada + np.uint64(1))).astype(np.float64)
+        tem = jogaveis != 0
+        posicao = np.log2(np.where(tem, menor, 1.0)).astype(np.int64)
+        escolha = (posicao + inicio.astype(np.int64)) % n_cartas
+
+        joga = tem.copy()
+        sem = np.flatnonzero(~tem)
+        if len(sem):
+            comprada = baralho[sem, proxima_compra[sem] % tamanho_baralho]
+            proxima_compra[sem] += 1
+            maos[sem, atual[sem], comprada] += 1
+            presentes[sem, atual[sem]] |= _BITS[comprada]
+            tamanhos[sem, atual[sem]] += 1
+            escolha[sem] = comprada
+            joga[sem] = jogavel[topo[sem], comprada]
+        joga &= ativas
+
+        passo = np.ones(total, dtype=np.int64)
+        quem_joga = np.flatnonzero(joga)
+        carta = escolha[quem_joga]
+        jogador = atual[quem_joga]
+        maos[quem_joga, jogador, carta] -= 1
+        acabou = maos[quem_joga, jogador, carta] == 0
+        presentes[quem_joga[acabou], jogador[acabou]] &= ~_BITS[carta[acabou]]
+        tamanhos[quem_joga, jogador] -= 1
+
+        tipo = efeito[carta]
+        novo_topo = carta.copy()
+        coringas = tipo >= CORINGA
+        if coringas.any():
+            # Cor que mais aparece na mão de quem jogou
+            quem = quem_joga[coringas]
+            cores = maos[quem, jogador[coringas]] @ cor
+            novo_topo[coringas] = colorido[np.argmax(cores, axis=1), carta[coringas]]
+        topo[quem_joga] = novo_topo
+
+        inverte = quem_joga[tipo == INVERTER]
+        direcao[inverte] *= -1
+        if jogadores == 2:
+            passo[inverte] = 2
+        passo[quem_joga[tipo == PULAR]] = 2
+        for valor, quantidade, pula in ((MAIS_DOIS, 2, 2), (MAIS_QUATRO, 4, 1)):
+            afetadas = quem_joga[tipo == valor]
+            if len(afetadas):
+                vitima = (atual[afetadas] + direcao[afetadas]) % jogadores
+                comprar(afetadas, vitima, quantidade)
+                passo[afetadas] = pula
+        turno = (atual + direcao * passo) % jogadores
+
+        venceu = quem_joga[tamanhos[quem_joga, jogador] == 0]
+        if len(venceu):
+            vencedor[partida[venceu]] = atual[venceu]
+            ativas[venceu] = False
+
+    decididas = vencedor[vencedor >= 0]
+    vitorias = np.bincount(decididas, minlength=jogadores) / max(len(decididas), 1)
+    return {
+        "partidas": partidas,
+        "inconclusivas": int(partidas - len(decididas)),
+        "vitorias": [round(float(v), 4) for v in vitorias],
+    }
+
+
+def estimar(jogo, jogador: str | None = None, partidas: int = 1000, semente=None) -> dict:
+    inicio = time.perf_counter()
+    estado = EstadoObservado(jogo, jogador)
+    resultado = simular(estado, partidas, semente=semente)
+    return {
+        "probabilidades": dict(zip(estado.nomes, resultado["vitorias"])),
+        "partidas": resultado["partidas"],
+        "inconclusivas": resultado["inconclusivas"],
+        "ms": round((time.perf_counter() - inicio) * 1000, 1),
+    }
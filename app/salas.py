@@ -0,0 +1,204 @@
+import asyncio
+import time
+from collections import OrderedDict
+from functools import partial
+from app.game import JogoUNO, JogadaInvalida
+from app import snapshot
+from app.sincronizacao import Sincronizador
+from app.visoes import CacheVisoes
+
+SALA_PADRAO = "principal"  # Sala usada pelas rotas sem /salas/{sala_id}
+
+
+class LimiteSalasAtingido(Exception):
+    pass
+
+
+# Os comandos de uma sala são executados um de cada vez (trava por sala), e
+# cada resposta fica guardada pela chave de idempotência enviada pelo cliente
+# (com a rota e o jogador, ver app.main.chave_idempotencia): repetir a mesma
+# chave devolve a mesma resposta (ou o mesmo erro) sem jogar de novo. Um jogo
+# novo na sala começa sem nenhuma resposta guardada.
+#
+# Cada comando aceito gera uma nova versão da sala, e ao_mudar (se houver) é
+# chamado ainda dentro da trava, na ordem das versões.
+#
+# Com um armazém (app.persistencia) cada comando aceito pelo jogo é gravado
+# como evento, com um snapshot a cada INTERVALO_SNAPSHOT comandos.
+#
+# Com um escritor de auditoria (app.auditoria) cada evento do histórico vai
+# para o log em segundo plano; se a fila do log encher, executar espera ela
+# esvaziar antes de aceitar o próximo comando.
+class Sala:
+    MAX_RESPOSTAS = 256  # Chaves de idempotência lembradas por sala
+    INTERVALO_SNAPSHOT = 25
+
+    def __init__(self, sala_id: str, armazem=None, ao_mudar=None, auditoria=None):
+        self.id = sala_id
+        self.jogo = None
+        self.ultimo_acesso = time.monotonic()
+        self.trava = asyncio.Lock()
+        self.respostas: OrderedDict[tuple, object] = OrderedDict()
+        self.armazem = armazem
+        self.seq = 0  # Comandos aplicados desde o início do jogo atual
+        self.versao = 0  # Cresce a cada mudança de estado, atravessando jogos
+        self.sincronizador = Sincronizador()
+        self.visoes = CacheVisoes()  # Respostas do GET /estado da versão atual
+        self.ao_mudar = ao_mudar  # async ao_mudar(sala)
+        self.auditoria = auditoria
+
+    def novo_jogo(self, nomes_jogadores) -> JogoUNO:
+        self.jogo = JogoUNO(nomes_jogadores)
+        self.seq = 0
+        self.respostas.clear()  # As chaves de idempotência valem dentro de um jogo
+        if self.armazem:
+            self.armazem.remover_sala(self.id)
+            self.salvar_snapshot()
+        if self.auditoria:
+            self.auditoria.novo_jogo(self.id)
+        self._acompanhar()
+        return self.jogo
+
+    def restaurar(self, seq: int, dados: bytes, comandos):
+        self.jogo = snapshot.restaurar(dados)
+        for comando in comandos:
+            self.jogo.executar_comando(comando)
+        self.seq = seq + len(comandos)
+        self._acompanhar()
+
+    def salvar_snapshot(self):
+        self.armazem.salvar_snapshot(self.id, self.seq, snapshot.serializar(self.jogo))
+
+    def _acompanhar(self):
+        self.jogo.ouvinte_comandos = self._persistir if self.armazem else None
+        self.jogo.historico.ouvinte = partial(self.auditoria.registrar, self.id) if self.auditoria else None
+
+    def _persistir(self, comando):
+        self.armazem.registrar(self.id, self.seq, comando)
+        self.seq += 1
+        if self.seq % self.INTERVALO_SNAPSHOT == 0:
+            self.salvar_snapshot()
+
+    def _resposta_guardada(self, chave):
+        resposta = self.respostas.get(chave)
+        if isinstance(resposta, JogadaInvalida):
+            raise resposta
+        return resposta
+
+    def _guardar(self, chave, resposta):
+        self.respostas[chave] = resposta
+        if len(self.respostas) > self.MAX_RESPOSTAS:
+            self.respostas.popitem(last=False)
+
+    async def executar(self, chave: tuple | None, acao):
+        # acao: função assíncrona que recebe o jogo atual e devolve a resposta
+        if chave is not None and chave in self.respostas:
+            return self._resposta_guardada(chave)
+        if self.auditoria:
+            await self.auditoria.aguardar_espaco()
+        async with self.trava:
+            if chave is not None and chave in self.respostas:
+                return self._resposta_guardada(chave)
+            try:
+                resposta = await acao(self.jogo)
+            except JogadaInvalida as erro:
+                if chave is not None:
+                    self._guardar(chave, erro)
+                raise
+            if chave is not None:
+                self._guardar(chave, resposta)
+            self.versao += 1
+            if self.ao_mudar:
+                await self.ao_mudar(self)
+            return resposta
+
+    def __repr__(self):
+        return f"Sala({self.id}, Jogo: {self.jogo})"
+
+
+# Registro de salas por id. As salas ficam em ordem de último acesso (a mais
+# antiga primeiro), então a expulsão das ociosas só olha o começo do dicionário.
+class GerenciadorSalas:
+    def __init__(self, max_salas: int = 10_000, tempo_ocioso: float = 30 * 60, armazem=None):
+        self.max_salas = max_salas
+        self.tempo_ocioso = tempo_ocioso  # Segundos sem acesso até a sala ser removida
+        self.salas: OrderedDict[str, Sala] = OrderedDict()
+        self.armazem = armazem  # ArmazemEventos opcional para sobreviver a reinícios
+        self.ao_mudar = None  # Repassado às salas (ver Sala)
+        self.ao_expulsar = None  # ao_expulsar(sala), para cada sala removida por ociosidade
+        self.auditoria = None  # EscritorAuditoria opcional, também repassado
+
+    def __len__(self):
+        return len(self.salas)
+
+    def __contains__(self, sala_id: str):
+        return sala_id in self.salas
+
+    def _tocar(self, sala: Sala, agora: float):
+        sala.ultimo_acesso = agora
+        self.salas.move_to_end(sala.id)
+
+    def obter(self, sala_id: str):
+        agora = time.monotonic()
+        self.expurgar_ociosas(agora)
+        sala = self.salas.get(sala_id)
+        if sala:
+            self._tocar(sala, agora)
+        return sala
+
+    def obter_ou_criar(self, sala_id: str) -> Sala:
+        sala = self.obter(sala_id)
+        if sala:
+            return sala
+        if len(self.salas) >= self.max_salas:
+            raise LimiteSalasAtingido(f"Limite de {self.max_salas} salas atingido")
+        sala = Sala(sala_id, self.armazem, self.ao_mudar, self.auditoria)
+        self.salas[sala_id] = sala
+        return sala
+
+    def novo_jogo(self, sala_id: str, nomes_jogadores) -> JogoUNO:
+        return self.obter_ou_criar(sala_id).novo_jogo(nomes_jogadores)
+
+    def remover(self, sala_id: str):
+        if self.armazem:
+            self.armazem.remover_sala(sala_id)
+        return self.salas.pop(sala_id, None)
+
+    def recuperar(self, filtro=None) -> int:
+        # Reconstrói as salas gravadas no armazém (na subida do servidor); com
+        # vários trabalhadores, filtro(sala_id) escolhe só as deste processo
+        recuperadas = 0
+        for sala_id, seq, dados, comandos in self.armazem.carregar():
+            if filtro and not filtro(sala_id):
+                continue
+            sala = Sala(sala_id, self.armazem, self.ao_mudar, self.auditoria)
+            sala.restaurar(seq, dados, comandos)
+            self.salas[sala_id] = sala
+            recuperadas += 1
+        return recuperadas
+
+    def salvar_snapshots(self):
+        # Snapshot de todas as salas (no desligamento), para recuperar mais rápido
+        for sala in self.salas.values():
+            if sala.jogo:
+                sala.salvar_snapshot()
+
+    def expurgar_ociosas(self, agora: float | None = None) -> int:
+        if agora is None:
+            agora = time.monotonic()
+        limite = agora - self.tempo_ocioso
+        removidas = 0
+        while self.salas:
+            sala = next(iter(self.salas.values()))
+            if sala.ultimo_acesso > limite:
+                break
+            self.salas.popitem(last=False)
+            if self.armazem:
+                self.armazem.remover_sala(sala.id)
+            if self.ao_expulsar:
+                self.ao_expulsar(sala)
+            removidas += 1
+        return removidas
+
+
+salas = GerenciadorSalas()
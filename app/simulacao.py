@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from app.game import JogoUNO, CORES
+
+# Simulação de partidas sem servidor, usando o motor do JogoUNO
+# (jogadas_validas / aplicar / resultado) com bots plugáveis.
+#
+#   python -m app.simulacao --partidas 100000 --jogadores 4 --politicas gulosa aleatoria
+
+
+# ----------------------------------------------------------------------
+# Políticas de bot: recebem o jogo, as jogadas válidas e um random.Random
+# e devolvem uma das jogadas.
+# ----------------------------------------------------------------------
+
+def politica_aleatoria(jogo, jogadas, rng):
+    if ("uno",) in jogadas:
+        return ("uno",)
+    cartas = [j for j in jogadas if j[0] == "jogar"]
+    if cartas:
+        return rng.choice(cartas)
+    return rng.choice(jogadas)
+
+
+_PRIORIDADE = {"+2": 0, "pular": 1, "inverter": 2, "coringa": 14, "+4": 15}
+
+
+def politica_gulosa(jogo, jogadas, rng):
+    # Declara UNO, joga cartas de ação antes, guarda os coringas para o fim e
+    # escolhe a cor que mais aparece na mão
+    if ("uno",) in jogadas:
+        return ("uno",)
+    if jogadas[0][0] in ("desafiar", "nao_desafiar"):
+        # Só arrisca o desafio quando quem jogou o +4 está perto de vencer
+        quem_jogou = jogo.ultimo_desafio["jogador_que_jogou"]
+        return ("desafiar",) if len(quem_jogou.mao) <= 2 else ("nao_desafiar",)
+
+    mao = jogo.jogador_atual().mao
+    melhor = None
+    melhor_prioridade = None
+    for jogada in jogadas:
+        if jogada[0] != "jogar":
+            continue
+        carta = mao[jogada[1]]
+        prioridade = _PRIORIDADE.get(carta.valor, 3)
+        if melhor is None or prioridade < melhor_prioridade:
+            melhor, melhor_prioridade = jogada, prioridade
+    if melhor is None:
+        return ("comprar",)
+    if mao[melhor[1]].coringa:
+        contagem = Counter(c.cor for c in mao if not c.coringa)
+        cor = contagem.most_common(1)[0][0] if contagem else rng.choice(CORES)
+        return ("jogar", melhor[1], cor)
+    return melhor
+
+
+POLITICAS = {
+    "aleatoria": politica_aleatoria,
+    "gulosa": politica_gulosa,
+}
+
+
+# ----------------------------------------------------------------------
+# Estatísticas agregadas (somáveis entre processos)
+# ----------------------------------------------------------------------
+
+class Estatisticas:
+    def __init__(self, jogadores: int):
+        self.partidas = 0
+        self.truncadas = 0  # Partidas que passaram do limite de jogadas ou travaram
+        self.jogadas = Counter()  # duração da partida (em jogadas) -> quantidade
+        self.vitorias = [0] * jogadores  # Vitórias (1º lugar) por assento
+        self.desafios = 0
+        self.desafios_sucesso = 0
+
+    def somar(self, outra: "Estatisticas"):
+        self.partidas += outra.partidas
+        self.truncadas += outra.truncadas
+        self.jogadas.update(outra.jogadas)
+        self.vitorias = [a + b for a, b in zip(self.vitorias, outra.vitorias)]
+        self.desafios += outra.desafios
+        self.desafios_sucesso += outra.desafios_sucesso
+        return self
+
+    def _percentil(self, p: float):
+        total = sum(self.jogadas.values())
+        if not total:
+            return None
+        alvo = p * total
+        acumulado = 0
+        for duracao in sorted(self.jogadas):
+            acumulado += self.jogadas[duracao]
+            if acumulado >= alvo:
+                return duracao
+
+    def resumo(self):
+        completas = self.partidas - self.truncadas
+        total_jogadas = sum(d * n for d, n in self.jogadas.items())
+        return {
+            "partidas": self.partidas,
+            "truncadas": self.truncadas,
+            "duracao_media": total_jogadas / self.partidas if self.partidas else None,
+            "duracao_p50": self._percentil(0.50),
+            "duracao_p95": self._percentil(0.95),
+            "duracao_max": max(self.jogadas) if self.jogadas else None,
+            "vitorias_por_assento": [v / completas if completas else 0.0 for v in self.vitorias],
+            "desafios": self.desafios,
+            "taxa_sucesso_desafio": self.desafios_sucesso / self.desafios if self.desafios else None,
+        }
+
+
+def simular_partida(politicas, semente: int, max_jogadas: int = 5000):
+    # politicas: uma função por assento
+    nomes = [f"bot{i}" for i in range(len(politicas))]
+    assentos = {nome: i for i, nome in enumerate(nomes)}
+    jogo = JogoUNO(nomes, semente=semente)
+    rng = random.Random(semente)
+
+    jogadas = desafios = sucessos = 0
+    while not jogo.encerrado and jogadas < max_jogadas:
+        opcoes = jogo.jogadas_validas()
+        if not opcoes:
+            break  # Sem cartas para comprar e nada para jogar
+        jogada = politicas[assentos[jogo.jogador_da_vez().nome]](jogo, opcoes, rng)
+        resultado = jogo.aplicar(jogada)
+        if jogada[0] == "desafiar":
+            desafios += 1
+            sucessos += resultado["sucesso"]
+        jogadas += 1
+
+    ranking = jogo.resultado()
+    return {
+        "jogadas": jogadas,
+        "vencedor": assentos[ranking[0]] if ranking else None,
+        "desafios": desafios,
+        "desafios_sucesso": sucessos,
+    }
+
+
+def simular_lote(nomes_politicas, semente_inicial: int, quantidade: int, max_jogadas: int = 5000):
+    politicas = [POLITICAS[nome] for nome in nomes_politicas]
+    estatisticas = Estatisticas(len(politicas))
+    for semente in range(semente_inicial, semente_inicial + quantidade):
+        partida = simular_partida(politicas, semente, max_jogadas)
+        estatisticas.partidas += 1
+        estatisticas.jogadas[partida["jogadas"]] += 1
+        if partida["vencedor"] is None:
+            estatisticas.truncadas += 1
+        else:
+            estatisticas.vitorias[partida["vencedor"]] += 1
+        estatisticas.desafios += partida["desafios"]
+        estatisticas.desafios_sucesso += partida["desafios_sucesso"]
+    return estatisticas
+
+
+def simular(partidas: int, nomes_politicas, semente: int = 0, processos: int | None = None,
+            tamanho_lote: int = 2000, max_jogadas: int = 5000) -> Estatisticas:
+    # A partida i sempre usa a semente semente + i, então o resultado não
+    # depende do número de processos
+    nomes_politicas = list(nomes_politicas)
+    lotes = [
+        (inicio, min(tamanho_lote, partidas - inicio))
+        for inicio in range(0, partidas, tamanho_lote)
+    ]
+    total = Estatisticas(len(nomes_politicas))
+    if processos == 1 or len(lotes) <= 1:
+        for inicio, quantidade in lotes:
+            total.somar(simular_lote(nomes_politicas, semente + inicio, quantidade, max_jogadas))
+        return total
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [
+            executor.submit(simular_lote, nomes_politicas, semente + inicio, quantidade, max_jogadas)
+            for inicio, quantidade in lotes
+        ]
+        for futuro in futuros:
+            total.somar(futuro.result())
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulação de partidas de UNO entre bots")
+    parser.add_argument("--partidas", type=int, default=10_000)
+    parser.add_argument("--jogadores", type=int, default=4)
+    parser.add_argument("--politicas", nargs="+", default=["gulosa"], choices=sorted(POLITICAS),
+                        help="Política por assento (repetida em ciclo se houver menos que jogadores)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    parser.add_argument("--tamanho-lote", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    nomes_politicas = [args.politicas[i % len(args.politicas)] for i in range(args.jogadores)]
+    inicio = time.perf_counter()
+    estatisticas = simular(args.partidas, nomes_politicas, args.semente, args.processos, args.tamanho_lote)
+    duracao = time.perf_counter() - inicio
+
+    resumo = estatisticas.resumo()
+    resumo["politicas"] = nomes_politicas
+    resumo["segundos"] = round(duracao, 3)
+    resumo["partidas_por_minuto"] = round(args.partidas / duracao * 60)
+    print(json.dumps(resumo, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+from app.game import CARTAS
+
+NOMES = [str(carta) for carta in CARTAS]  # código -> nome da carta
+
+# Protocolo de sincronização por diferenças usado no /ws?protocolo=delta.
+#
+# Cada comando aceito numa sala gera uma nova versão. O servidor envia:
+#   {"tipo": "estado", "versao": v, "publico": {...}, "mao": [...]}
+#       estado completo (na conexão, num novo jogo ou quando o cliente pede)
+#   {"tipo": "delta", "versao": v, "mudancas": {...}}
+#       só os campos públicos que mudaram; em "cartas" só os jogadores cuja
+#       quantidade de cartas mudou. Toda versão gera um delta, mesmo vazio.
+#   {"tipo": "mao", "versao": v, "entrou": [...], "saiu": [...]}
+#       diferença da mão, enviada só para o próprio jogador (num novo jogo
+#       vem a mão inteira em "mao")
+#
+# Se o cliente perceber um buraco nas versões, envia {"tipo": "resync"} e
+# recebe um novo "estado".
+#
+# As mensagens são montadas com os códigos das cartas (índices em CARTAS): o
+# protocolo binário (app.binario) as envia assim, e em_texto troca os códigos
+# pelos nomes ("Vermelho 5") para o JSON.
+
+
+def estado_publico(jogo) -> dict:
+    desafio = jogo.ultimo_desafio
+    return {
+        "turno": jogo.jogador_atual().nome,
+        "topo": jogo.pilha_descarte[-1].codigo,
+        "direcao": jogo.direcao,
+        "baralho": len(jogo.baralho),
+        "cartas": {j.nome: len(j.mao) for j in jogo.jogadores},
+        "vencedores": list(jogo.vencedores),
+        "desafio": desafio["vitima"].nome if desafio else None,
+    }
+
+
+def em_texto(mensagem: dict) -> dict:
+    # Mesma mensagem com os nomes das cartas no lugar dos códigos
+    convertida = dict(mensagem)
+    for campo in ("publico", "mudancas"):
+        parte = mensagem.get(campo)
+        if parte and "topo" in parte:
+            convertida[campo] = {**parte, "topo": NOMES[parte["topo"]]}
+    for campo in ("mao", "entrou", "saiu"):
+        if campo in mensagem:
+            convertida[campo] = [NOMES[codigo] for codigo in mensagem[campo]]
+    return convertida
+
+
+def _mao(jogo, nome: str):
+    jogador = jogo.obter_jogador(nome)
+    return jogador.mao if jogador else []
+
+
+class Sincronizador:
+    def __init__(self):
+        self.jogo = None  # Jogo ao qual a base se refere
+        self.publico = None  # Último estado público enviado
+        self.maos = {}  # nome -> contagem por código da última mão enviada
+
+    def descartar_base(self):
+        # Sem ninguém ouvindo, não vale a pena manter a base em dia
+        self.jogo = None
+        self.publico = None
+        self.maos = {}
+
+    def _definir_base(self, jogo, publico):
+        self.jogo = jogo
+        self.publico = publico
+        self.maos = {j.nome: list(j.mao.contagem) for j in jogo.jogadores}
+
+    def estado_completo(self, jogo, versao: int, jogador: str | None = None) -> dict:
+        if self.jogo is not jogo:
+            self._definir_base(jogo, estado_publico(jogo))
+        mensagem = {"tipo": "estado", "versao": versao, "publico": self.publico}
+        if jogador is not None:
+            mensagem["mao"] = [c.codigo for c in _mao(jogo, jogador)]
+        return mensagem
+
+    def atualizar(self, jogo, versao: int):
+        # Devolve (mensagem pública, {nome: mensagem privada}) da nova versão
+        if self.jogo is not jogo:
+            publico = estado_publico(jogo)
+            self._definir_base(jogo, publico)
+            completa = {"tipo": "estado", "versao": versao, "publico": publico}
+            privadas = {
+                j.nome: {"tipo": "mao", "versao": versao, "mao": [c.codigo for c in j.mao]}
+                for j in jogo.jogadores
+            }
+            return completa, privadas
+
+        publico = estado_publico(jogo)
+        mudancas = {
+            campo: valor for campo, valor in publico.items()
+            if campo != "cartas" and valor != self.publico.get(campo)
+        }
+        anteriores = self.publico["cartas"]
+        cartas = {nome: qtd for nome, qtd in publico["cartas"].items() if anteriores.get(nome) != qtd}
+        for nome in anteriores.keys() - publico["cartas"].keys():
+            cartas[nome] = 0  # Terminou a partida e saiu da mesa
+        if cartas:
+            mudancas["cartas"] = cartas
+
+        privadas = {}
+        for jogador in jogo.jogadores:
+            if jogador.nome not in cartas:
+                continue  # Mão do mesmo tamanho: nada entrou nem saiu
+            atual = list(jogador.mao.contagem)
+            anterior = self.maos.get(jogador.nome) or [0] * len(atual)
+            entrou, saiu = [], []
+            for codigo, (antes, depois) in enumerate(zip(anterior, atual)):
+                if depois > antes:
+                    entrou += [codigo] * (depois - antes)
+                elif antes > depois:
+                    saiu += [codigo] * (antes - depois)
+            privadas[jogador.nome] = {"tipo": "mao", "versao": versao, "entrou": entrou, "saiu": saiu}
+            self.maos[jogador.nome] = atual
+
+        self.publico = publico
+        return {"tipo": "delta", "versao": versao, "mudancas": mudancas}, privadas
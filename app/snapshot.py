@@ -0,0 +1,152 @@
+import random
+import struct
+from app.game import CARTAS, Baralho, Jogador, JogoUNO
+from app.historico import HistoricoEventos
+
+# Snapshot binário compacto de um JogoUNO: cartas como bytes (Carta.codigo),
+# nomes em UTF-8 com tamanho prefixado e o estado do gerador aleatório, para
+# que comandos reaplicados depois do snapshot deem exatamente o mesmo jogo.
+#
+# Layout (little-endian):
+#   versão B | direção b | turno (assento) H | próximo seq do histórico I
+#   cópias do baralho B
+#   assentos H x (nome, em jogo B, disse_uno B, cartas)
+#   vencedores H x nome
+#   baralho (cartas) | pilha de descarte (cartas)
+#   desafio B [jogador_que_jogou nome, vítima nome, cor_anterior B, tinha_cor B]
+#   estado do random: 625 x I, gauss d (NaN = None)
+#   semente H + bytes (inteiro com sinal; tamanho 0 = None)
+#
+# onde nome = H + bytes e cartas = H + um byte por carta. Snapshots da versão
+# 3 (sem a semente no fim) ainda são lidos, com semente None.
+
+VERSAO = 4
+_ESTADO_RANDOM = struct.Struct("<625I")
+
+
+def _nome(dados: bytearray, nome: str):
+    codificado = nome.encode("utf-8")
+    dados += struct.pack("<H", len(codificado))
+    dados += codificado
+
+
+def _cartas(dados: bytearray, cartas):
+    dados += struct.pack("<H", len(cartas))
+    dados += bytes(carta.codigo for carta in cartas)
+
+
+def serializar(jogo: JogoUNO) -> bytes:
+    dados = bytearray(struct.pack("<BbHI", VERSAO, jogo.direcao, jogo.turno_atual, jogo.historico.proximo_seq))
+
+    dados += struct.pack("<B", jogo.baralho.copias)
+
+    dados += struct.pack("<H", len(jogo.assentos))
+    for jogador, ativo in zip(jogo.assentos, jogo._ativos):
+        _nome(dados, jogador.nome)
+        dados += struct.pack("<BB", ativo, jogador.disse_uno)
+        _cartas(dados, jogador.mao)
+
+    dados += struct.pack("<H", len(jogo.vencedores))
+    for nome in jogo.vencedores:
+        _nome(dados, nome)
+
+    _cartas(dados, jogo.baralho.cartas)
+    _cartas(dados, jogo.pilha_descarte)
+
+    desafio = jogo.ultimo_desafio
+    dados += struct.pack("<B", desafio is not None)
+    if desafio:
+        _nome(dados, desafio["jogador_que_jogou"].nome)
+        _nome(dados, desafio["vitima"].nome)
+        dados += struct.pack("<BB", desafio["cor_anterior"], desafio["tinha_cor"])
+
+    _, estado, gauss = jogo.rng.getstate()
+    dados += _ESTADO_RANDOM.pack(*estado)
+    dados += struct.pack("<d", float("nan") if gauss is None else gauss)
+
+    semente = b""
+    if jogo.semente is not None:
+        semente = jogo.semente.to_bytes(jogo.semente.bit_length() // 8 + 1, "little", signed=True)
+    dados += struct.pack("<H", len(semente))
+    dados += semente
+    return bytes(dados)
+
+
+class _Leitor:
+    def __init__(self, dados: bytes):
+        self.dados = dados
+        self.posicao = 0
+
+    def ler(self, formato):
+        valores = struct.unpack_from(formato, self.dados, self.posicao)
+        self.posicao += struct.calcsize(formato)
+        return valores
+
+    def nome(self) -> str:
+        (tamanho,) = self.ler("<H")
+        inicio = self.posicao
+        self.posicao += tamanho
+        return self.dados[inicio:self.posicao].decode("utf-8")
+
+    def cartas(self) -> list:
+        (tamanho,) = self.ler("<H")
+        inicio = self.posicao
+        self.posicao += tamanho
+        return [CARTAS[codigo] for codigo in self.dados[inicio:self.posicao]]
+
+
+def restaurar(dados: bytes) -> JogoUNO:
+    leitor = _Leitor(dados)
+    versao, direcao, turno, proximo_seq = leitor.ler("<BbHI")
+    if versao not in (3, VERSAO):
+        raise ValueError(f"Versão de snapshot não suportada: {versao}")
+
+    jogo = JogoUNO.__new__(JogoUNO)
+    jogo.semente = None
+    jogo.rng = random.Random()
+    jogo.baralho = Baralho.__new__(Baralho)
+    jogo.baralho.rng = jogo.rng
+    (jogo.baralho.copias,) = leitor.ler("<B")
+    jogo.direcao = direcao
+    jogo.turno_atual = turno
+    jogo.historico = HistoricoEventos()
+    jogo.historico.proximo_seq = proximo_seq
+    jogo.ouvinte_comandos = None
+
+    assentos, ativos = [], []
+    for _ in range(leitor.ler("<H")[0]):
+        jogador = Jogador(leitor.nome())
+        ativo, disse_uno = leitor.ler("<BB")
+        jogador.disse_uno = bool(disse_uno)
+        jogador.mao.extend(leitor.cartas())
+        assentos.append(jogador)
+        ativos.append(bool(ativo))
+    jogo._sentar(assentos, ativos)
+
+    jogo.vencedores = [leitor.nome() for _ in range(leitor.ler("<H")[0])]
+    jogo.baralho.cartas = leitor.cartas()
+    jogo.pilha_descarte = leitor.cartas()
+
+    jogo.ultimo_desafio = None
+    if leitor.ler("<B")[0]:
+        quem_jogou = leitor.nome()
+        vitima = leitor.nome()
+        cor_anterior, tinha_cor = leitor.ler("<BB")
+        jogo.ultimo_desafio = {
+            # Quem jogou o +4 pode já ter saído da mesa (era a última carta)
+            "jogador_que_jogou": jogo.assentos[jogo._por_nome[quem_jogou]],
+            "vitima": jogo.assentos[jogo._por_nome[vitima]],
+            "cor_anterior": cor_anterior,
+            "tinha_cor": bool(tinha_cor)
+        }
+
+    estado = leitor.ler("<625I")
+    (gauss,) = leitor.ler("<d")
+    jogo.rng.setstate((3, estado, None if gauss != gauss else gauss))
+    if versao >= 4:
+        (tamanho,) = leitor.ler("<H")
+        inicio = leitor.posicao
+        leitor.posicao += tamanho
+        if tamanho:
+            jogo.semente = int.from_bytes(dados[inicio:leitor.posicao], "little", signed=True)
+    return jogo
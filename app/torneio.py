@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor
+
+from app.game import JogoUNO
+from app.simulacao import POLITICAS
+
+# Torneios com muitas mesas de JogoUNO. A cada rodada os participantes são
+# sentados em mesas (sistema suíço ou eliminatória), as mesas só de bots
+# rodam em lotes num pool de processos e as colocações de cada mesa entram na
+# classificação assim que a mesa termina. Mesas com humanos viram salas
+# normais do servidor (ver app.main), e os bots sentados nelas jogam sozinhos.
+#
+#   python -m app.torneio --jogadores 10000 --tamanho-mesa 4 --processos 8
+#
+# Pontuação: numa mesa de n jogadores, quem termina na posição p (0 = primeiro)
+# ganha n - 1 - p pontos. Empates são desfeitos por vitórias e depois pelo nome.
+
+SUICO = "suico"  # Cada rodada junta jogadores com pontuação parecida
+ELIMINATORIA = "eliminatoria"  # A metade de cima de cada mesa segue; a última mesa é a final
+FORMATOS = (SUICO, ELIMINATORIA)
+MAX_TAMANHO_MESA = 30
+
+
+class Classificacao:
+    # Mantém os jogadores sempre ordenados: registrar uma mesa só move os
+    # jogadores dela (busca binária), sem reordenar o torneio inteiro
+    def __init__(self, nomes):
+        self.pontos = dict.fromkeys(nomes, 0)
+        self.vitorias = dict.fromkeys(nomes, 0)
+        self.partidas = dict.fromkeys(nomes, 0)
+        self.ordem = sorted(self._chave(nome) for nome in self.pontos)
+
+    def __len__(self):
+        return len(self.ordem)
+
+    def _chave(self, nome: str):
+        return -self.pontos[nome], -self.vitorias[nome], nome
+
+    def registrar(self, ranking):
+        # ranking: nomes do primeiro ao último colocado da mesa
+        tamanho = len(ranking)
+        for posicao, nome in enumerate(ranking):
+            del self.ordem[bisect_left(self.ordem, self._chave(nome))]
+            self.pontos[nome] += tamanho - 1 - posicao
+            self.vitorias[nome] += posicao == 0
+            self.partidas[nome] += 1
+            insort(self.ordem, self._chave(nome))
+
+    def nomes(self):
+        return [chave[2] for chave in self.ordem]
+
+    def posicao(self, nome: str) -> int:
+        return bisect_left(self.ordem, self._chave(nome)) + 1
+
+    def pagina(self, inicio: int = 0, limite: int = 50):
+        return [
+            {"posicao": inicio + i + 1, "nome": nome, "pontos": -pontos, "vitorias": -vitorias,
+             "partidas": self.partidas[nome]}
+            for i, (pontos, vitorias, nome) in enumerate(self.ordem[inicio:inicio + limite])
+        ]
+
+
+class Mesa:
+    def __init__(self, rodada: int, numero: int, nomes, semente: int):
+        self.rodada = rodada
+        self.numero = numero
+        self.nomes = list(nomes)
+        self.semente = semente
+        self.ranking = None
+        self.sala_id = None  # Sala do servidor, para mesas com humanos
+
+
+def dividir(nomes, tamanho_mesa: int):
+    # Mesas consecutivas de tamanhos o mais parecidos possível (nenhuma com
+    # menos de 2 jogadores: com mesas de 2 e número ímpar, uma fica com 3)
+    if len(nomes) < 2:
+        return []
+    quantidade = min(math.ceil(len(nomes) / tamanho_mesa), len(nomes) // 2)
+    base, sobra = divmod(len(nomes), quantidade)
+    mesas = []
+    inicio = 0
+    for i in range(quantidade):
+        fim = inicio + base + (i < sobra)
+        mesas.append(nomes[inicio:fim])
+        inicio = fim
+    return mesas
+
+
+def serpentear(nomes, tamanho_mesa: int):
+    # Cabeças de chave espalhadas: 1º, 2º, ... nas mesas 1, 2, ... e depois
+    # voltando, para os melhores não se enfrentarem cedo
+    quantidade = len(dividir(nomes, tamanho_mesa))
+    mesas = [[] for _ in range(quantidade)]
+    for i, nome in enumerate(nomes):
+        volta, resto = divmod(i, quantidade)
+        mesas[resto if volta % 2 == 0 else quantidade - 1 - resto].append(nome)
+    return mesas
+
+
+def jogar_mesa(nomes, politicas, semente: int, max_jogadas: int = 5000):
+    # Ranking completo de uma mesa só de bots. Se a partida passar do limite,
+    # quem ainda joga é ordenado pelo número de cartas na mão
+    jogo = JogoUNO(nomes, semente=semente)
+    rng = random.Random(semente)
+    por_nome = {nome: POLITICAS[politica] for nome, politica in zip(nomes, politicas)}
+    jogadas = 0
+    while not jogo.encerrado and jogadas < max_jogadas:
+        opcoes = jogo.jogadas_validas()
+        if not opcoes:
+            break
+        jogo.aplicar(por_nome[jogo.jogador_da_vez().nome](jogo, opcoes, rng))
+        jogadas += 1
+    if jogo.encerrado:
+        return jogo.resultado()
+    return list(jogo.vencedores) + [j.nome for j in sorted(jogo.jogadores, key=lambda j: len(j.mao))]
+
+
+def jogar_mesas(lote, max_jogadas: int = 5000):
+    # lote: [(nomes, politicas, semente)], executado num processo do pool
+    return [jogar_mesa(nomes, politicas, semente, max_jogadas) for nomes, politicas, semente in lote]
+
+
+class Torneio:
+    def __init__(self, participantes: dict, tamanho_mesa: int = 4, formato: str = SUICO,
+                 rodadas: int | None = None, semente: int = 0, max_jogadas: int = 5000):
+        # participantes: nome -> nome da política do bot, ou None para humano
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {formato}")
+        if not 2 <= tamanho_mesa <= MAX_TAMANHO_MESA:
+            raise ValueError(f"Mesas devem ter de 2 a {MAX_TAMANHO_MESA} jogadores")
+        if len(participantes) < 2:
+            raise ValueError("O torneio precisa de pelo menos 2 participantes")
+        invalidas = {p for p in participantes.values() if p is not None and p not in POLITICAS}
+        if invalidas:
+            raise ValueError(f"Políticas desconhecidas: {', '.join(sorted(invalidas))}")
+
+        self.id = None  # Dado pelo registro de torneios do servidor
+        self.tarefa = None  # asyncio.Task de executar, quando roda no servidor
+        self.participantes = dict(participantes)
+        self.tamanho_mesa = tamanho_mesa
+        self.formato = formato
+        self.semente = semente
+        self.max_jogadas = max_jogadas
+        if rodadas is None and formato == SUICO:
+            rodadas = math.ceil(math.log(len(participantes), tamanho_mesa)) + 1
+        self.rodadas = rodadas  # Na eliminatória, None = até sobrar a mesa final
+        self.rodada = 0
+        self.classificacao = Classificacao(participantes)
+        self.mesas: list[Mesa] = []  # Mesas da rodada atual
+        self.pendentes = 0  # Mesas da rodada atual ainda sem resultado
+        self.encerrado = False
+
+        nomes = list(participantes)
+        random.Random(semente).shuffle(nomes)  # Sorteio dos lugares da primeira rodada
+        self.restantes = nomes  # Na eliminatória, quem ainda está no torneio
+        self._rodada_concluida: asyncio.Event | None = None
+
+    def humano(self, nome: str) -> bool:
+        return self.participantes[nome] is None
+
+    def proxima_rodada(self) -> list[Mesa]:
+        # Mesas da próxima rodada, ou [] quando o torneio acabou
+        if self.pendentes:
+            raise RuntimeError("A rodada atual ainda não terminou")
+        if self.encerrado or (self.rodadas is not None and self.rodada >= self.rodadas):
+            self.encerrado = True
+            return []
+        if self.formato == SUICO:
+            grupos = dividir(self.classificacao.nomes() if self.rodada else self.restantes, self.tamanho_mesa)
+        else:
+            if len(self.restantes) < 2:
+                self.encerrado = True
+                return []
+            if self.rodada:
+                # Cabeças de chave pela classificação de quem ainda está vivo
+                vivos = set(self.restantes)
+                self.restantes = [nome for nome in self.classificacao.nomes() if nome in vivos]
+            grupos = serpentear(self.restantes, self.tamanho_mesa)
+        self.rodada += 1
+        self.mesas = [
+            Mesa(self.rodada, numero, nomes, (self.semente << 32) | (self.rodada << 20) | numero)
+            for numero, nomes in enumerate(grupos)
+        ]
+        self.pendentes = len(self.mesas)
+        return self.mesas
+
+    def registrar(self, mesa: Mesa, ranking):
+        mesa.ranking = list(ranking)
+        self.classificacao.registrar(mesa.ranking)
+        self.pendentes -= 1
+        if self.pendentes:
+            return
+        if self.formato == ELIMINATORIA:
+            if len(self.mesas) == 1:
+                self.encerrado = True  # Foi a final
+            else:
+                self.restantes = [nome for m in self.mesas for nome in m.ranking[:max(1, len(m.ranking) // 2)]]
+        if self._rodada_concluida:
+            self._rodada_concluida.set()
+
+    async def executar(self, executor=None, abrir_mesa=None, tamanho_lote: int = 64):
+        # Joga todas as rodadas. Mesas só de bots vão em lotes para o executor
+        # (None = threads do laço); as com humanos são entregues a
+        # abrir_mesa(torneio, mesa), e quem abriu chama registrar quando a
+        # partida terminar.
+        laco = asyncio.get_running_loop()
+
+        async def rodar_lote(mesas):
+            lote = [(m.nomes, [self.participantes[n] for n in m.nomes], m.semente) for m in mesas]
+            rankings = await laco.run_in_executor(executor, jogar_mesas, lote, self.max_jogadas)
+            for mesa, ranking in zip(mesas, rankings):
+                self.registrar(mesa, ranking)
+
+        while mesas := self.proxima_rodada():
+            self._rodada_concluida = asyncio.Event()
+            de_bots = [m for m in mesas if not any(self.humano(n) for n in m.nomes)]
+            for mesa in mesas:
+                if any(self.humano(n) for n in mesa.nomes):
+                    await abrir_mesa(self, mesa)
+            await asyncio.gather(*(rodar_lote(de_bots[i:i + tamanho_lote])
+                                   for i in range(0, len(de_bots), tamanho_lote)))
+            if self.pendentes:
+                await self._rodada_concluida.wait()
+        self._rodada_concluida = None
+
+    def resumo(self) -> dict:
+        return {
+            "formato": self.formato,
+            "participantes": len(self.participantes),
+            "tamanho_mesa": self.tamanho_mesa,
+            "rodada": self.rodada,
+            "rodadas": self.rodadas,
+            "encerrado": self.encerrado,
+            "mesas_pendentes": [
+                {"mesa": m.numero, "sala": m.sala_id, "jogadores": m.nomes}
+                for m in self.mesas if m.ranking is None and m.sala_id
+            ],
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Torneio de UNO entre bots")
+    parser.add_argument("--jogadores", type=int, default=1000)
+    parser.add_argument("--tamanho-mesa", type=int, default=4)
+    parser.add_argument("--formato", choices=FORMATOS, default=SUICO)
+    parser.add_argument("--rodadas", type=int)
+    parser.add_argument("--politicas", nargs="+", default=["gulosa", "aleatoria"], choices=sorted(POLITICAS),
+                        help="Políticas distribuídas em ciclo entre os jogadores")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    parser.add_argument("--tamanho-lote", type=int, default=64)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    participantes = {f"bot{i}": args.politicas[i % len(args.politicas)] for i in range(args.jogadores)}
+    torneio = Torneio(participantes, args.tamanho_mesa, args.formato, args.rodadas, args.semente)
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.processos) as executor:
+        asyncio.run(torneio.executar(executor, tamanho_lote=args.tamanho_lote))
+    duracao = time.perf_counter() - inicio
+
+    resumo = torneio.resumo()
+    del resumo["mesas_pendentes"]
+    resumo["segundos"] = round(duracao, 3)
+    resumo["classificacao"] = [
+        {**linha, "politica": participantes[linha["nome"]]} for linha in torneio.classificacao.pagina(0, args.top)
+    ]
+    print(json.dumps(resumo, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import hashlib
+import json
+
+from app.binario import empacotar
+
+# Respostas prontas do GET /estado de uma sala. A visão pública mostra só
+# quantas cartas cada jogador tem; a privada (?jogador=) traz também a mão
+# dele. Cada visão é montada e serializada (JSON ou MessagePack) uma vez por
+# versão da sala e reaproveitada por todos que pedirem a mesma coisa até o
+# próximo comando, com ETag tirado do próprio corpo.
+
+
+def visao(jogo, versao: int, jogador=None, carta=str) -> dict:
+    # jogador: Jogador da visão privada, ou None para a pública
+    dados = {
+        "versao": versao,
+        "turno": jogo.jogador_atual().nome,
+        "topo": carta(jogo.pilha_descarte[-1]),
+        "jogadores": {j.nome: len(j.mao) for j in jogo.jogadores},
+    }
+    if jogador is not None:
+        dados["mao"] = [carta(c) for c in jogador.mao]
+    return dados
+
+
+class CacheVisoes:
+    def __init__(self):
+        self.jogo = None  # Jogo e versão a que as respostas guardadas se referem
+        self.versao = None
+        self.prontas = {}  # (nome do jogador ou None, binario) -> (etag, corpo)
+
+    def obter(self, sala, jogador=None, binario: bool = False):
+        # (etag, corpo) da visão na versão atual da sala
+        if self.jogo is not sala.jogo or self.versao != sala.versao:
+            self.jogo, self.versao = sala.jogo, sala.versao
+            self.prontas.clear()
+        chave = (jogador.nome if jogador else None, binario)
+        pronta = self.prontas.get(chave)
+        if pronta is None:
+            if binario:
+                corpo = empacotar(visao(sala.jogo, sala.versao, jogador, lambda c: c.codigo))
+            else:
+                corpo = json.dumps(visao(sala.jogo, sala.versao, jogador), ensure_ascii=False,
+                                   separators=(",", ":")).encode()
+            pronta = self.prontas[chave] = (f'"{hashlib.blake2b(corpo, digest_size=8).hexdigest()}"', corpo)
+        return pronta
@@ -1,19 +1,339 @@
-from fastapi import WebSocket, WebSocketDisconnect
-from typing import List
+import asyncio
+import base64
+import json
+import time
+from collections import Counter, OrderedDict, deque
+from fastapi import WebSocket
+from typing import Dict
+from app.salas import SALA_PADRAO
+from app.binario import empacotar
+from app.sincronizacao import em_texto
+from app.metricas import metricas, derrubadas, destinatarios, distribuicao, retomadas
 
+PROTOCOLO_TEXTO = "texto"  # Mensagens em texto livre: o padrão do /ws, para clientes simples (tests/teste_ws.html)
+PROTOCOLO_DELTA = "delta"  # JSON versionado de app.sincronizacao
+PROTOCOLO_BINARIO = "binario"  # As mesmas mensagens do delta em MessagePack (app.binario)
+ESTRUTURADOS = (PROTOCOLO_DELTA, PROTOCOLO_BINARIO)
+
+
+def codificar(protocolo: str, mensagem: dict):
+    # Mensagem de app.sincronizacao no formato do protocolo
+    if protocolo == PROTOCOLO_BINARIO:
+        return empacotar(mensagem)
+    return json.dumps(em_texto(mensagem), ensure_ascii=False)
+
+
+class Conexao:
+    def __init__(self, websocket: WebSocket, tamanho_fila: int, protocolo: str = PROTOCOLO_TEXTO,
+                 jogador: str | None = None):
+        self.websocket = websocket
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho_fila)  # Mensagens ainda não enviadas
+        self.tarefa: asyncio.Task | None = None
+        self.protocolo = protocolo
+        self.jogador = jogador  # Jogador dono da conexão (recebe a própria mão nos protocolos estruturados)
+
+
+class Canal:
+    def __init__(self, sala_id: str):
+        self.sala_id = sala_id
+        self.assinantes: Dict[WebSocket, Conexao] = {}
+        self.protocolos = Counter()  # protocolo -> quantidade de assinantes
+        # Itens (protocolo, mensagem, jogador) aguardando distribuição; jogador
+        # None = todos os assinantes daquele protocolo
+        self.fila: asyncio.Queue = asyncio.Queue()
+        self.tarefa: asyncio.Task | None = None
+
+
+class Replay:
+    # Últimas mensagens transmitidas numa sala, para quem reconecta. Cada
+    # mensagem lógica ganha um seq (as versões dela em cada protocolo dividem
+    # o mesmo). O primeiro seq vem do relógio, então um Replay recriado depois
+    # de expirar (ou de um reinício) nunca reaproveita números já vistos.
+    def __init__(self, capacidade: int):
+        self.itens = deque(maxlen=capacidade)  # (seq, protocolo, mensagem, jogador)
+        self.proximo_seq = int(time.time()) << 20
+        self.descartado = self.proximo_seq - 1  # Maior seq que já não está completo no buffer
+        self.prazos = {}  # protocolo estruturado -> até quando mantê-lo sem conexões (monotonic)
+
+    def carimbar(self) -> int:
+        seq = self.proximo_seq
+        self.proximo_seq += 1
+        return seq
+
+    def registrar(self, seq: int, itens):
+        for protocolo, mensagem, jogador in itens:
+            if protocolo == PROTOCOLO_TEXTO:
+                continue  # O texto livre não tem seq para retomar
+            if len(self.itens) == self.itens.maxlen:
+                self.descartado = self.itens[0][0]
+            self.itens.append((seq, protocolo, mensagem, jogador))
+
+    def desde(self, seq: int, protocolo: str, jogador: str | None):
+        # Mensagens depois de seq para uma conexão, ou None se parte delas já
+        # saiu do buffer (ou seq não é desta sala)
+        if not self.descartado <= seq < self.proximo_seq:
+            return None
+        return [m for s, p, m, j in self.itens if s > seq and p == protocolo and (j is None or j == jogador)]
+
+
+# Cada sala tem um canal com seus assinantes. Enviar uma mensagem só a coloca na
+# fila do canal; uma tarefa por canal repassa para a fila de cada conexão e uma
+# tarefa por conexão faz o envio, então um cliente lento não trava a jogada nem
+# os outros clientes. Conexões com a fila cheia ou que falham no envio são
+# desconectadas.
+#
+# Com vários trabalhadores (app.cluster) há também um barramento: o manager
+# assina no corretor as salas em que tem conexões (com os protocolos delas), e
+# o corretor avisa o dono da sala quais protocolos os outros trabalhadores
+# assinam. Só o que alguém de fora vai receber é publicado no barramento.
+#
+# Nos protocolos estruturados toda mensagem transmitida leva um "seq" e fica
+# num Replay da sala. Quem reconecta com ?desde=<último seq visto> recebe só
+# o que perdeu, ou o estado completo se ficou para trás demais. O Replay (e as
+# diferenças dos protocolos que a sala tinha) continua sendo mantido por
+# tempo_retomada segundos depois que a última conexão sai, daqui ou (com
+# barramento) de outro trabalhador.
 class ConnectionManager:
-    def __init__(self):
-        self.ativos: List[WebSocket] = []
+    def __init__(self, tamanho_fila: int = 64, tempo_envio: float = 5.0, tamanho_replay: int = 256,
+                 tempo_retomada: float = 60.0):
+        self.tamanho_fila = tamanho_fila
+        self.tempo_envio = tempo_envio  # Segundos até um envio ser considerado travado
+        self.tamanho_replay = tamanho_replay
+        self.tempo_retomada = tempo_retomada
+        self.canais: Dict[str, Canal] = {}
+        self.replays: Dict[str, Replay] = {}
+        self.abandonados: OrderedDict[str, float] = OrderedDict()  # sala -> quando o Replay expira
+        self.barramento = None  # app.barramento.BarramentoSocket
+
+    def total_conexoes(self, sala_id: str | None = None, protocolo: str | None = None) -> int:
+        canais = [self.canais.get(sala_id)] if sala_id is not None else self.canais.values()
+        return sum(
+            len(c.assinantes) if protocolo is None else c.protocolos[protocolo]
+            for c in canais if c
+        )
+
+    def estruturados(self, sala_id: str):
+        # Protocolos estruturados que precisam receber as mensagens da sala
+        # (inclusive os de quem ainda pode voltar)
+        self._expirar()
+        canal = self.canais.get(sala_id)
+        replay = self.replays.get(sala_id)
+        remotos = self._remotos(sala_id)
+        agora = time.monotonic()
+        return [p for p in ESTRUTURADOS if (canal and canal.protocolos[p]) or p in remotos
+                or (replay and replay.prazos.get(p, 0) > agora)]
+
+    def seq_atual(self, sala_id: str) -> int | None:
+        # Último seq transmitido na sala (vai junto do estado completo)
+        replay = self._replay(sala_id)
+        return replay.proximo_seq - 1 if replay else None
 
-    async def conectar(self, websocket: WebSocket):
+    def _remotos(self, sala_id: str):
+        # Protocolos que conexões de outros trabalhadores assinam na sala
+        return self.barramento.interesses.get(sala_id, ()) if self.barramento else ()
+
+    def _replay(self, sala_id: str) -> Replay | None:
+        replay = self.replays.get(sala_id)
+        if replay is None and self._remotos(sala_id):
+            replay = self.replays[sala_id] = Replay(self.tamanho_replay)
+        return replay
+
+    def interesse_remoto(self, sala_id: str, antes, depois):
+        # Chamado pelo barramento quando muda o que os outros trabalhadores
+        # assinam na sala: quem saiu pode voltar, como numa desconexão local
+        replay = self.replays.get(sala_id)
+        if replay:
+            for protocolo in antes - depois:
+                if protocolo in ESTRUTURADOS:
+                    replay.prazos[protocolo] = time.monotonic() + self.tempo_retomada
+        if depois:
+            self.abandonados.pop(sala_id, None)
+        elif replay and sala_id not in self.canais:
+            self._abandonar(sala_id)
+
+    def perdidas(self, sala_id: str, protocolo: str, jogador: str | None, desde: int):
+        # Mensagens que a conexão perdeu desde o seq, ou None se precisa do
+        # estado completo
+        self._expirar()
+        replay = self.replays.get(sala_id)
+        mensagens = replay.desde(desde, protocolo, jogador) if replay else None
+        if metricas.ativo:
+            retomadas.inc("estado" if mensagens is None else "replay")
+        return mensagens
+
+    def _expirar(self):
+        agora = time.monotonic()
+        while self.abandonados:
+            sala_id, prazo = next(iter(self.abandonados.items()))
+            if prazo > agora:
+                break
+            del self.abandonados[sala_id]
+            if sala_id not in self.canais and not self._remotos(sala_id):
+                self.replays.pop(sala_id, None)
+
+    def _abandonar(self, sala_id: str):
+        self.abandonados[sala_id] = time.monotonic() + self.tempo_retomada
+        self.abandonados.move_to_end(sala_id)
+
+    def _carimbar(self, sala_id: str) -> int | None:
+        # seq da próxima mensagem da sala, ou None se ninguém pode recebê-la
+        self._expirar()
+        replay = self._replay(sala_id)
+        return replay.carimbar() if replay else None
+
+    def _anunciar(self, canal: Canal):
+        # (Re)assina a sala no barramento com os protocolos das conexões daqui
+        if self.barramento:
+            self.barramento.assinar(canal.sala_id, sorted(p for p, n in canal.protocolos.items() if n))
+
+    async def conectar(self, websocket: WebSocket, sala_id: str = SALA_PADRAO,
+                       protocolo: str = PROTOCOLO_TEXTO, jogador: str | None = None):
         await websocket.accept()
-        self.ativos.append(websocket)
+        canal = self.canais.get(sala_id)
+        if not canal:
+            canal = self.canais[sala_id] = Canal(sala_id)
+            canal.tarefa = asyncio.create_task(self._distribuir(canal))
+        self.abandonados.pop(sala_id, None)
+        if sala_id not in self.replays:
+            self.replays[sala_id] = Replay(self.tamanho_replay)
+        conexao = Conexao(websocket, self.tamanho_fila, protocolo, jogador)
+        canal.assinantes[websocket] = conexao
+        canal.protocolos[protocolo] += 1
+        if canal.protocolos[protocolo] == 1:
+            self._anunciar(canal)
+        conexao.tarefa = asyncio.create_task(self._escrever(sala_id, conexao))
+
+    def desconectar(self, websocket: WebSocket, sala_id: str = SALA_PADRAO):
+        canal = self.canais.get(sala_id)
+        if not canal:
+            return
+        conexao = canal.assinantes.pop(websocket, None)
+        if conexao:
+            canal.protocolos[conexao.protocolo] -= 1
+            if conexao.protocolo in ESTRUTURADOS and not canal.protocolos[conexao.protocolo]:
+                # Continua gerando as mensagens desse protocolo por um tempo,
+                # para quem reconectar
+                self.replays[sala_id].prazos[conexao.protocolo] = time.monotonic() + self.tempo_retomada
+            if canal.assinantes and not canal.protocolos[conexao.protocolo]:
+                self._anunciar(canal)
+        if conexao and conexao.tarefa and conexao.tarefa is not asyncio.current_task():
+            conexao.tarefa.cancel()
+        if not canal.assinantes:
+            del self.canais[sala_id]
+            canal.tarefa.cancel()
+            if not self._remotos(sala_id):
+                self._abandonar(sala_id)  # O Replay fica mais um pouco, para quem voltar
+            if self.barramento:
+                self.barramento.cancelar(sala_id)
+
+    def receber(self, sala_id: str, itens):
+        # Itens (protocolo, mensagem, jogador) para as conexões deste processo
+        canal = self.canais.get(sala_id)
+        if canal:
+            for item in itens:
+                canal.fila.put_nowait(tuple(item))
+
+    def receber_do_barramento(self, sala_id: str, itens):
+        # O JSON do barramento não carrega bytes: frames binários vêm em base64
+        self.receber(sala_id, [
+            (p, base64.b64decode(m) if p == PROTOCOLO_BINARIO else m, j) for p, m, j in itens
+        ])
+
+    def _publicar(self, sala_id: str, seq: int, itens):
+        self.replays[sala_id].registrar(seq, itens)
+        self.receber(sala_id, itens)
+        remotos = self._remotos(sala_id)
+        if remotos:
+            self.barramento.publicar(sala_id, [
+                (p, base64.b64encode(m).decode() if p == PROTOCOLO_BINARIO else m, j)
+                for p, m, j in itens if p in remotos
+            ])
+
+    async def enviar_mensagem(self, mensagem: str, sala_id: str = SALA_PADRAO):
+        seq = self._carimbar(sala_id)
+        if seq is None:
+            return
+        itens = [(PROTOCOLO_TEXTO, mensagem, None)]
+        aviso = {"tipo": "aviso", "seq": seq, "texto": mensagem}
+        for protocolo in self.estruturados(sala_id):
+            itens.append((protocolo, codificar(protocolo, aviso), None))
+        self._publicar(sala_id, seq, itens)
+
+    async def enviar_delta(self, sala_id: str, publica: dict, privadas: dict):
+        # publica vai para todos nos protocolos estruturados; privadas[nome] só
+        # para o jogador. Cada uma é uma mensagem, com seu próprio seq.
+        protocolos = self.estruturados(sala_id)
+        if not protocolos:
+            return
+        for mensagem, jogador in [(publica, None), *((m, nome) for nome, m in privadas.items())]:
+            seq = self._carimbar(sala_id)
+            if seq is None:
+                return
+            mensagem = {**mensagem, "seq": seq}
+            self._publicar(sala_id, seq, [(p, codificar(p, mensagem), jogador) for p in protocolos])
+
+    def enviar_para(self, websocket: WebSocket, mensagem: str, sala_id: str = SALA_PADRAO):
+        # Mensagem só para uma conexão (ex.: estado completo num resync)
+        canal = self.canais.get(sala_id)
+        conexao = canal.assinantes.get(websocket) if canal else None
+        if not conexao:
+            return
+        try:
+            conexao.fila.put_nowait(mensagem)
+        except asyncio.QueueFull:
+            if metricas.ativo:
+                derrubadas.inc("fila_cheia")
+            self.desconectar(websocket, sala_id)
+            asyncio.create_task(self._fechar(websocket, code=1013))
+
+    async def _distribuir(self, canal: Canal):
+        while True:
+            protocolo, mensagem, jogador = await canal.fila.get()
+            medir = metricas.ativo
+            if medir:
+                inicio = time.perf_counter()
+                entregues = 0
+            for websocket, conexao in list(canal.assinantes.items()):
+                if conexao.protocolo != protocolo or (jogador is not None and conexao.jogador != jogador):
+                    continue
+                try:
+                    conexao.fila.put_nowait(mensagem)
+                    if medir:
+                        entregues += 1
+                except asyncio.QueueFull:
+                    # Cliente lento demais: melhor derrubar do que acumular memória
+                    if medir:
+                        derrubadas.inc("fila_cheia")
+                    self.desconectar(websocket, canal.sala_id)
+                    asyncio.create_task(self._fechar(websocket, code=1013))
+            if medir:
+                distribuicao.observar(time.perf_counter() - inicio)
+                destinatarios.inc(valor=entregues)
+            await asyncio.sleep(0)  # Dá vez às tarefas de envio antes da próxima mensagem
 
-    def desconectar(self, websocket: WebSocket):
-        self.ativos.remove(websocket)
+    async def _escrever(self, sala_id: str, conexao: Conexao):
+        websocket = conexao.websocket
+        try:
+            while True:
+                mensagem = await conexao.fila.get()
+                if isinstance(mensagem, bytes):
+                    envio = websocket.send_bytes(mensagem)
+                else:
+                    envio = websocket.send_text(mensagem)
+                await asyncio.wait_for(envio, self.tempo_envio)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Socket morto ou travado: remove e tenta fechar
+            if metricas.ativo:
+                derrubadas.inc("envio")
+            self.desconectar(websocket, sala_id)
+            await self._fechar(websocket, code=1011)
 
-    async def enviar_mensagem(self, mensagem: str):
-        for conexao in self.ativos:
-            await conexao.send_text(mensagem)
+    async def _fechar(self, websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
 
 manager = ConnectionManager()
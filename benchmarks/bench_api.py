@@ -0,0 +1,299 @@
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+import httpx
+
+from app.main import app
+from app.salas import salas
+from app.simulacao import POLITICAS
+
+# Teste de carga da API HTTP + WebSocket rodando dentro do processo (ASGI, sem
+# rede). Para cada cenário (salas x espectadores) abre as salas com
+# POST /novo-jogo, conecta os espectadores no /ws de cada sala e põe N
+# clientes concorrentes jogando (/jogar, /comprar, /uno, /desafiar,
+# /nao-desafiar) até completar o número de comandos ou o tempo do cenário.
+# Mede a latência de cada rota, requisições por segundo e o atraso entre o
+# início do comando e a chegada do broadcast em cada espectador.
+#
+# Cada sala recebe no máximo --taxa comandos por segundo, em horários fixos
+# (carga aberta: um comando atrasado não adia os seguintes). Com --taxa 0 os
+# clientes jogam o mais rápido possível, o que mede a vazão máxima; nesse modo,
+# sem rede entre cliente e servidor, espectadores costumam ser derrubados por
+# fila cheia, e isso aparece em "espectadores_desconectados".
+#
+#   python -m benchmarks.bench_api --salas 1 10 100 --espectadores 0 10 --comandos 2000 --saida base.json
+#   python -m benchmarks.bench_api --comparar base.json --tolerancia 0.2
+#
+# As jogadas são escolhidas olhando o jogo direto no registro de salas (o bot
+# não conta como requisição); só as chamadas à API são medidas.
+
+
+class ClienteWS:
+    # Cliente WebSocket mínimo falando ASGI direto com o app
+    def __init__(self, caminho: str, parametros: dict | None = None):
+        self.caminho = caminho
+        self.parametros = parametros or {}
+        self.entrada: asyncio.Queue = asyncio.Queue()
+        self.aceito = asyncio.Event()
+        self.chegadas: list[float] = []  # perf_counter de cada mensagem recebida
+        self.fechado = False
+        self.tarefa: asyncio.Task | None = None
+
+    async def conectar(self):
+        escopo = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": self.caminho,
+            "raw_path": self.caminho.encode(),
+            "query_string": urlencode(self.parametros).encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+            "subprotocols": [],
+        }
+        await self.entrada.put({"type": "websocket.connect"})
+        self.tarefa = asyncio.create_task(app(escopo, self.entrada.get, self._receber))
+        await self.aceito.wait()
+
+    async def _receber(self, mensagem):
+        tipo = mensagem["type"]
+        if tipo == "websocket.send":
+            self.chegadas.append(time.perf_counter())
+        elif tipo == "websocket.accept":
+            self.aceito.set()
+        elif tipo == "websocket.close":
+            self.fechado = True
+            self.aceito.set()
+
+    async def fechar(self):
+        await self.entrada.put({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self.tarefa, 5)
+        except (asyncio.TimeoutError, Exception):
+            self.tarefa.cancel()
+
+
+def percentis(valores) -> dict:
+    if not valores:
+        return {"n": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    ordenados = sorted(valores)
+
+    def p(q):
+        return round(ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] * 1000, 3)
+
+    return {"n": len(ordenados), "p50": p(0.50), "p95": p(0.95), "p99": p(0.99),
+            "max": round(ordenados[-1] * 1000, 3)}
+
+
+class Cenario:
+    def __init__(self, cliente: httpx.AsyncClient, quantidade_salas: int, espectadores: int, clientes: int,
+                 comandos: int, jogadores: int, protocolo: str, semente: int, taxa: float = 0,
+                 segundos: float = 10):
+        self.cliente = cliente
+        self.salas = [f"bench-{semente}-{quantidade_salas}-{espectadores}-{i}" for i in range(quantidade_salas)]
+        self.espectadores = espectadores
+        self.clientes = clientes
+        self.comandos = comandos
+        self.intervalo = 1 / taxa if taxa else 0  # Segundos entre comandos de uma sala
+        self.segundos = segundos
+        self.proximo = {}  # sala -> perf_counter do próximo comando agendado
+        self.nomes = [f"j{i}" for i in range(jogadores)]
+        self.protocolo = protocolo
+        self.rng = random.Random(semente)
+        self.politica = POLITICAS["gulosa"]
+        self.latencias = defaultdict(list)  # rota -> segundos
+        self.inicios = defaultdict(list)  # sala -> perf_counter do início de cada comando
+        self.erros = 0
+        self.conexoes: dict[str, list[ClienteWS]] = {}
+
+    async def _requisicao(self, rota: str, url: str, **kwargs):
+        inicio = time.perf_counter()
+        resposta = await self.cliente.post(url, **kwargs)
+        self.latencias[rota].append(time.perf_counter() - inicio)
+        await asyncio.sleep(0)  # Sem rede no meio, cede a vez às tarefas de envio do /ws
+        if resposta.status_code != 200:
+            self.erros += 1
+        return resposta
+
+    async def novo_jogo(self, sala_id: str):
+        await self._requisicao("novo-jogo", f"/salas/{sala_id}/novo-jogo", json=self.nomes)
+
+    async def jogar_uma_vez(self, sala_id: str):
+        jogo = salas.obter(sala_id).jogo
+        if jogo.encerrado or not jogo.jogadas_validas():
+            self.inicios[sala_id].append(time.perf_counter())
+            await self.novo_jogo(sala_id)
+            return
+        nome = jogo.jogador_da_vez().nome
+        jogada = self.politica(jogo, jogo.jogadas_validas(), self.rng)
+        self.inicios[sala_id].append(time.perf_counter())
+        if jogada[0] == "jogar":
+            corpo = {"indice": jogada[1], "nova_cor": jogada[2]}
+            await self._requisicao("jogar", f"/salas/{sala_id}/jogar/{nome}", json=corpo)
+        else:
+            rota = {"comprar": "comprar", "uno": "uno", "desafiar": "desafiar",
+                    "nao_desafiar": "nao-desafiar"}[jogada[0]]
+            await self._requisicao(rota, f"/salas/{sala_id}/{rota}/{nome}")
+
+    async def _cliente(self, fila: asyncio.Queue, restantes: itertools.count, fim: float):
+        # Pega a sala com o comando mais cedo, joga uma vez e devolve; uma sala
+        # nunca tem dois comandos do benchmark ao mesmo tempo, então o atraso
+        # do broadcast é atribuível ao comando certo
+        while next(restantes) < self.comandos:
+            horario, sala_id = await fila.get()
+            try:
+                espera = horario - time.perf_counter()
+                if horario > fim:
+                    return
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                await self.jogar_uma_vez(sala_id)
+            finally:
+                fila.put_nowait((horario + self.intervalo, sala_id))
+
+    async def executar(self) -> dict:
+        for sala_id in self.salas:
+            await self.novo_jogo(sala_id)
+            self.conexoes[sala_id] = [
+                ClienteWS(f"/salas/{sala_id}/ws", {"protocolo": self.protocolo})
+                for _ in range(self.espectadores)
+            ]
+            for conexao in self.conexoes[sala_id]:
+                await conexao.conectar()
+        # A preparação e as mensagens recebidas na conexão (estado inicial do
+        # delta) não entram na medição
+        self.latencias.clear()
+        self.inicios.clear()
+        self.erros = 0
+        await asyncio.sleep(0.01)
+        for conexoes in self.conexoes.values():
+            for conexao in conexoes:
+                conexao.chegadas.clear()
+
+        fila: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        inicio = time.perf_counter()
+        for posicao, sala_id in enumerate(self.salas):
+            # Espalha o primeiro comando das salas dentro de um intervalo
+            fila.put_nowait((inicio + self.intervalo * posicao / len(self.salas), sala_id))
+        restantes = itertools.count()
+        fim = inicio + self.segundos
+        await asyncio.gather(*(self._cliente(fila, restantes, fim) for _ in range(self.clientes)))
+        duracao = time.perf_counter() - inicio
+        await asyncio.sleep(0.05)  # Deixa as últimas mensagens chegarem
+
+        atrasos = []
+        desconectados = 0
+        for sala_id, conexoes in self.conexoes.items():
+            inicios = self.inicios[sala_id]
+            for conexao in conexoes:
+                desconectados += conexao.fechado
+                for chegada in conexao.chegadas:
+                    posicao = bisect.bisect_right(inicios, chegada) - 1
+                    if posicao >= 0:
+                        atrasos.append(chegada - inicios[posicao])
+                await conexao.fechar()
+            salas.remover(sala_id)
+
+        total = sum(len(v) for v in self.latencias.values())
+        return {
+            "salas": len(self.salas),
+            "espectadores_por_sala": self.espectadores,
+            "clientes": self.clientes,
+            "protocolo": self.protocolo,
+            "requisicoes": total,
+            "erros": self.erros,
+            "segundos": round(duracao, 3),
+            "taxa_por_sala": 1 / self.intervalo if self.intervalo else None,
+            "requisicoes_por_segundo": round(total / duracao, 1) if duracao else None,
+            "latencia_ms": percentis(list(itertools.chain.from_iterable(self.latencias.values()))),
+            "latencia_por_rota_ms": {rota: percentis(v) for rota, v in sorted(self.latencias.items())},
+            "atraso_broadcast_ms": percentis(atrasos),
+            "espectadores_desconectados": desconectados,
+        }
+
+
+async def executar_cenarios(args) -> list:
+    resultados = []
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        for quantidade_salas, espectadores in itertools.product(args.salas, args.espectadores):
+            if max(salas.max_salas - len(salas.salas), 0) < quantidade_salas:
+                raise SystemExit(f"Limite de salas do servidor menor que {quantidade_salas}")
+            cenario = Cenario(cliente, quantidade_salas, espectadores, args.clientes, args.comandos,
+                              args.jogadores, args.protocolo, args.semente, args.taxa, args.segundos)
+            resultado = await cenario.executar()
+            print(json.dumps(resultado, ensure_ascii=False), file=sys.stderr)
+            resultados.append(resultado)
+    return resultados
+
+
+def comparar(base: dict, atual: dict, tolerancia: float) -> list:
+    # Regressões: p95 de latência/atraso ou vazão piores que a base além da tolerância
+    regressoes = []
+    def chave(c):
+        return c["salas"], c["espectadores_por_sala"], c["taxa_por_sala"]
+
+    anteriores = {chave(c): c for c in base["cenarios"]}
+    for cenario in atual["cenarios"]:
+        anterior = anteriores.get(chave(cenario))
+        if not anterior:
+            continue
+        for metrica in ("latencia_ms", "atraso_broadcast_ms"):
+            antes, depois = anterior[metrica]["p95"], cenario[metrica]["p95"]
+            if antes and depois and depois > antes * (1 + tolerancia):
+                regressoes.append(f"{chave(cenario)} {metrica} p95: {antes} -> {depois}")
+        antes, depois = anterior["requisicoes_por_segundo"], cenario["requisicoes_por_segundo"]
+        if antes and depois and depois < antes * (1 - tolerancia):
+            regressoes.append(f"{chave(cenario)} requisicoes_por_segundo: {antes} -> {depois}")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga da API HTTP e WebSocket")
+    parser.add_argument("--salas", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--espectadores", type=int, nargs="+", default=[0, 10],
+                        help="Conexões /ws por sala")
+    parser.add_argument("--clientes", type=int, default=16, help="Clientes HTTP concorrentes")
+    parser.add_argument("--comandos", type=int, default=2000, help="Máximo de comandos por cenário")
+    parser.add_argument("--segundos", type=float, default=10, help="Duração máxima de cada cenário")
+    parser.add_argument("--taxa", type=float, default=20,
+                        help="Comandos por segundo em cada sala (0 = o mais rápido possível)")
+    parser.add_argument("--jogadores", type=int, default=4)
+    parser.add_argument("--protocolo", choices=["texto", "delta", "binario"], default="texto")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resultado")
+    parser.add_argument("--comparar", help="Resultado anterior (JSON) para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    resultado = {
+        "python": platform.python_version(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("saida", "comparar")},
+        "cenarios": asyncio.run(executar_cenarios(args)),
+    }
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(json.load(arquivo), resultado, args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO {regressao}", file=sys.stderr)
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
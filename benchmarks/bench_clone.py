@@ -0,0 +1,74 @@
+import argparse
+import copy
+import json
+import platform
+import random
+import statistics
+import time
+
+from app.game import JogoUNO
+from app.simulacao import POLITICAS
+
+# Compara JogoUNO.clonar() com copy.deepcopy num jogo no meio da partida,
+# de 2 a 10 jogadores.
+#
+#   python -m benchmarks.bench_clone --jogadores 2 4 6 8 10 --saida clone.json
+
+
+def jogo_no_meio(jogadores: int, jogadas: int, semente: int) -> JogoUNO:
+    jogo = JogoUNO([f"j{i}" for i in range(jogadores)], semente=semente)
+    rng = random.Random(semente)
+    politica = POLITICAS["gulosa"]
+    for _ in range(jogadas):
+        if jogo.encerrado:
+            break
+        jogo.aplicar(politica(jogo, jogo.jogadas_validas(), rng))
+    return jogo
+
+
+def cronometrar(funcao, chamadas: int, repeticoes: int) -> float:
+    # Mediana do tempo por chamada, em microssegundos
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(chamadas):
+            funcao()
+        tempos.append((time.perf_counter() - inicio) / chamadas)
+    return statistics.median(tempos) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de JogoUNO.clonar() contra copy.deepcopy")
+    parser.add_argument("--jogadores", type=int, nargs="+", default=[2, 4, 6, 8, 10])
+    parser.add_argument("--jogadas", type=int, default=30, help="Jogadas antes de clonar")
+    parser.add_argument("--chamadas", type=int, default=2000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resultado")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for jogadores in args.jogadores:
+        jogo = jogo_no_meio(jogadores, args.jogadas, args.semente)
+        clonar = cronometrar(jogo.clonar, args.chamadas, args.repeticoes)
+        semeado = cronometrar(lambda: jogo.clonar(semente=1), args.chamadas, args.repeticoes)
+        deepcopy = cronometrar(lambda: copy.deepcopy(jogo), max(1, args.chamadas // 20), args.repeticoes)
+        resultados.append({
+            "jogadores": jogadores,
+            "cartas_no_baralho": len(jogo.baralho),
+            "eventos_no_historico": len(jogo.historico),
+            "us_clonar": round(clonar, 2),
+            "us_clonar_com_semente": round(semeado, 2),
+            "us_deepcopy": round(deepcopy, 2),
+            "vezes_mais_rapido": round(deepcopy / clonar, 1),
+        })
+
+    resultado = {"python": platform.python_version(), "jogadas_antes": args.jogadas, "resultados": resultados}
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
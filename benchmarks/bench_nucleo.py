@@ -0,0 +1,188 @@
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from array import array
+
+from app.game import Baralho, JogoUNO
+from app.simulacao import POLITICAS, simular_partida
+
+# Micro-benchmarks do núcleo do jogo (app.game), sem a camada HTTP. Cada caso
+# é medido duas vezes: primeiro só o tempo (várias rodadas, sem tracemalloc,
+# que deixa tudo mais lento) e depois as alocações de uma rodada menor com
+# tracemalloc ligado: o pico de memória de cada chamada e os bytes e blocos
+# que continuam alocados depois da coleta de lixo.
+#
+#   python -m benchmarks.bench_nucleo --jogadores 2 4 6 8 10 --saida nucleo.json
+#   python -m benchmarks.bench_nucleo --casos embaralhar partida --repeticoes 3
+#
+# Um caso é uma função preparar(jogadores, rng) que devolve a operação a medir
+# (sem argumentos); a preparação fica fora da medição. Casos que consomem o
+# próprio estado (ex.: reciclar_pilha) preparam antes de cada rodada um estado
+# novo para cada chamada.
+
+
+def _jogo(jogadores: int, rng: random.Random) -> JogoUNO:
+    return JogoUNO([f"j{i}" for i in range(jogadores)], semente=rng.randrange(2**32))
+
+
+def caso_baralho(jogadores, rng):
+    semente = random.Random(rng.randrange(2**32))
+    return lambda: Baralho(semente)
+
+
+def caso_gerar_baralho(jogadores, rng):
+    baralho = Baralho(random.Random(0))
+    return baralho._gerar_baralho
+
+
+def caso_embaralhar(jogadores, rng):
+    baralho = Baralho(random.Random(rng.randrange(2**32)))
+    return baralho.embaralhar
+
+
+def caso_novo_jogo(jogadores, rng):
+    nomes = [f"j{i}" for i in range(jogadores)]
+    semente = rng.randrange(2**32)
+    return lambda: JogoUNO(nomes, semente=semente)
+
+
+def caso_reciclar_pilha(jogadores, rng):
+    # Pilha de descarte com o baralho inteiro, como no fim de uma partida longa.
+    # Os jogos preparados continuam na lista até a próxima rodada, para que a
+    # liberação deles não se misture com a medição.
+    jogos = []
+    proximo = iter(())
+
+    def preparar():
+        jogo = _jogo(jogadores, rng)
+        jogo.pilha_descarte.extend(jogo.baralho.cartas)
+        jogo.baralho.cartas = []
+        return jogo
+
+    def reabastecer(quantidade):
+        nonlocal proximo
+        jogos[:] = [preparar() for _ in range(quantidade)]
+        proximo = iter(jogos)
+
+    return lambda: next(proximo).reciclar_pilha(), reabastecer
+
+
+def caso_registrar_log(jogadores, rng):
+    jogo = _jogo(jogadores, rng)
+    detalhes = {"carta": "vermelho 5", "cartas_na_mao": 6}
+    return lambda: jogo.registrar_log("jogar", "j0", detalhes)
+
+
+def caso_partida(jogadores, rng):
+    politicas = [POLITICAS["gulosa"]] * jogadores
+    sementes = iter(range(rng.randrange(2**20), 2**31))
+    return lambda: simular_partida(politicas, next(sementes))
+
+
+# nome -> (preparar, chamadas por rodada)
+CASOS = {
+    "baralho": (caso_baralho, 2000),
+    "gerar_baralho": (caso_gerar_baralho, 5000),
+    "embaralhar": (caso_embaralhar, 2000),
+    "novo_jogo": (caso_novo_jogo, 1000),
+    "reciclar_pilha": (caso_reciclar_pilha, 1000),
+    "registrar_log": (caso_registrar_log, 20000),
+    "partida": (caso_partida, 20),
+}
+
+
+def _separar(preparado):
+    # Casos que consomem o próprio estado devolvem (operação, reabastecer(n))
+    if isinstance(preparado, tuple):
+        return preparado
+    return preparado, None
+
+
+def medir(preparar, chamadas: int, jogadores: int, repeticoes: int, semente: int) -> dict:
+    rng = random.Random(semente)
+    operacao, reabastecer = _separar(preparar(jogadores, rng))
+
+    tempos = []
+    gc_ativo = gc.isenabled()
+    for _ in range(repeticoes):
+        if reabastecer:
+            reabastecer(chamadas)
+        gc.disable()
+        try:
+            inicio = time.perf_counter()
+            for _ in range(chamadas):
+                operacao()
+            tempos.append((time.perf_counter() - inicio) / chamadas)
+        finally:
+            if gc_ativo:
+                gc.enable()
+
+    # Alocações: rodada menor com tracemalloc, depois de uma chamada de aquecimento
+    chamadas_memoria = max(1, chamadas // 10)
+    if reabastecer:
+        reabastecer(chamadas_memoria + 1)
+    operacao()
+    picos = array("q", [0]) * chamadas_memoria  # Já alocado: não entra na conta
+    gc.collect()
+    blocos_antes = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        antes, _ = tracemalloc.get_traced_memory()
+        for i in range(chamadas_memoria):
+            atual, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            operacao()
+            picos[i] = tracemalloc.get_traced_memory()[1] - atual
+        gc.collect()  # Só conta como retido o que sobrevive à coleta de ciclos
+        depois, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocos = sys.getallocatedblocks() - blocos_antes
+
+    return {
+        "jogadores": jogadores,
+        "chamadas": chamadas,
+        "us_mediana": round(statistics.median(tempos) * 1e6, 3),
+        "us_min": round(min(tempos) * 1e6, 3),
+        "pico_bytes_mediana": int(statistics.median(picos)),  # Memória de trabalho de uma chamada
+        "pico_bytes_max": max(picos),
+        "bytes_retidos_por_chamada": round((depois - antes) / chamadas_memoria, 1),
+        "blocos_retidos_por_chamada": round(blocos / chamadas_memoria, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do núcleo do jogo")
+    parser.add_argument("--casos", nargs="+", choices=sorted(CASOS), default=list(CASOS))
+    parser.add_argument("--jogadores", type=int, nargs="+", default=[2, 4, 6, 8, 10])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplica as chamadas por rodada")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resultado")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for nome in args.casos:
+        preparar, chamadas = CASOS[nome]
+        chamadas = max(1, int(chamadas * args.escala))
+        resultados[nome] = []
+        for jogadores in args.jogadores:
+            medida = medir(preparar, chamadas, jogadores, args.repeticoes, args.semente)
+            print(json.dumps({"caso": nome, **medida}, ensure_ascii=False), file=sys.stderr)
+            resultados[nome].append(medida)
+
+    resultado = {"python": platform.python_version(), "casos": resultados}
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from app.persistencia import ArmazemEventos
+from app.salas import GerenciadorSalas
+from app.simulacao import POLITICAS
+
+# Mede o tempo de recuperação das salas gravadas em SQLite (snapshot + eventos).
+#
+#   python -m benchmarks.bench_recuperacao --salas 10000
+
+
+def popular(caminho: str, quantidade: int, max_jogadas: int, semente: int):
+    rng = random.Random(semente)
+    politica = POLITICAS["gulosa"]
+    registro = GerenciadorSalas(max_salas=quantidade, armazem=ArmazemEventos(caminho))
+    comandos = 0
+    for i in range(quantidade):
+        jogo = registro.novo_jogo(f"sala{i}", [f"j{k}" for k in range(rng.randint(2, 6))])
+        for _ in range(rng.randint(0, max_jogadas)):
+            if jogo.encerrado:
+                break
+            jogo.aplicar(politica(jogo, jogo.jogadas_validas(), rng))
+            comandos += 1
+    registro.armazem.fechar()
+    return comandos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de recuperação de salas")
+    parser.add_argument("--salas", type=int, default=10_000)
+    parser.add_argument("--max-jogadas", type=int, default=100)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resultado")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "uno.db")
+        inicio = time.perf_counter()
+        comandos = popular(caminho, args.salas, args.max_jogadas, args.semente)
+        preparo = time.perf_counter() - inicio
+
+        registro = GerenciadorSalas(max_salas=args.salas, armazem=ArmazemEventos(caminho))
+        inicio = time.perf_counter()
+        recuperadas = registro.recuperar()
+        recuperacao = time.perf_counter() - inicio
+        tamanho = os.path.getsize(caminho) + os.path.getsize(caminho + "-wal")
+        registro.armazem.fechar()
+
+    resultado = {
+        "salas": recuperadas,
+        "comandos_gravados": comandos,
+        "bytes_em_disco": tamanho,
+        "segundos_preparo": round(preparo, 3),
+        "segundos_recuperacao": round(recuperacao, 3),
+        "microssegundos_por_sala": round(recuperacao / max(recuperadas, 1) * 1e6, 1),
+    }
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
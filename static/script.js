@@ -1,28 +1,54 @@
 let ws;
 let jogadorLocal = null;
+let ultimoSeq = null; // seq da última mensagem recebida, para retomar se a conexão cair
+let tentativas = 0;
 
 function connectWs() {
-  ws = new WebSocket("ws://" + location.host + "/ws");
+  if (jogadorLocal === null) {
+    jogadorLocal = prompt("Informe seu nome de jogador (ex: a ou b):").trim().toLowerCase();
+    console.log("🔍 Jogador local:", jogadorLocal);
+  }
+  // Protocolo delta: cada mensagem tem seq, e ao reconectar com ?desde= o
+  // servidor manda só o que foi perdido
+  const parametros = new URLSearchParams({ protocolo: "delta", jogador: jogadorLocal });
+  if (ultimoSeq !== null) {
+    parametros.set("desde", ultimoSeq);
+  }
+  ws = new WebSocket("ws://" + location.host + "/ws?" + parametros);
 
   ws.onopen = () => {
     console.log("✅ WebSocket conectado");
-    jogadorLocal = prompt("Informe seu nome de jogador (ex: a ou b):").trim().toLowerCase();
-    console.log("🔍 Jogador local:", jogadorLocal);
+    tentativas = 0;
   };
 
   ws.onclose = () => {
-    console.log("❌ WebSocket desconectado");
+    // Espera crescente e sorteada, para os clientes não voltarem todos juntos
+    const espera = Math.min(30000, 500 * 2 ** tentativas) * (0.5 + Math.random() / 2);
+    tentativas++;
+    console.log("❌ WebSocket desconectado, reconectando em", Math.round(espera), "ms");
+    setTimeout(connectWs, espera);
   };
 
   ws.onmessage = function (event) {
+    const mensagem = JSON.parse(event.data);
+    if (mensagem.seq != null) {
+      if (mensagem.tipo !== "estado" && ultimoSeq !== null && mensagem.seq <= ultimoSeq) {
+        return; // Já recebida antes de a conexão cair
+      }
+      ultimoSeq = mensagem.seq;
+    }
+    if (mensagem.tipo !== "aviso") {
+      return;
+    }
+    const texto = mensagem.texto;
     const log = document.getElementById("mensagens");
-    log.textContent += event.data + "\n";
+    log.textContent += texto + "\n";
 
-    console.log("📨 Mensagem recebida:", event.data);
+    console.log("📨 Mensagem recebida:", texto);
     console.log("🤖 Comparando com jogador local:", jogadorLocal);
 
-    if (event.data.includes("pode desafiar")) {
-      const match = event.data.match(/(\w+) pode desafiar/);
+    if (texto.includes("pode desafiar")) {
+      const match = texto.match(/(\w+) pode desafiar/);
       console.log("🎯 Detectado possível alvo de desafio:", match ? match[1] : "nenhum");
       console.log("🤖 Comparando com jogador local:", jogadorLocal);
 
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import random
+
+from app.auditoria import EscritorAuditoria, ler_eventos, restaurar_historicos
+from app.persistencia import ArmazemEventos
+from app.salas import GerenciadorSalas
+from app.simulacao import POLITICAS
+
+
+async def jogar(sala, rodadas):
+    politica = POLITICAS["aleatoria"]
+    rng = random.Random(rodadas)  # Separado do rng do jogo, que faz parte do estado
+    for _ in range(rodadas):
+        async def acao(jogo):
+            if not jogo.encerrado:
+                jogo.aplicar(politica(jogo, jogo.jogadas_validas(), rng))
+        await sala.executar(None, acao)
+
+
+def test_grava_em_lote_e_roda_os_arquivos(tmp_path):
+    async def cenario():
+        escritor = EscritorAuditoria(str(tmp_path), tamanho_max=2000, arquivos=2, lote=20)
+        escritor.iniciar()
+        for i in range(200):
+            escritor.registrar("s", (i, "jogar", "a", "b", {"carta": "azul 1"}))
+        await escritor.fechar()
+        return escritor
+
+    escritor = asyncio.run(cenario())
+    assert escritor.gravados == 200 and escritor.descartados == 0
+    nomes = sorted(p.name for p in tmp_path.iterdir())
+    assert nomes == ["auditoria.jsonl", "auditoria.jsonl.1", "auditoria.jsonl.2"]
+    seqs = [registro["seq"] for registro in ler_eventos(str(tmp_path))]
+    assert seqs == sorted(seqs) and seqs[-1] == 199  # Os mais antigos saíram com a rotação
+
+
+def test_fila_cheia_segura_os_comandos(tmp_path):
+    async def cenario():
+        escritor = EscritorAuditoria(str(tmp_path), limite_fila=10)
+        escritor.iniciar()
+        for i in range(12):
+            escritor.registrar("s", (i, "jogar", "a", "b", {}))
+        assert escritor.descartados == 2
+        assert not escritor.com_espaco.is_set()
+        await asyncio.wait_for(escritor.aguardar_espaco(), 1)
+        await escritor.fechar()
+        return escritor
+
+    escritor = asyncio.run(cenario())
+    assert escritor.gravados == 10
+
+
+def test_historico_sobrevive_ao_reinicio(tmp_path):
+    pasta = str(tmp_path / "auditoria")
+    caminho = str(tmp_path / "uno.db")
+
+    async def primeira_vida():
+        registro = GerenciadorSalas(armazem=ArmazemEventos(caminho))
+        registro.auditoria = EscritorAuditoria(pasta)
+        registro.auditoria.iniciar()
+        sala = registro.obter_ou_criar("s")
+        sala.novo_jogo(["a", "b", "c"])
+        await jogar(sala, 10)
+        sala.novo_jogo(["a", "b", "c"])  # Só o jogo atual volta para o histórico
+        await jogar(sala, 60)
+        registro.armazem.fechar()
+        await registro.auditoria.fechar()
+        return list(sala.jogo.historico)
+
+    eventos = asyncio.run(primeira_vida())
+    linhas = (tmp_path / "auditoria" / "auditoria.jsonl").read_text(encoding="utf-8").splitlines()
+    assert sum("novo_jogo" in json.loads(linha) for linha in linhas) == 2
+
+    novo = GerenciadorSalas(armazem=ArmazemEventos(caminho))
+    novo.recuperar()
+    novo.obter("s").jogo.historico.eventos.clear()  # Como se o snapshot fosse o mais recente
+    assert restaurar_historicos(pasta, novo) == 1
+    assert list(novo.obter("s").jogo.historico) == eventos
+    novo.armazem.fechar()
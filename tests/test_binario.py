@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.binario import MAX_PROFUNDIDADE, MAX_TAMANHO, desempacotar, empacotar
+from app.game import CARTAS, Carta
+from app.main import app
+from app.salas import salas
+
+
+def test_empacotar_e_desempacotar():
+    valores = [None, True, False, 0, 127, 128, 70_000, 2**40, -1, -33, -40_000, 1.5, "Vermelho +2", "ç" * 40,
+               b"\x00\x01", list(range(20)), {"mao": [0, 61], "cartas": {"a": 7}}]
+    for valor in valores:
+        assert desempacotar(empacotar(valor)) == valor
+    # Formato do MessagePack: mapa curto, texto curto, inteiros de um byte
+    assert empacotar({"topo": 5}) == b"\x81\xa4topo\x05"
+
+
+@pytest.mark.parametrize("dados", [
+    b"\x91" * (MAX_PROFUNDIDADE + 1) + b"\x00",  # Aninhamento fundo demais
+    b"\xdd\xff\xff\xff\xff\x00",  # Lista que diz ter 4 bilhões de itens
+    b"\xdb\x00\x01\x00\x00abc",  # Texto maior que o que sobrou
+    b"\x81\x90\x00",  # Lista como chave de mapa
+    b"\xc4\x03ab",  # Bytes cortados
+    empacotar("x" * (MAX_TAMANHO + 1)),
+])
+def test_desempacotar_recusa_mensagens_hostis(dados):
+    with pytest.raises(ValueError):
+        desempacotar(dados)
+
+
+def test_rest_em_messagepack_com_codigos():
+    jogo = salas.novo_jogo("binaria", ["a", "b"])
+    cliente = TestClient(app)
+
+    resposta = cliente.get("/salas/binaria/estado?jogador=a", headers={"Accept": "application/msgpack"})
+    assert resposta.headers["content-type"] == "application/msgpack"
+    estado = desempacotar(resposta.content)
+    assert estado["topo"] == jogo.pilha_descarte[-1].codigo
+    assert estado["mao"] == [c.codigo for c in jogo.jogadores[0].mao]
+    assert len(resposta.content) < len(cliente.get("/salas/binaria/estado?jogador=a").content) / 2
+
+    # Sem o cabeçalho, continua o JSON com os nomes
+    assert cliente.get("/salas/binaria/estado").json()["topo"] == str(jogo.pilha_descarte[-1])
+    salas.remover("binaria")
+
+
+def test_protocolo_binario_no_websocket():
+    jogo = salas.novo_jogo("binaria", ["a", "b"])
+    jogo.jogadores[0].mao[:] = [Carta("vermelho", "1"), Carta("vermelho", "2"), Carta("azul", "7")]
+    jogo.pilha_descarte[-1] = Carta("vermelho", "5")
+    cliente = TestClient(app)
+
+    with cliente.websocket_connect("/salas/binaria/ws?protocolo=binario&jogador=a") as ws:
+        estado = desempacotar(ws.receive_bytes())
+        assert estado["tipo"] == "estado"
+        assert [str(CARTAS[c]) for c in estado["mao"]] == ["Vermelho 1", "Vermelho 2", "Azul 7"]
+
+        assert cliente.post("/salas/binaria/jogar/a", json={"indice": 1}).status_code == 200
+        mensagens = [desempacotar(ws.receive_bytes()) for _ in range(3)]
+        assert [m["tipo"] for m in mensagens] == ["aviso", "delta", "mao"]
+        assert mensagens[1]["mudancas"]["topo"] == Carta("vermelho", "2").codigo
+        assert mensagens[2]["saiu"] == [Carta("vermelho", "2").codigo]
+
+        ws.send_bytes(empacotar({"tipo": "resync"}))
+        resync = desempacotar(ws.receive_bytes())
+        assert resync["versao"] == estado["versao"] + 1
+        ws.send_text(json.dumps({"tipo": "resync"}))
+        assert desempacotar(ws.receive_bytes())["tipo"] == "estado"
+    salas.remover("binaria")
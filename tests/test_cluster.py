@@ -0,0 +1,175 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.barramento import BarramentoSocket, Corretor, TrabalhadorIndisponivel
+from app.cluster import executar_http, trabalhadores
+from app.limites import limites
+from app.main import app
+from app.salas import salas
+from app.websocket import manager
+
+
+def test_corretor_repassa_publicacoes_e_pedidos(tmp_path):
+    async def cenario():
+        endereco = str(tmp_path / "barramento.sock")
+        corretor = Corretor(endereco)
+        await corretor.iniciar()
+        recebidos = {0: [], 1: [], 2: []}
+        clientes = []
+        for indice in range(3):
+            cliente = BarramentoSocket(endereco, indice, tempo_pedido=1)
+            cliente.ao_receber = lambda sala, itens, indice=indice: recebidos[indice].append((sala, itens))
+            cliente.ao_pedir = lambda corpo, indice=indice: asyncio.sleep(0, {"eco": corpo, "de": indice})
+            await cliente.conectar()
+            clientes.append(cliente)
+        clientes[0].assinar("mesa")
+        clientes[1].assinar("mesa")
+        clientes[2].assinar("outra")
+        resposta = await clientes[2].pedir(1, {"x": 1})  # Também garante que as assinaturas chegaram
+        assert resposta == {"eco": {"x": 1}, "de": 1}
+        # Cada trabalhador sabe o que os outros assinam, não o que ele mesmo assina
+        assert clientes[2].interesses == {"mesa": {"texto"}}
+        assert clientes[0].interesses == {"mesa": {"texto"}, "outra": {"texto"}}
+        clientes[1].assinar("mesa", ["delta", "texto"])
+        await clientes[1].pedir(0, {})
+        assert clientes[0].interesses["mesa"] == {"delta", "texto"}
+        assert clientes[1].interesses["mesa"] == {"texto"}
+
+        clientes[0].publicar("mesa", [["texto", "oi", None]])
+        await clientes[0].pedir(1, {})  # Espera a publicação passar pelo corretor
+        assert recebidos == {0: [], 1: [("mesa", [["texto", "oi", None]])], 2: []}
+
+        await clientes[1].fechar()
+        with pytest.raises(TrabalhadorIndisponivel):
+            await clientes[0].pedir(1, {})
+        assert clientes[0].interesses == {"outra": {"texto"}}
+        for cliente in clientes:
+            await cliente.fechar()
+        await corretor.fechar()
+
+    asyncio.run(cenario())
+
+
+def _sala_do_trabalhador(indice: int) -> str:
+    trabalhadores.total = 2
+    try:
+        return next(f"mesa{i}" for i in range(100) if trabalhadores.dono(f"mesa{i}") == indice)
+    finally:
+        trabalhadores.total = 1
+
+
+def test_salas_de_outro_trabalhador_passam_pelo_barramento(tmp_path, monkeypatch):
+    # Este processo é o trabalhador 0; o 1 é simulado numa thread à parte
+    laco = asyncio.new_event_loop()
+    threading.Thread(target=laco.run_forever, daemon=True).start()
+
+    def rodar(coro):
+        return asyncio.run_coroutine_threadsafe(coro, laco).result(5)
+
+    endereco = str(tmp_path / "barramento.sock")
+    corretor = Corretor(endereco)
+    rodar(corretor.iniciar())
+    pedidos, publicados = [], []
+
+    async def atender(pedido):
+        pedidos.append(pedido)
+        corpo = base64.b64encode(b'{"de": 1}').decode()
+        return {"status": 200, "cabecalhos": [["content-type", "application/json"]], "corpo": corpo}
+
+    outro = BarramentoSocket(endereco, 1)
+    outro.ao_pedir = atender
+    outro.ao_receber = lambda sala, itens: publicados.append((sala, itens))
+    rodar(outro.conectar())
+
+    local, remota = _sala_do_trabalhador(0), _sala_do_trabalhador(1)
+    monkeypatch.setenv("UNO_TRABALHADORES", "2")
+    monkeypatch.setenv("UNO_TRABALHADOR", "0")
+    monkeypatch.setenv("UNO_BARRAMENTO", endereco)
+    try:
+        with TestClient(app) as cliente:
+            # Sala do outro trabalhador: a requisição vai para ele e volta a resposta dele
+            resposta = cliente.post(f"/salas/{remota}/novo-jogo", json=["a", "b"])
+            assert resposta.json() == {"de": 1}
+            assert pedidos[0]["caminho"] == f"/salas/{remota}/novo-jogo"
+            assert base64.b64decode(pedidos[0]["corpo"]) == b'["a","b"]'
+
+            # Um cliente que manda o antigo cabeçalho de "já repassada" não faz
+            # este trabalhador criar a própria cópia da sala: vai para o dono do mesmo jeito
+            resposta = cliente.post(f"/salas/{remota}/novo-jogo", json=["a", "b"],
+                                    headers={"x-uno-encaminhado": "1"})
+            assert resposta.json() == {"de": 1}
+            assert len(pedidos) == 2
+            assert salas.obter(remota) is None
+
+            # Sala deste trabalhador sem ninguém olhando: nada é codificado nem publicado
+            cliente.post(f"/salas/{local}/novo-jogo", json=["a", "b"])
+            vez = cliente.get(f"/salas/{local}/estado").json()["turno"]
+            cliente.post(f"/salas/{local}/comprar/{vez}")
+            rodar(outro.pedir(0, {"tipo": "estado", "sala": local, "jogador": None}))
+            assert publicados == [] and local not in manager.replays
+
+            # Com o outro trabalhador assinando, as mensagens saem no barramento,
+            # só nos protocolos que ele assinou
+            outro.assinar(local, ["texto"])
+            rodar(outro.pedir(0, {"tipo": "estado", "sala": local, "jogador": None}))
+            vez = cliente.get(f"/salas/{local}/estado").json()["turno"]
+            cliente.post(f"/salas/{local}/comprar/{vez}")
+            rodar(outro.pedir(0, {"tipo": "estado", "sala": local, "jogador": None}))
+            assert any(item[0] == "texto" and "comprou" in item[1] for sala, itens in publicados for item in itens)
+            assert {item[0] for sala, itens in publicados for item in itens} == {"texto"}
+
+            outro.assinar(local, ["delta", "texto"])
+            rodar(outro.pedir(0, {"tipo": "estado", "sala": local, "jogador": None}))
+            publicados.clear()
+            vez = cliente.get(f"/salas/{local}/estado").json()["turno"]
+            cliente.post(f"/salas/{local}/comprar/{vez}")
+            rodar(outro.pedir(0, {"tipo": "estado", "sala": local, "jogador": None}))
+            assert {item[0] for sala, itens in publicados for item in itens} == {"delta", "texto"}
+
+            # /ws conectado aqui recebe o que o outro trabalhador publica
+            with cliente.websocket_connect(f"/salas/{remota}/ws") as ws:
+                prazo = time.monotonic() + 5
+                while remota not in corretor.assinantes and time.monotonic() < prazo:
+                    time.sleep(0.01)
+                laco.call_soon_threadsafe(outro.publicar, remota, [["texto", "🎮 b jogou Azul 5", None]])
+                assert ws.receive_text() == "🎮 b jogou Azul 5"
+        assert trabalhadores.total == 1 and trabalhadores.barramento is None
+    finally:
+        rodar(outro.fechar())
+        rodar(corretor.fechar())
+        laco.call_soon_threadsafe(laco.stop)
+
+
+def test_dono_executa_a_requisicao_repassada():
+    cliente = TestClient(app)
+    cliente.post("/salas/repassada/novo-jogo", json=["a", "b"])
+    pedido = {"tipo": "http", "metodo": "GET", "caminho": "/salas/repassada/estado", "consulta": "",
+              "cabecalhos": [["host", "teste"]], "corpo": ""}
+    resposta = asyncio.run(executar_http(app, pedido))
+    assert resposta["status"] == 200
+    assert set(json.loads(base64.b64decode(resposta["corpo"]))["jogadores"]) == {"a", "b"}
+
+
+def test_repasse_guarda_o_endereco_do_cliente():
+    # Espectadores de outros trabalhadores não dividem um balde só no dono
+    TestClient(app).post("/salas/repassada/novo-jogo", json=["a", "b"])
+
+    def pedido(endereco):
+        return {"tipo": "http", "metodo": "GET", "caminho": "/salas/repassada/estado", "consulta": "",
+                "cabecalhos": [["host", "teste"]], "corpo": "", "cliente": [endereco, 5000]}
+
+    async def cenario():
+        return [(await executar_http(app, pedido(endereco)))["status"]
+                for endereco in ("10.0.0.1", "10.0.0.1", "10.0.0.2")]
+
+    try:
+        limites.configurar(taxa_jogador=0.001, rajada_jogador=1)
+        assert asyncio.run(cenario()) == [200, 429, 200]
+    finally:
+        limites.configurar()
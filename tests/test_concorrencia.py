@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+
+from app.game import Carta
+from app.main import app
+from app.salas import SALA_PADRAO, salas
+from app.websocket import Replay, manager
+
+
+def preparar_sala(sala_id):
+    jogo = salas.novo_jogo(sala_id, ["a", "b"])
+    jogo.jogadores[0].mao[:] = [Carta("vermelho", "1"), Carta("vermelho", "2"), Carta("vermelho", "3")]
+    jogo.pilha_descarte[-1] = Carta("vermelho", "5")
+    return jogo
+
+
+async def disparar(requisicoes):
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+        return await asyncio.gather(*(cliente.post(url, **kwargs) for url, kwargs in requisicoes))
+
+
+def test_chave_repetida_joga_uma_vez_so():
+    jogo = preparar_sala("idem")
+    respostas = asyncio.run(disparar(
+        [("/salas/idem/jogar/a", {"json": {"indice": 0}, "headers": {"Idempotency-Key": "k1"}})] * 10
+    ))
+    assert all(r.status_code == 200 for r in respostas)
+    assert len({r.text for r in respostas}) == 1
+    assert len(jogo.jogadores[0].mao) == 2
+    assert len(jogo.pilha_descarte) == 2
+    salas.remover("idem")
+
+
+def test_jogadas_concorrentes_nao_corrompem_o_turno(monkeypatch):
+    jogo = salas.novo_jogo("corrida", ["a", "b", "c"])
+    for jogador in jogo.jogadores:
+        jogador.mao[:] = [Carta("vermelho", "1"), Carta("vermelho", "2"), Carta("vermelho", "3")]
+    jogo.pilha_descarte[-1] = Carta("vermelho", "5")
+    sala = salas.obter("corrida")
+    versao_inicial = sala.versao
+    # Como se um espectador tivesse acabado de sair: as mensagens ganham seq
+    manager.replays["corrida"] = Replay(manager.tamanho_replay)
+
+    # Broadcast lento: cede o laço no meio da seção crítica, e outra jogada
+    # que não esperasse a trava se intrometeria aqui
+    eventos = []
+    original = manager.enviar_mensagem
+
+    async def lento(mensagem, sala_id=SALA_PADRAO):
+        eventos.append(("inicio", sala.versao))
+        await asyncio.sleep(0.01)
+        await original(mensagem, sala_id)
+        eventos.append(("fim", manager.seq_atual(sala_id)))
+
+    monkeypatch.setattr(manager, "enviar_mensagem", lento)
+    try:
+        respostas = asyncio.run(disparar(
+            [("/salas/corrida/jogar/a", {"json": {"indice": 0}})] * 3 +
+            [(f"/salas/corrida/jogar/{nome}", {"json": {"indice": 0}}) for nome in "bcabc"]
+        ))
+    finally:
+        manager.replays.pop("corrida", None)
+
+    aceitas = sum(r.status_code == 200 for r in respostas)
+    assert sorted(r.status_code for r in respostas)[aceitas:] == [403] * (len(respostas) - aceitas)
+    assert aceitas >= 3 and sala.versao == versao_inicial + aceitas
+    # Um broadcast de cada vez, com versão e seq sempre crescendo
+    assert [tipo for tipo, _ in eventos] == ["inicio", "fim"] * aceitas
+    versoes = [v for tipo, v in eventos if tipo == "inicio"]
+    seqs = [s for tipo, s in eventos if tipo == "fim"]
+    assert versoes == list(range(versao_inicial, versao_inicial + aceitas))
+    assert all(a < b for a, b in zip(seqs, seqs[1:]))
+    assert jogo.jogador_atual().nome == "abc"[aceitas % 3]
+    salas.remover("corrida")
+
+
+def test_erro_repetido_com_a_mesma_chave():
+    preparar_sala("erro")
+    cabecalho = {"Idempotency-Key": "ruim"}
+    respostas = asyncio.run(disparar(
+        [("/salas/erro/jogar/b", {"json": {"indice": 0}, "headers": cabecalho})] * 2
+    ))
+    assert [r.status_code for r in respostas] == [403, 403]
+    salas.remover("erro")
+
+
+def test_chave_vale_so_para_a_mesma_rota_e_jogador():
+    jogo = preparar_sala("escopo")
+    cabecalho = {"Idempotency-Key": "mesma"}
+    jogada, = asyncio.run(disparar([("/salas/escopo/jogar/a", {"json": {"indice": 0}, "headers": cabecalho})]))
+    compra, = asyncio.run(disparar([("/salas/escopo/comprar/b", {"headers": cabecalho})]))
+    assert jogada.status_code == compra.status_code == 200
+    assert compra.json() != jogada.json()
+    assert len(jogo.jogadores[1].mao) == 8
+    salas.remover("escopo")
+
+
+def test_jogo_novo_esquece_as_chaves():
+    cabecalho = {"Idempotency-Key": "1"}
+    preparar_sala("rodadas")
+    primeira, = asyncio.run(disparar([("/salas/rodadas/jogar/a", {"json": {"indice": 0}, "headers": cabecalho})]))
+    # Outro jogo, e o cliente recomeça a numeração das chaves
+    jogo = preparar_sala("rodadas")
+    segunda, = asyncio.run(disparar([("/salas/rodadas/jogar/a", {"json": {"indice": 1}, "headers": cabecalho})]))
+    assert primeira.status_code == segunda.status_code == 200
+    assert segunda.json()["mensagem"] == "a jogou Vermelho 2"
+    assert len(jogo.jogadores[0].mao) == 2
+    salas.remover("rodadas")
+
+
+def test_chave_vale_nas_duas_rotas_da_sala_padrao():
+    jogo = preparar_sala(SALA_PADRAO)
+    cabecalho = {"Idempotency-Key": "alias"}
+    respostas = asyncio.run(disparar([
+        ("/jogar/a", {"json": {"indice": 0}, "headers": cabecalho}),
+        (f"/salas/{SALA_PADRAO}/jogar/a", {"json": {"indice": 0}, "headers": cabecalho}),
+    ]))
+    assert [r.status_code for r in respostas] == [200, 200]
+    assert respostas[0].json() == respostas[1].json()
+    assert len(jogo.jogadores[0].mao) == 2
+    salas.remover(SALA_PADRAO)
@@ -0,0 +1,48 @@
+import gzip
+import os
+
+from fastapi.testclient import TestClient
+
+from app.estaticos import PacoteEstatico
+from app.main import app
+
+
+def test_pagina_inicial_com_etag_e_gzip():
+    cliente = TestClient(app)
+    resposta = cliente.get("/", headers={"Accept-Encoding": "gzip"})
+    assert resposta.status_code == 200
+    assert resposta.headers["content-encoding"] == "gzip"
+    assert resposta.headers["cache-control"] == "no-cache"
+    assert "Color Turn" in resposta.text
+
+    repetida = cliente.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": resposta.headers["etag"]})
+    assert repetida.status_code == 304 and repetida.content == b""
+
+
+def test_script_versionado_fica_em_cache():
+    cliente = TestClient(app)
+    html = cliente.get("/").text
+    inicio = html.index("/static/script.js?v=")
+    url = html[inicio:html.index('"', inicio)]
+    resposta = cliente.get(url, headers={"Accept-Encoding": "identity"})
+    assert resposta.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert "content-encoding" not in resposta.headers
+    assert resposta.headers["content-type"].startswith("application/javascript")
+    assert cliente.get("/static/script.js").headers["cache-control"] == "no-cache"
+    assert cliente.get("/static/nada.js").status_code == 404
+
+
+def test_recarrega_em_desenvolvimento(tmp_path):
+    (tmp_path / "app.css").write_text("body { color: red; }" * 20)
+    (tmp_path / "index.html").write_text('<link href="/static/app.css">')
+    pacote = PacoteEstatico(str(tmp_path), recarregar=True)
+    status, cabecalhos, corpo = pacote.responder("app.css", {"accept-encoding": "gzip, br;q=0"})
+    assert status == 200 and dict(cabecalhos)[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(corpo) == ("body { color: red; }" * 20).encode()
+    hash_antigo = pacote.arquivos["app.css"].hash
+
+    (tmp_path / "app.css").write_text("body { color: blue; }" * 20)
+    os.utime(tmp_path / "app.css", ns=(0, 10**18))
+    _, _, html = pacote.responder("index.html", {})
+    assert pacote.arquivos["app.css"].hash != hash_antigo
+    assert f"/static/app.css?v={pacote.arquivos['app.css'].hash}".encode() in html
@@ -1,8 +1,15 @@
-from app.game import Baralho
+import random
+
+import pytest
+
+from app.game import CORES, Baralho, Carta, JogadaInvalida, Jogador, JogoUNO
+from app.simulacao import politica_aleatoria
 
 def test_baralho_tem_108_cartas():
     b = Baralho()
-    assert len(b.cartas) == 108
+    assert len(b) == len(b.cartas) == 108
+    with pytest.raises(AttributeError):
+        b.cartas.pop()  # Alterar a cópia não mexeria no baralho: é proibido
 
 def test_baralho_comprar_carta():
     b = Baralho()
@@ -10,3 +17,140 @@ def test_baralho_comprar_carta():
     assert carta is not None
     assert isinstance(carta.cor, str)
     assert isinstance(carta.valor, str)
+
+def test_cartas_sao_internadas_e_imutaveis():
+    b = Baralho()
+    assert Carta("azul", "+2") is Carta("azul", "+2")
+    assert all(carta is Carta(carta.cor, carta.valor) for carta in b.cartas)
+    assert len({carta.codigo for carta in b.cartas}) == 54
+    with pytest.raises(AttributeError):
+        b.cartas[0].cor = "verde"
+    with pytest.raises(ValueError):
+        Carta("rosa", "3")
+
+
+def test_pode_jogar_sobre():
+    topo = Carta("vermelho", "5")
+    assert Carta("vermelho", "9").pode_jogar_sobre(topo)
+    assert Carta("azul", "5").pode_jogar_sobre(topo)
+    assert Carta("preto", "+4").pode_jogar_sobre(topo)
+    assert not Carta("azul", "pular").pode_jogar_sobre(topo)
+    # Coringa jogado com cor escolhida vale pela cor
+    assert Carta("verde", "1").pode_jogar_sobre(Carta("verde", "coringa"))
+    assert not Carta("azul", "1").pode_jogar_sobre(Carta("verde", "+4"))
+
+
+def test_indice_da_mao_acompanha_compras_e_jogadas():
+    jogador = Jogador("a")
+    jogador.mao.extend([Carta("vermelho", "1"), Carta("azul", "+2"), Carta("preto", "+4")])
+    topo = Carta("verde", "+2")
+    assert jogador.mao.tem_cor(CORES.index("azul"))
+    assert not jogador.mao.tem_cor(CORES.index("verde"))
+    assert jogador.mao.indices_jogaveis(topo) == [1, 2]
+
+    jogador.jogar_carta(1)
+    assert jogador.mao.indices_jogaveis(topo) == [1]
+    assert not jogador.mao.tem_cor(CORES.index("azul"))
+
+    jogador.mao[:] = [Carta("verde", "3")]
+    assert jogador.mao.tem_jogavel(topo)
+    assert jogador.mao.contagem[Carta("verde", "3").codigo] == 1
+    jogador.mao.clear()
+    assert not jogador.mao.tem_jogavel(topo)
+
+
+def test_eliminacao_no_meio_da_mesa_mantem_a_vez():
+    jogo = JogoUNO(["a", "b", "c", "d"], semente=1)
+    jogo.pilha_descarte[-1] = Carta("vermelho", "5")
+    jogo.turno_atual = 1
+    jogo.jogadores[1].mao[:] = [Carta("vermelho", "7")]
+    jogo.declarar_uno("b")
+
+    resultado = jogo.jogar("b", 0)
+    assert resultado["colocacao"] == 1
+    assert jogo.jogador_atual().nome == "c"
+    assert [j.nome for j in jogo.jogadores] == ["a", "c", "d"]
+    with pytest.raises(JogadaInvalida):
+        jogo.buscar_jogador("b")
+
+    jogo.direcao = -1
+    jogo.proximo_turno()
+    assert jogo.jogador_atual().nome == "a"
+    jogo.proximo_turno()
+    assert jogo.jogador_atual().nome == "d"
+
+
+def test_ultimo_em_jogo_fecha_o_ranking():
+    jogo = JogoUNO(["a", "b", "c"], semente=1)
+    jogo.pilha_descarte[-1] = Carta("vermelho", "5")
+    for nome in "ab":
+        jogo.turno_atual = jogo._por_nome[nome]
+        jogo.jogadores[0].mao[:] = [Carta("vermelho", "7")]
+        jogo.declarar_uno(nome)
+        resultado = jogo.jogar(nome, 0)
+    assert resultado["ultimo"] == "c" and jogo.encerrado
+    assert jogo.resultado() == ["a", "b", "c"]
+    assert [j.nome for j in jogo.jogadores] == [j.nome for j in jogo.clonar().jogadores] == ["c"]
+
+
+def test_mesa_com_30_assentos():
+    nomes = [f"j{i}" for i in range(30)]
+    jogo = JogoUNO(nomes, semente=3)
+    assert jogo.baralho.copias == 3
+    assert all(len(j.mao) == 7 for j in jogo.jogadores)
+
+    for _ in range(500):
+        if jogo.encerrado:
+            break
+        jogada = jogo.jogadas_validas()[0]
+        jogo.aplicar(jogada)
+    assert jogo.jogador_atual() in jogo.jogadores
+
+
+def test_nomes_repetidos_sao_recusados():
+    with pytest.raises(JogadaInvalida):
+        JogoUNO(["a", "a"])
+
+
+def _estado(jogo):
+    return (
+        [(j.nome, list(j.mao), j.disse_uno) for j in jogo.jogadores],
+        jogo.baralho.cartas, jogo.pilha_descarte, jogo.direcao,
+        jogo.jogador_da_vez().nome, jogo.vencedores,
+    )
+
+
+def test_clonar_segue_igual_ao_original_e_nao_o_altera():
+    jogo = JogoUNO(["a", "b", "c", "d"], semente=5)
+    rng = random.Random(0)
+    for _ in range(40):
+        jogo.aplicar(politica_aleatoria(jogo, jogo.jogadas_validas(), rng))
+    antes = _estado(jogo)
+
+    copia = jogo.clonar()
+    assert _estado(copia) == antes
+    assert copia.baralho._cartas is jogo.baralho._cartas  # Dividem a mesma tupla
+
+    estados = []
+    for alvo in (copia, jogo):
+        rng = random.Random(1)
+        for _ in range(60):
+            if alvo.encerrado:
+                break
+            alvo.aplicar(politica_aleatoria(alvo, alvo.jogadas_validas(), rng))
+        estados.append(_estado(alvo))
+        if alvo is copia:
+            assert _estado(jogo) == antes
+    assert estados[0] == estados[1]
+
+
+def test_clonar_com_desafio_pendente():
+    jogo = JogoUNO(["a", "b", "c"], semente=1)
+    jogo.jogadores[0].mao[:] = [Carta("preto", "+4"), Carta("vermelho", "3"), Carta("azul", "3")]
+    jogo.jogar("a", 0, "azul")
+
+    copia = jogo.clonar(semente=9)
+    assert copia.ultimo_desafio["vitima"] is copia.buscar_jogador("b")
+    copia.desafiar("b")
+    assert jogo.ultimo_desafio is not None
+    assert len(jogo.buscar_jogador("a").mao) == 2
@@ -0,0 +1,51 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.historico import HistoricoEventos
+from app.main import app
+from app.salas import salas
+from app.simulacao import POLITICAS
+
+
+def test_buffer_circular_descarta_os_mais_antigos():
+    historico = HistoricoEventos(capacidade=3)
+    for i in range(5):
+        historico.registrar("comprar", "a", "b", {"i": i})
+    assert len(historico) == 3
+    assert historico.primeiro_seq == 2
+    assert [e["seq"] for e in historico] == [2, 3, 4]
+
+
+def test_paginacao_por_cursor():
+    historico = HistoricoEventos()
+    for i in range(7):
+        historico.registrar("comprar", "a", "b", {"i": i})
+    eventos, cursor = historico.pagina(0, 3)
+    assert [e["seq"] for e in eventos] == [0, 1, 2]
+    eventos, cursor = historico.pagina(cursor, 3)
+    assert [e["seq"] for e in eventos] == [3, 4, 5]
+    eventos, cursor = historico.pagina(cursor, 3)
+    assert [e["seq"] for e in eventos] == [6]
+    assert historico.pagina(cursor, 3) == ([], 7)
+
+
+def test_historico_nao_guarda_a_mao_inteira():
+    jogo = salas.novo_jogo("hist", ["a", "b"])
+    politica = POLITICAS["gulosa"]
+    for _ in range(30):
+        if jogo.encerrado:
+            break
+        jogo.aplicar(politica(jogo, jogo.jogadas_validas(), jogo.rng))
+    assert all("mao_apos" not in e["estado"] for e in jogo.historico)
+
+    cliente = TestClient(app)
+    pagina = cliente.get("/salas/hist/historico", params={"limite": 5}).json()
+    assert len(pagina["eventos"]) == 5
+    assert pagina["proximo_cursor"] == 5
+
+    resposta = cliente.get("/salas/hist/historico", params={"formato": "ndjson"})
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+    linhas = [json.loads(linha) for linha in resposta.text.splitlines()]
+    assert [e["seq"] for e in linhas] == list(range(len(jogo.historico)))
+    salas.remover("hist")
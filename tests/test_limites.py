@@ -0,0 +1,54 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.limites import ControleAdmissao, LimitadorTaxa, limites
+from app.main import app
+from app.salas import salas
+
+
+def test_balde_de_fichas():
+    limitador = LimitadorTaxa(taxa=2, rajada=3)
+    assert [limitador.retirar("a", 0.0) for _ in range(3)] == [0, 0, 0]
+    assert limitador.retirar("a", 0.0) == 0.5  # Meio segundo até a próxima ficha
+    assert limitador.retirar("b", 0.0) == 0  # Outra chave tem o próprio balde
+    assert limitador.retirar("a", 0.5) == 0
+    assert limitador.retirar("a", 10.0) == 0  # O balde enche só até a rajada
+    assert [limitador.retirar("a", 10.0) for _ in range(3)] == [0, 0, 0.5]
+
+
+def test_admissao_com_fila_limitada():
+    async def cenario():
+        admissao = ControleAdmissao(max_em_andamento=1, max_fila=1, espera_fila=0.05)
+        assert await admissao.entrar() is None
+        esperando = asyncio.create_task(admissao.entrar())
+        await asyncio.sleep(0)
+        assert admissao.na_fila == 1
+        assert await admissao.entrar() == "fila"  # Fila cheia: recusa na hora
+        admissao.sair()
+        assert await esperando is None  # Pegou a vaga liberada
+        assert await admissao.entrar() == "espera"  # Ninguém saiu a tempo
+        admissao.sair()
+        assert admissao.em_andamento == 0 and admissao.na_fila == 0
+
+    asyncio.run(cenario())
+
+
+def test_taxa_por_jogador_e_por_sala():
+    salas.novo_jogo("limitada", ["a", "b"])
+    cliente = TestClient(app)
+    try:
+        limites.configurar(taxa_jogador=0.001, rajada_jogador=2, taxa_sala=0.001, rajada_sala=3)
+        assert [cliente.get("/salas/limitada/jogadas/a").status_code for _ in range(2)] == [200, 200]
+        resposta = cliente.get("/salas/limitada/jogadas/a")
+        assert resposta.status_code == 429
+        assert int(resposta.headers["retry-after"]) > 1
+
+        # Outro jogador da mesma sala ainda tem fichas; outra sala nem é afetada
+        assert cliente.get("/salas/limitada/jogadas/b").status_code == 200
+        assert cliente.get("/salas/limitada/jogadas/b").status_code == 429  # Acabou a rajada da sala
+        assert "uno_limites_rejeitadas_total{limite=\"sala\"} 1" in cliente.get("/metrics").text
+        assert cliente.get("/salas/outra/estado").status_code == 200
+    finally:
+        limites.configurar()
+        salas.remover("limitada")
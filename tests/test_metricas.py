@@ -0,0 +1,92 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.game import JogoUNO
+from app import main
+from app.main import app
+from app.metricas import Amostrador, RegistroMetricas, amostrador, metricas, reciclagens, requisicoes
+
+
+def test_exporta_no_formato_do_prometheus():
+    registro = RegistroMetricas()
+    contador = registro.contador("x_total", "Teste", ("rota",))
+    histograma = registro.histograma("y_segundos", "Teste", limites=(0.1, 1.0))
+    registro.medidor("z", "Teste", lambda: 3)
+    contador.inc('/a"b')
+    histograma.observar(0.05)
+    histograma.observar(0.5)
+    histograma.observar(5)
+
+    texto = registro.exportar()
+    assert '# TYPE x_total counter\nx_total{rota="/a\\"b"} 1' in texto
+    assert 'y_segundos_bucket{le="0.1"} 1' in texto
+    assert 'y_segundos_bucket{le="1.0"} 2' in texto
+    assert 'y_segundos_bucket{le="+Inf"} 3' in texto
+    assert "y_segundos_count 3" in texto
+    assert "z 3" in texto
+
+
+def test_metrics_conta_rotas_e_reciclagens():
+    cliente = TestClient(app)
+    cliente.post("/salas/metricas/novo-jogo", json=["a", "b"])
+    cliente.get("/salas/metricas/estado")
+    antes = reciclagens.valores[()]
+    jogo = JogoUNO(["a", "b"], semente=1)
+    jogo.pilha_descarte.extend(jogo.baralho.cartas)
+    jogo.reciclar_pilha()
+    assert reciclagens.valores[()] == antes + 1
+
+    texto = cliente.get("/metrics").text
+    assert 'uno_http_requisicoes_total{metodo="GET",rota="/salas/{sala_id}/estado",status="200"}' in texto
+    assert 'uno_http_latencia_segundos_bucket{metodo="POST",rota="/salas/{sala_id}/novo-jogo",le="+Inf"}' in texto
+    assert "uno_salas " in texto
+    assert "uno_ws_conexoes 0" in texto
+
+
+def test_interruptores_exigem_administrador(monkeypatch):
+    assert TestClient(app).post("/metrics/ativo", params={"ligado": False}).status_code == 403
+    assert TestClient(app).get("/metrics/perfil").status_code == 403
+    assert TestClient(app, client=("127.0.0.1", 5000)).post("/metrics/ativo", params={"ligado": True}).status_code == 200
+
+    monkeypatch.setattr(main, "TOKEN_ADMIN", "segredo")
+    cliente = TestClient(app, client=("127.0.0.1", 5000))
+    assert cliente.post("/metrics/perfil", params={"ligado": True}).status_code == 401
+    assert cliente.post("/metrics/ativo", params={"ligado": False},
+                        headers={"Authorization": "Bearer outro"}).status_code == 401
+    assert metricas.ativo and not amostrador.ativo
+    assert TestClient(app).get("/metrics/perfil").status_code == 401
+    # Com o token, vale de qualquer endereço
+    resposta = TestClient(app).post("/metrics/ativo", params={"ligado": True},
+                                    headers={"Authorization": "Bearer segredo"})
+    assert resposta.json() == {"ativo": True}
+
+
+def test_metricas_desligadas_nao_medem():
+    cliente = TestClient(app, client=("127.0.0.1", 5000))
+    cliente.post("/metrics/ativo", params={"ligado": False})
+    try:
+        antes = dict(requisicoes.valores)
+        cliente.get("/estado")
+        assert cliente.get("/metrics").status_code == 404
+        assert dict(requisicoes.valores) == antes
+    finally:
+        cliente.post("/metrics/ativo", params={"ligado": True})
+    assert metricas.ativo
+
+
+def test_amostrador_registra_pilhas():
+    amostrador = Amostrador(intervalo=0.001)
+    amostrador.iniciar(alvo=threading.get_ident())
+
+    def ocupado():
+        fim = time.perf_counter() + 0.1
+        while time.perf_counter() < fim:
+            pass
+
+    ocupado()
+    amostrador.parar()
+    assert not amostrador.ativo
+    assert amostrador.amostras > 0
+    assert "test_metricas.py:ocupado" in amostrador.exportar()
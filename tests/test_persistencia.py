@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from app.game import JogoUNO
+from app.persistencia import ArmazemEventos
+from app.salas import GerenciadorSalas
+from app.simulacao import POLITICAS
+from app.snapshot import restaurar, serializar
+
+
+def jogar_rodadas(jogo, quantidade):
+    politica = POLITICAS["aleatoria"]
+    rng = random.Random(quantidade)  # Separado do rng do jogo, que faz parte do estado
+    for _ in range(quantidade):
+        if jogo.encerrado:
+            break
+        jogo.aplicar(politica(jogo, jogo.jogadas_validas(), rng))
+
+
+def test_snapshot_ida_e_volta():
+    jogo = JogoUNO(["a", "b", "c"], semente=5)
+    jogar_rodadas(jogo, 40)
+    copia = restaurar(serializar(jogo))
+    assert serializar(copia) == serializar(jogo)
+    assert [j.mao for j in copia.jogadores] == [j.mao for j in jogo.jogadores]
+
+    # O gerador aleatório também é restaurado: o futuro das duas cópias é igual
+    jogar_rodadas(jogo, 200)
+    jogar_rodadas(copia, 200)
+    assert serializar(copia) == serializar(jogo)
+
+
+@pytest.mark.parametrize("semente", [None, 0, 5, -3, 2**70])
+def test_snapshot_guarda_a_semente(semente):
+    jogo = JogoUNO(["a", "b"], semente=semente)
+    assert restaurar(serializar(jogo)).semente == semente
+    # Snapshots da versão 3 não tinham a semente
+    antigo = bytes([3]) + serializar(jogo)[1:]
+    antigo = antigo[:len(antigo) - 2 - (0 if semente is None else (semente.bit_length() // 8 + 1))]
+    assert restaurar(antigo).semente is None
+
+
+def test_recupera_salas_depois_de_reiniciar(tmp_path):
+    caminho = str(tmp_path / "uno.db")
+    registro = GerenciadorSalas(armazem=ArmazemEventos(caminho))
+    jogos = {}
+    for i, rodadas in enumerate([0, 10, 37, 80]):
+        jogo = registro.novo_jogo(f"sala{i}", ["a", "b", "c"])
+        jogar_rodadas(jogo, rodadas)
+        jogos[f"sala{i}"] = serializar(jogo)
+    registro.remover("sala0")
+    del jogos["sala0"]
+    registro.armazem.fechar()
+
+    # "Reinício": um registro novo lendo o mesmo arquivo
+    novo = GerenciadorSalas(armazem=ArmazemEventos(caminho))
+    assert novo.recuperar() == 3
+    for sala_id, dados in jogos.items():
+        assert serializar(novo.obter(sala_id).jogo) == dados
+
+    # A sala recuperada continua gravando a partir de onde parou
+    sala = novo.obter("sala2")
+    jogar_rodadas(sala.jogo, 30)
+    esperado = serializar(sala.jogo)
+    novo.armazem.fechar()
+    terceiro = GerenciadorSalas(armazem=ArmazemEventos(caminho))
+    terceiro.recuperar()
+    assert serializar(terceiro.obter("sala2").jogo) == esperado
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+
+from app.game import Carta, JogoUNO
+from app.main import app
+from app.probabilidades import EstadoObservado, estimar, simular
+
+
+def test_ultima_carta_jogavel_vence_sempre():
+    jogo = JogoUNO(["a", "b", "c"], semente=2)
+    jogo.jogadores[0].mao[:] = [Carta("vermelho", "5")]
+    jogo.pilha_descarte[-1] = Carta("vermelho", "1")
+
+    resultado = estimar(jogo, "a", partidas=500, semente=1)
+    assert resultado["probabilidades"] == {"a": 1.0, "b": 0.0, "c": 0.0}
+
+
+def test_mao_escondida_nao_vaza_para_o_espectador():
+    # Dois jogos iguais para quem olha de fora, com a mão de "b" diferente
+    estimativas = []
+    for mao_b in ([Carta("azul", "1"), Carta("azul", "2")], [Carta("preto", "+4"), Carta("preto", "coringa")]):
+        jogo = JogoUNO(["a", "b"], semente=4)
+        jogo.jogadores[1].mao[:] = mao_b
+        estimativas.append(simular(EstadoObservado(jogo), partidas=300, semente=7))
+    assert estimativas[0] == estimativas[1]
+    assert abs(sum(estimativas[0]["vitorias"]) - 1) < 1e-6
+
+
+def test_rota_de_probabilidades():
+    cliente = TestClient(app)
+    cliente.post("/salas/chances/novo-jogo", json=["a", "b", "c"])
+    resposta = cliente.get("/salas/chances/estado/probabilidades", params={"jogador": "a", "partidas": 200})
+    assert resposta.status_code == 200
+    dados = resposta.json()
+    assert set(dados["probabilidades"]) == {"a", "b", "c"}
+    assert dados["perspectiva"] == "a"
+    assert cliente.get("/salas/chances/estado/probabilidades", params={"jogador": "z"}).status_code == 404
@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.salas import GerenciadorSalas, LimiteSalasAtingido, salas
+
+
+def test_salas_sao_independentes():
+    cliente = TestClient(app)
+    cliente.post("/salas/mesa1/novo-jogo", json=["a", "b"])
+    cliente.post("/salas/mesa2/novo-jogo", json=["c", "d", "e"])
+
+    estado1 = cliente.get("/salas/mesa1/estado").json()
+    estado2 = cliente.get("/salas/mesa2/estado").json()
+    assert set(estado1["jogadores"]) == {"a", "b"}
+    assert set(estado2["jogadores"]) == {"c", "d", "e"}
+
+    # Um novo jogo em outra sala não apaga as mesas existentes
+    cliente.post("/novo-jogo", json=["x", "y"])
+    assert set(cliente.get("/salas/mesa1/estado").json()["jogadores"]) == {"a", "b"}
+
+    salas.remover("mesa1")
+    salas.remover("mesa2")
+
+
+def test_sala_inexistente():
+    cliente = TestClient(app)
+    resposta = cliente.post("/salas/nao-existe/comprar/a")
+    assert resposta.status_code == 400
+    assert cliente.get("/salas/nao-existe/estado").json() == {"erro": "Nenhum jogo em andamento"}
+
+
+def test_expulsa_salas_ociosas():
+    registro = GerenciadorSalas(tempo_ocioso=10)
+    registro.novo_jogo("velha", ["a", "b"])
+    registro.novo_jogo("nova", ["c", "d"])
+    registro.salas["velha"].ultimo_acesso -= 60
+
+    assert registro.expurgar_ociosas() == 1
+    assert "velha" not in registro
+    assert registro.obter("nova").jogo is not None
+
+
+def test_limite_de_salas():
+    registro = GerenciadorSalas(max_salas=2)
+    registro.novo_jogo("s1", ["a", "b"])
+    registro.novo_jogo("s2", ["a", "b"])
+    with pytest.raises(LimiteSalasAtingido):
+        registro.novo_jogo("s3", ["a", "b"])
@@ -0,0 +1,67 @@
+import pytest
+
+from app.game import JogadaInvalida, JogoUNO, Carta
+from app.simulacao import POLITICAS, simular, simular_partida
+
+
+def test_jogadas_validas_com_desafio_pendente():
+    jogo = JogoUNO(["a", "b", "c"], semente=1)
+    jogador = jogo.jogadores[0]
+    jogador.mao[:] = [Carta("preto", "+4"), Carta("vermelho", "3")]
+    jogo.pilha_descarte[-1] = Carta("vermelho", "5")
+
+    assert ("jogar", 0, "azul") in jogo.jogadas_validas()
+    assert ("uno",) in jogo.jogadas_validas()
+
+    jogo.aplicar(("jogar", 0, "azul"))
+    assert jogo.jogador_da_vez().nome == "b"
+    assert jogo.jogadas_validas() == [("desafiar",), ("nao_desafiar",)]
+
+    resultado = jogo.aplicar(("desafiar",))
+    assert resultado["sucesso"]  # "a" tinha um vermelho na mão
+    assert len(jogador.mao) == 5
+
+
+def test_cor_invalida_nao_perde_a_carta():
+    jogo = JogoUNO(["a", "b"], semente=2)
+    mao = [Carta("preto", "coringa"), Carta("azul", "1")]
+    jogo.jogadores[0].mao[:] = mao
+    topo = jogo.pilha_descarte[-1]
+    with pytest.raises(JogadaInvalida):
+        jogo.jogar("a", 0, "rosa")
+    assert jogo.jogadores[0].mao == mao
+    assert jogo.pilha_descarte[-1] == topo
+
+
+def test_partida_simulada_termina_e_e_reproduzivel():
+    politicas = [POLITICAS["gulosa"], POLITICAS["aleatoria"], POLITICAS["gulosa"]]
+    partida = simular_partida(politicas, semente=42)
+    assert partida["vencedor"] is not None
+    assert partida == simular_partida(politicas, semente=42)
+
+
+def test_simular_nao_depende_do_tamanho_do_lote():
+    politicas = ["gulosa", "aleatoria"]
+    a = simular(40, politicas, semente=7, processos=1, tamanho_lote=40).resumo()
+    b = simular(40, politicas, semente=7, processos=1, tamanho_lote=15).resumo()
+    assert a == b
+    assert a["partidas"] == 40
+    assert abs(sum(a["vitorias_por_assento"]) - 1) < 1e-9
+
+
+def test_rota_de_jogadas_possiveis():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.salas import salas
+
+    jogo = salas.novo_jogo("jogadas", ["a", "b"])
+    jogo.jogadores[0].mao[:] = [Carta("azul", "1"), Carta("vermelho", "2"), Carta("preto", "coringa")]
+    jogo.pilha_descarte[-1] = Carta("vermelho", "5")
+    cliente = TestClient(app)
+
+    resposta = cliente.get("/salas/jogadas/jogadas/a").json()
+    assert resposta["sua_vez"]
+    assert [j["indice"] for j in resposta["jogaveis"]] == [1, 2]
+    assert cliente.get("/salas/jogadas/jogadas/b").json()["jogaveis"] == []
+    assert cliente.get("/salas/jogadas/jogadas/z").status_code == 404
+    salas.remover("jogadas")
@@ -0,0 +1,78 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.game import Carta, JogoUNO
+from app.main import app
+from app.salas import salas
+from app.sincronizacao import Sincronizador, em_texto
+
+
+def test_delta_so_com_o_que_mudou():
+    jogo = JogoUNO(["a", "b", "c"], semente=3)
+    jogo.jogadores[0].mao[:] = [Carta("vermelho", "1"), Carta("vermelho", "2"), Carta("azul", "7")]
+    jogo.pilha_descarte[-1] = Carta("vermelho", "5")
+    sincronizador = Sincronizador()
+    completo = sincronizador.estado_completo(jogo, 1, "a")
+    assert em_texto(completo)["mao"] == ["Vermelho 1", "Vermelho 2", "Azul 7"]
+
+    jogo.jogar("a", 0)
+    delta, privadas = sincronizador.atualizar(jogo, 2)
+    assert em_texto(delta) == {
+        "tipo": "delta",
+        "versao": 2,
+        "mudancas": {"turno": "b", "topo": "Vermelho 1", "cartas": {"a": 2}},
+    }
+    assert em_texto(privadas["a"]) == {"tipo": "mao", "versao": 2, "entrou": [], "saiu": ["Vermelho 1"]}
+    assert privadas["a"]["saiu"] == [Carta("vermelho", "1").codigo]
+
+
+def test_protocolo_delta_no_websocket():
+    jogo = salas.novo_jogo("delta", ["a", "b"])
+    jogo.jogadores[0].mao[:] = [Carta("vermelho", "1"), Carta("vermelho", "2"), Carta("azul", "7")]
+    jogo.pilha_descarte[-1] = Carta("vermelho", "5")
+    cliente = TestClient(app)
+
+    with cliente.websocket_connect("/salas/delta/ws?protocolo=delta&jogador=a") as ws:
+        estado = json.loads(ws.receive_text())
+        assert estado["tipo"] == "estado"
+        assert estado["publico"]["cartas"] == {"a": 3, "b": len(jogo.jogadores[1].mao)}
+        versao = estado["versao"]
+
+        assert cliente.post("/salas/delta/jogar/a", json={"indice": 1}).status_code == 200
+        mensagens = [json.loads(ws.receive_text()) for _ in range(3)]
+        assert [m["tipo"] for m in mensagens] == ["aviso", "delta", "mao"]
+        assert mensagens[1]["versao"] == versao + 1
+        assert mensagens[1]["mudancas"]["topo"] == "Vermelho 2"
+        assert mensagens[2]["saiu"] == ["Vermelho 2"]
+
+        ws.send_text(json.dumps({"tipo": "resync"}))
+        resync = json.loads(ws.receive_text())
+        assert resync["tipo"] == "estado"
+        assert resync["versao"] == versao + 1
+        assert resync["mao"] == ["Vermelho 1", "Azul 7"]
+    salas.remover("delta")
+
+
+def test_reconexao_com_desde_recebe_so_o_perdido():
+    salas.novo_jogo("retomada", ["a", "b"])
+    cliente = TestClient(app)
+
+    with cliente.websocket_connect("/salas/retomada/ws?protocolo=delta") as ws:
+        estado = json.loads(ws.receive_text())
+        visto = estado["seq"]
+
+    # Caiu: enquanto isso quem está na vez compra uma carta
+    vez = cliente.get("/salas/retomada/estado").json()["turno"]
+    assert cliente.post(f"/salas/retomada/comprar/{vez}").status_code == 200
+
+    with cliente.websocket_connect(f"/salas/retomada/ws?protocolo=delta&desde={visto}") as ws:
+        mensagens = [json.loads(ws.receive_text()) for _ in range(2)]
+        assert [m["tipo"] for m in mensagens] == ["aviso", "delta"]
+        assert all(m["seq"] > visto for m in mensagens)
+        assert mensagens[1]["versao"] == estado["versao"] + 1
+
+    # seq desconhecido: volta o estado completo
+    with cliente.websocket_connect("/salas/retomada/ws?protocolo=delta&desde=1") as ws:
+        assert json.loads(ws.receive_text())["tipo"] == "estado"
+    salas.remover("retomada")
@@ -0,0 +1,167 @@
+import asyncio
+import random
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.limites import limites
+from app.main import app
+from app.salas import salas
+from app.torneio import ELIMINATORIA, SUICO, Classificacao, Torneio, dividir, serpentear
+
+
+def test_classificacao_incremental_igual_a_ordenar_tudo():
+    nomes = [f"j{i}" for i in range(50)]
+    classificacao = Classificacao(nomes)
+    rng = random.Random(3)
+    for _ in range(200):
+        classificacao.registrar(rng.sample(nomes, rng.randint(2, 6)))
+    esperado = sorted(nomes, key=lambda n: (-classificacao.pontos[n], -classificacao.vitorias[n], n))
+    assert classificacao.nomes() == esperado
+    assert [classificacao.posicao(n) for n in esperado] == list(range(1, 51))
+
+
+def test_mesas_equilibradas():
+    assert [len(m) for m in dividir(list(range(10)), 4)] == [4, 3, 3]
+    assert dividir(["a"], 4) == []
+    assert serpentear(list(range(8)), 4) == [[0, 3, 4, 7], [1, 2, 5, 6]]
+    # Número ímpar com mesas de 2: ninguém fica sozinho
+    assert dividir(list("abc"), 2) == [["a", "b", "c"]]
+    assert dividir(list("abcde"), 2) == [["a", "b", "c"], ["d", "e"]]
+    assert serpentear(list("abcde"), 2) == [["a", "d", "e"], ["b", "c"]]
+
+
+def test_suico_entre_bots():
+    participantes = {f"b{i}": ("gulosa" if i % 2 else "aleatoria") for i in range(30)}
+    torneio = Torneio(participantes, tamanho_mesa=4, semente=1)
+    asyncio.run(torneio.executar())
+    assert torneio.encerrado and torneio.rodada == torneio.rodadas == 4
+    assert all(partidas == 4 for partidas in torneio.classificacao.partidas.values())
+
+    repetido = Torneio(participantes, tamanho_mesa=4, semente=1)
+    asyncio.run(repetido.executar(tamanho_lote=3))
+    assert repetido.classificacao.pagina(0, 30) == torneio.classificacao.pagina(0, 30)
+
+
+def test_eliminatoria_termina_numa_final():
+    participantes = {f"b{i}": "gulosa" for i in range(20)}
+    torneio = Torneio(participantes, tamanho_mesa=4, formato=ELIMINATORIA)
+    asyncio.run(torneio.executar())
+    assert torneio.encerrado
+    final = torneio.mesas
+    assert len(final) == 1 and len(final[0].nomes) <= 4
+    assert torneio.classificacao.nomes()[0] in final[0].nomes
+
+
+def test_impar_com_mesas_de_2_todos_jogam():
+    for formato in (SUICO, ELIMINATORIA):
+        torneio = Torneio({"a": "gulosa", "b": "gulosa", "c": "gulosa"}, tamanho_mesa=2, formato=formato, rodadas=2)
+        asyncio.run(torneio.executar())
+        assert all(partidas >= 1 for partidas in torneio.classificacao.partidas.values())
+
+
+def test_torneio_com_humano_pela_api(monkeypatch):
+    monkeypatch.setenv("UNO_TORNEIO_PROCESSOS", "0")
+    participantes = {"humano": None, "b1": "gulosa", "b2": "gulosa", "b3": "aleatoria"}
+    with TestClient(app) as cliente:
+        resposta = cliente.post("/torneios", json={"participantes": participantes, "tamanho_mesa": 2, "rodadas": 2})
+        torneio_id = resposta.json()["torneio"]
+        for _ in range(2000):
+            dados = cliente.get(f"/torneios/{torneio_id}").json()
+            if dados["encerrado"]:
+                break
+            sala = cliente.get(f"/torneios/{torneio_id}/jogadores/humano").json()["sala"]
+            if not sala:
+                continue  # Esperando a mesa de bots terminar a rodada
+            jogadas = cliente.get(f"/salas/{sala}/jogadas/humano").json()
+            if jogadas["desafio_pendente"]:
+                cliente.post(f"/salas/{sala}/nao-desafiar/humano")
+            elif jogadas["jogaveis"]:
+                jogada = jogadas["jogaveis"][0]
+                cliente.post(f"/salas/{sala}/jogar/humano",
+                             json={"indice": jogada["indice"], "nova_cor": "azul" if jogada["coringa"] else None})
+            elif jogadas["pode_comprar"]:
+                cliente.post(f"/salas/{sala}/comprar/humano")
+        assert dados["encerrado"] and dados["rodada"] == 2
+        assert sum(linha["partidas"] for linha in dados["classificacao"]) == 8
+        assert cliente.get(f"/torneios/{torneio_id}/jogadores/humano").json()["partidas"] == 2
+        assert cliente.post("/torneios", json={"participantes": {"a": "gulosa"}}).status_code == 400
+
+
+def test_limites_e_expiracao_dos_torneios(monkeypatch):
+    monkeypatch.setenv("UNO_TORNEIO_PROCESSOS", "0")
+    with TestClient(app) as cliente:
+        demais = {f"b{i}": "gulosa" for i in range(main.MAX_PARTICIPANTES_TORNEIO + 1)}
+        assert cliente.post("/torneios", json={"participantes": demais}).status_code == 422
+        assert cliente.post("/torneios", json={"participantes": {"a": "gulosa", "b": "gulosa"},
+                                               "rodadas": main.MAX_RODADAS_TORNEIO + 1}).status_code == 422
+
+        try:
+            limites.configurar(max_torneios=1)
+            # A mesa do humano segura a vaga até ele jogar
+            com_humano = cliente.post("/torneios", json={"participantes": {"humano": None, "b1": "gulosa"}}).json()
+            resposta = cliente.post("/torneios", json={"participantes": {"b1": "gulosa", "b2": "gulosa"}})
+            assert resposta.status_code == 503 and "retry-after" in resposta.headers
+            main.torneios[com_humano["torneio"]].tarefa.cancel()
+            for _ in range(100):
+                if limites.torneios.em_andamento == 0:
+                    break
+                time.sleep(0.01)
+
+            # Encerrado, o torneio some depois do prazo
+            monkeypatch.setattr(main, "TEMPO_TORNEIO_ENCERRADO", 0)
+            torneio_id = cliente.post("/torneios", json={"participantes": {"b1": "gulosa", "b2": "gulosa"}}).json()["torneio"]
+            for _ in range(500):
+                resposta = cliente.get(f"/torneios/{torneio_id}")
+                if resposta.status_code == 404:
+                    break
+                time.sleep(0.01)
+            assert resposta.status_code == 404
+            assert torneio_id not in main.torneios and com_humano["torneio"] not in main.torneios
+            assert not any(t is main.torneios.get(com_humano["torneio"]) for t, _, _ in main.mesas_de_torneio.values())
+        finally:
+            limites.configurar()
+
+
+def test_cada_jogada_de_bot_e_uma_versao(monkeypatch):
+    # Mesa só de bots aberta como sala: joga a partida inteira no primeiro comando
+    torneio = Torneio({"b1": "gulosa", "b2": "aleatoria"}, tamanho_mesa=2, rodadas=1)
+    torneio.id = "versoes"
+    mesa = torneio.proxima_rodada()[0]
+    versoes, mensagens = [], []
+
+    async def publicar_versao(sala):
+        versoes.append(sala.versao)
+
+    async def enviar_mensagem(texto, sala_id):
+        mensagens.append(texto)
+
+    monkeypatch.setattr(main, "publicar_versao", publicar_versao)
+    monkeypatch.setattr(main.manager, "enviar_mensagem", enviar_mensagem)
+    asyncio.run(main.abrir_mesa_de_torneio(torneio, mesa))
+    jogadas = [m for m in mensagens if m.startswith("🤖")]
+    assert len(jogadas) > 1 and mesa.ranking is not None
+    assert versoes == list(range(versoes[0], versoes[0] + len(jogadas) + 1))
+    assert salas.obter(mesa.sala_id).versao == versoes[-1]
+    salas.remover(mesa.sala_id)
+
+
+def test_mesa_expulsa_por_ociosidade_conta_como_desistencia():
+    torneio = Torneio({"humano": None, "b1": "gulosa"}, tamanho_mesa=2, rodadas=1)
+    torneio.id = "ociosa"
+
+    async def cenario():
+        tarefa = asyncio.create_task(torneio.executar(abrir_mesa=main.abrir_mesa_de_torneio))
+        while not torneio.mesas or torneio.mesas[0].sala_id is None:
+            await asyncio.sleep(0)
+        mesa = torneio.mesas[0]
+        salas.salas[mesa.sala_id].ultimo_acesso -= salas.tempo_ocioso + 1
+        salas.salas.move_to_end(mesa.sala_id, last=False)  # A mais antiga de todas
+        salas.expurgar_ociosas()
+        await asyncio.wait_for(tarefa, 1)
+        return mesa
+
+    mesa = asyncio.run(cenario())
+    assert torneio.encerrado and mesa.ranking == ["b1", "humano"]
+    assert mesa.sala_id not in main.mesas_de_torneio and mesa.sala_id not in salas
@@ -0,0 +1,40 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.salas import salas
+
+
+def test_visao_publica_e_privada():
+    jogo = salas.novo_jogo("visoes", ["a", "b"])
+    cliente = TestClient(app)
+
+    publica = cliente.get("/salas/visoes/estado").json()
+    assert publica["jogadores"] == {"a": 7, "b": 7}
+    assert "mao" not in publica
+    privada = cliente.get("/salas/visoes/estado", params={"jogador": "a"}).json()
+    assert privada["mao"] == [str(c) for c in jogo.jogadores[0].mao]
+    assert cliente.get("/salas/visoes/estado", params={"jogador": "z"}).status_code == 404
+    salas.remover("visoes")
+
+
+def test_etag_muda_so_com_a_versao():
+    salas.novo_jogo("visoes", ["a", "b"])
+    sala = salas.obter("visoes")
+    cliente = TestClient(app)
+
+    resposta = cliente.get("/salas/visoes/estado")
+    etag = resposta.headers["etag"]
+    assert cliente.get("/salas/visoes/estado", headers={"If-None-Match": etag}).status_code == 304
+    # A mesma versão é serializada uma vez só, para todos os espectadores
+    assert sala.visoes.obter(sala) is sala.visoes.obter(sala)
+    # Cada visão e cada formato têm o seu ETag
+    assert cliente.get("/salas/visoes/estado?jogador=a").headers["etag"] != etag
+    assert cliente.get("/salas/visoes/estado", headers={"Accept": "application/msgpack"}).headers["etag"] != etag
+
+    vez = resposta.json()["turno"]
+    assert cliente.post(f"/salas/visoes/comprar/{vez}").status_code == 200
+    nova = cliente.get("/salas/visoes/estado", headers={"If-None-Match": etag})
+    assert nova.status_code == 200
+    assert nova.json()["versao"] == resposta.json()["versao"] + 1
+    assert nova.headers["etag"] != etag
+    salas.remover("visoes")
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+from app.websocket import ConnectionManager, PROTOCOLO_DELTA
+
+
+class WebSocketFalso:
+    def __init__(self, atraso=0.0, falhar=False):
+        self.atraso = atraso
+        self.falhar = falhar
+        self.recebidas = []
+        self.fechado = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, mensagem):
+        if self.falhar:
+            raise RuntimeError("socket morto")
+        await asyncio.sleep(self.atraso)
+        self.recebidas.append(mensagem)
+
+    async def close(self, code=1000):
+        self.fechado = code
+
+
+def test_envio_por_sala():
+    async def cenario():
+        manager = ConnectionManager()
+        a, b = WebSocketFalso(), WebSocketFalso()
+        await manager.conectar(a, "s1")
+        await manager.conectar(b, "s2")
+        await manager.enviar_mensagem("oi s1", "s1")
+        await asyncio.sleep(0.01)
+        assert a.recebidas == ["oi s1"]
+        assert b.recebidas == []
+
+    asyncio.run(cenario())
+
+
+def test_cliente_lento_nao_trava_os_outros():
+    async def cenario():
+        manager = ConnectionManager(tamanho_fila=2)
+        lento, rapido = WebSocketFalso(atraso=10), WebSocketFalso()
+        await manager.conectar(lento, "s")
+        await manager.conectar(rapido, "s")
+        for i in range(5):
+            await manager.enviar_mensagem(str(i), "s")
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        assert rapido.recebidas == ["0", "1", "2", "3", "4"]
+        # O cliente lento encheu a fila e foi derrubado
+        assert lento.fechado == 1013
+        assert manager.total_conexoes("s") == 1
+
+    asyncio.run(cenario())
+
+
+def test_socket_morto_e_removido():
+    async def cenario():
+        manager = ConnectionManager()
+        morto, vivo = WebSocketFalso(falhar=True), WebSocketFalso()
+        await manager.conectar(morto, "s")
+        await manager.conectar(vivo, "s")
+        await manager.enviar_mensagem("x", "s")
+        await asyncio.sleep(0.01)
+        assert vivo.recebidas == ["x"]
+        assert manager.total_conexoes("s") == 1
+
+        manager.desconectar(vivo, "s")
+        manager.desconectar(vivo, "s")  # Desconectar duas vezes não quebra
+        assert manager.total_conexoes() == 0
+
+    asyncio.run(cenario())
+
+
+def test_replay_entrega_so_o_que_foi_perdido():
+    async def cenario():
+        manager = ConnectionManager(tamanho_replay=6)
+        ws = WebSocketFalso()
+        await manager.conectar(ws, "s", PROTOCOLO_DELTA, "a")
+        await manager.enviar_mensagem("um", "s")
+        await asyncio.sleep(0.01)
+        visto = json.loads(ws.recebidas[-1])["seq"]
+        manager.desconectar(ws, "s")
+
+        # Sem ninguém conectado, a sala continua gerando mensagens para quem voltar
+        await manager.enviar_mensagem("dois", "s")
+        await manager.enviar_delta("s", {"tipo": "delta", "versao": 2, "mudancas": {}},
+                                   {"a": {"tipo": "mao", "versao": 2, "entrou": [], "saiu": []},
+                                    "b": {"tipo": "mao", "versao": 2, "entrou": [], "saiu": []}})
+        perdidas = [json.loads(m) for m in manager.perdidas("s", PROTOCOLO_DELTA, "a", visto)]
+        assert [m["tipo"] for m in perdidas] == ["aviso", "delta", "mao"]
+        assert [m["seq"] for m in perdidas] == [visto + 1, visto + 2, visto + 3]
+        assert manager.perdidas("s", PROTOCOLO_DELTA, "a", perdidas[-1]["seq"] + 1) == []
+
+        # Ficou para trás demais (ou o seq é de outra sala): estado completo
+        for i in range(6):
+            await manager.enviar_mensagem(str(i), "s")
+        assert manager.perdidas("s", PROTOCOLO_DELTA, "a", visto) is None
+        assert manager.perdidas("s", PROTOCOLO_DELTA, "a", 5) is None
+
+        # Depois do prazo o Replay some e a sala para de gerar as mensagens
+        manager.tempo_retomada = 0
+        manager._abandonar("s")
+        manager.replays["s"].prazos.clear()
+        assert manager.estruturados("s") == [] and "s" not in manager.replays
+
+    asyncio.run(cenario())